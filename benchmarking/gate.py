@@ -0,0 +1,85 @@
+###############################################################
+# python benchmarking/gate.py [--baseline=benchmarking/baseline.json]
+#                             [--save] [--kind=aws ...]
+#                             [--operation=list ...]
+#                             [--tolerance-time=0.25]
+#                             [--tolerance-memory=0.2]
+###############################################################
+
+# Runs the offline benchmark of the providers and compares it with the
+# baseline, e.g.
+#
+#   python benchmarking/gate.py
+#
+# The benchmark is run with the number of volumes, the latency of the API
+# calls and the repetitions stored in the baseline. The API calls, the
+# wall time and the peak memory of every kind and operation are compared
+# with it. The exit code is 1 and the metrics that got worse are printed
+# if list, attach or delete (or the operations given with --operation)
+# make more API calls, or got slower or use more memory beyond the
+# tolerance and the noise of the runs. With --save the baseline is
+# written from the run instead, e.g. after a change that is meant to
+# make more calls:
+#
+#   python benchmarking/gate.py --save
+#
+# Without a baseline file --save creates it with the defaults of
+# RegressionGate.
+
+import argparse
+import os
+import sys
+
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+from cloudmesh.volume.benchmark.RegressionGate import RegressionGate
+
+baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "baseline.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="compare the offline benchmark with a baseline")
+    parser.add_argument("--baseline", default=baseline)
+    parser.add_argument("--save", action="store_true",
+                        help="write the baseline from this run")
+    parser.add_argument("--kind", action="append",
+                        choices=ProviderBenchmark.kinds)
+    parser.add_argument("--operation", action="append",
+                        choices=ProviderBenchmark.operations,
+                        help="the operations that fail the gate")
+    parser.add_argument("--tolerance-time", type=float,
+                        default=RegressionGate.tolerance["time"])
+    parser.add_argument("--tolerance-memory", type=float,
+                        default=RegressionGate.tolerance["memory"])
+    arguments = parser.parse_args()
+
+    parameters = {
+        "kinds": arguments.kind,
+        "operations": arguments.operation,
+        "tolerance": {"time": arguments.tolerance_time,
+                      "memory": arguments.tolerance_memory}
+    }
+    if os.path.exists(arguments.baseline):
+        gate = RegressionGate.load(arguments.baseline, **parameters)
+    elif arguments.save:
+        gate = RegressionGate(**parameters)
+    else:
+        print(f"# no baseline {arguments.baseline}, create it with --save")
+        sys.exit(1)
+    results = gate.run()
+    if arguments.save:
+        gate.save(arguments.baseline, results)
+        print(f"# baseline written to {arguments.baseline}")
+        return
+    report = gate.compare(results)
+    if report:
+        print(RegressionGate.diff(report, results, gate.baseline))
+    failed = RegressionGate.failed(report)
+    print(f"# {'FAILED' if failed else 'passed'}: {len(results)} "
+          f"operations compared with {arguments.baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
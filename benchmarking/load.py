@@ -0,0 +1,62 @@
+###############################################################
+# python benchmarking/load.py [--kind=aws] [--workers=8]
+#                             [--operations=1000] [--latency=0.0]
+#                             [--mix=create=2,list=4,...] [--processes]
+#                             [--database=sqlite|mongo] [--seed=0]
+#                             [--format=table|json]
+###############################################################
+
+# Runs a load test of the volume facade without a cloud, e.g.
+#
+#   python benchmarking/load.py --kind=aws --workers=32 \
+#       --operations=2000 --latency=0.01
+#
+# The workers run a random mix of create, list, attach, detach and delete
+# against the SDK stand-ins of cloudmesh.volume.benchmark. The throughput,
+# the p50, p95 and p99 of the latency and the errors of each operation are
+# printed. With --database=mongo the facade uses the MongoDB of
+# cloudmesh.yaml and the contention of its cache is printed as well.
+
+import argparse
+import json
+
+from cloudmesh.volume.benchmark.LoadTest import LoadTest
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="load test of the volume facade")
+    parser.add_argument("--kind", choices=ProviderBenchmark.kinds,
+                        default="aws")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--mix", help="weights, e.g. create=1,list=8")
+    parser.add_argument("--processes", action="store_true",
+                        help="run the workers as processes")
+    parser.add_argument("--database", choices=["sqlite", "mongo"],
+                        default="sqlite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["table", "json"],
+                        default="table")
+    arguments = parser.parse_args()
+
+    test = LoadTest(kind=arguments.kind,
+                    workers=arguments.workers,
+                    operations=arguments.operations,
+                    mix=LoadTest.parse(arguments.mix)
+                    if arguments.mix else None,
+                    latency=arguments.latency,
+                    processes=arguments.processes,
+                    seed=arguments.seed,
+                    database=arguments.database)
+    report = test.run()
+    if arguments.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        print(LoadTest.table(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+###############################################################
+# python benchmarking/logs.py [--format=json|csv] [--save=FILE]
+#                             [--baseline=FILE] [--tolerance=0.2] LOG ...
+###############################################################
+
+# Extracts the "# csv," lines that Benchmark.print writes into the logs of
+# the tests, e.g.
+#
+#   python benchmarking/logs.py benchmarking/*.log
+#
+# and prints the min, p50, p95, max and mean of the time of each provider
+# and operation over all logs. With --save the aggregates are written to a
+# json file, which can be used as --baseline of a later run. With a
+# baseline the p50 of each operation is compared to it, an operation whose
+# p50 changed by more than the tolerance is reported as slower or faster.
+#
+# The aggregates of the logs in this directory are in logs_baseline.json.
+
+import argparse
+import json
+
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="aggregate the Benchmark csv lines of logs")
+    parser.add_argument("logs", nargs="+", help="the logs")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--save", help="save the aggregates as json")
+    parser.add_argument("--baseline", help="compare with saved aggregates")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    log = BenchmarkLog(tolerance=arguments.tolerance)
+    results = log.aggregate(log.records(arguments.logs))
+    if arguments.save:
+        BenchmarkLog.save(arguments.save, results)
+    if arguments.baseline:
+        results = log.compare(results, BenchmarkLog.load(arguments.baseline))
+    if arguments.format == "csv":
+        print(BenchmarkLog.csv(results), end="")
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
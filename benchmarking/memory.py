@@ -0,0 +1,58 @@
+###############################################################
+# python benchmarking/memory.py [--kind=aws ...] [--sizes=10000,100000]
+#                               [--database=sqlite|mongo]
+#                               [--format=table|json]
+###############################################################
+
+# Measures the memory of listing many volumes without a cloud, e.g.
+#
+#   python benchmarking/memory.py --kind=aws --kind=google --sizes=10000
+#
+# For each kind and size a FakeCloud with that many volumes is listed by
+# the provider with the stand-ins of its SDK, written to the repository or
+# with --database=mongo to the VolumeCache, and printed as table. The
+# time, the growth of the peak RSS, the peak and the retained allocations
+# and the peak allocations per volume of each phase are printed. A phase
+# over the budget of MemoryBenchmark.budget is reported and the exit code
+# is 1.
+
+import argparse
+import json
+import sys
+
+from cloudmesh.volume.benchmark.MemoryBenchmark import MemoryBenchmark
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="memory benchmark of listing volumes")
+    parser.add_argument("--kind", action="append",
+                        choices=ProviderBenchmark.kinds,
+                        help="the kinds, defaults to all kinds")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="the numbers of volumes, e.g. 10000,100000")
+    parser.add_argument("--database", choices=["sqlite", "mongo"],
+                        default="sqlite")
+    parser.add_argument("--format", choices=["table", "json"],
+                        default="table")
+    arguments = parser.parse_args()
+
+    benchmark = MemoryBenchmark(
+        sizes=[int(n) for n in arguments.sizes.split(",")],
+        database=arguments.database)
+    rows = benchmark.run(kinds=arguments.kind)
+    over = benchmark.check(rows)
+    if arguments.format == "json":
+        print(json.dumps({"rows": rows, "over_budget": over}, indent=2))
+    else:
+        print(MemoryBenchmark.table(rows))
+        for entry in over:
+            print(f"# {entry['kind']} {entry['volumes']} {entry['phase']}: "
+                  f"{entry['per_volume']} bytes per volume, budget "
+                  f"{entry['budget']}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+###############################################################
+# python benchmarking/multipass_create.py [N]
+###############################################################
+
+# Compares the throughput of creating and deleting the directories of N
+# local multipass volumes (default 1000) with a shell per volume, as the
+# multipass provider did with os.system, and in process with pathlib, as
+# it does now in create_many and delete_many.
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from cloudmesh.common.StopWatch import StopWatch
+
+
+def shell(path, names, op):
+    for name in names:
+        os.system(f"{op} {path}/{name}")
+
+
+def native(path, names, op):
+    for name in names:
+        getattr(Path(f"{path}/{name}"), op)()
+
+
+def main(n=1000):
+    names = [f"volume-{i}" for i in range(n)]
+    timers = []
+    with tempfile.TemporaryDirectory() as path:
+        for method in [shell, native]:
+            for op in ["mkdir", "rmdir"]:
+                timer = f"{method.__name__} {op}"
+                timers.append(timer)
+                StopWatch.start(timer)
+                method(path, names, op)
+                StopWatch.stop(timer)
+            assert len(os.listdir(path)) == 0
+    print(f"{'method':<14} {'volumes':>8} {'time(s)':>10} {'volumes/s':>12}")
+    for timer in timers:
+        t = StopWatch.get(timer, digits=4)
+        rate = n / t if t else float("inf")
+        print(f"{timer:<14} {n:>8} {t:>10} {rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
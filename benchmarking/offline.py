@@ -0,0 +1,32 @@
+###############################################################
+# python benchmarking/offline.py [N] [LATENCY] [KIND ...]
+###############################################################
+
+# Benchmarks the create, list, attach, detach and delete of N volumes
+# (default 10) for the providers of the kinds (default all) without a
+# cloud. The SDKs are replaced by the stand-ins of
+# cloudmesh.volume.benchmark, every API call takes LATENCY seconds
+# (default 0). For each operation the number of API calls, the wall time,
+# the seconds the provider waited in polling loops and the peak memory
+# are printed, followed by the API calls by name.
+
+import sys
+
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+def main(n=10, latency=0.0, kinds=None):
+    benchmark = ProviderBenchmark(n=n, latency=latency)
+    rows = benchmark.run(kinds=kinds)
+    print(ProviderBenchmark.table(rows))
+    print()
+    for row in rows:
+        api = ", ".join(f"{name}={count}"
+                        for name, count in sorted(row["api"].items()))
+        print(f"{row['kind']:<10} {row['operation']:<10} {api or '-'}")
+
+
+if __name__ == "__main__":
+    main(n=int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+         latency=float(sys.argv[2]) if len(sys.argv) > 2 else 0.0,
+         kinds=sys.argv[3:] or None)
@@ -0,0 +1,77 @@
+###############################################################
+# python benchmarking/repository_startup.py [N]
+###############################################################
+
+# Measures the startup of the volume repositories of the multipass
+# provider with N volume records (default 10000): the time to open the
+# repository and find the first volume by name, and the time of a full
+# list, a find by name, a find by vm and a find by state. The SQLite
+# repository is always measured, the MongoDB repository only if a
+# cloudmesh MongoDB is running.
+
+import sys
+import tempfile
+
+from cloudmesh.common.StopWatch import StopWatch
+from cloudmesh.volume.SqliteVolumeRepository import SqliteVolumeRepository
+
+cloud = "benchmark"
+
+
+def records(n):
+    return [{
+        "cm": {"kind": "multipass", "cloud": cloud, "name": f"volume-{i}",
+               "state": "available", "region": "/tmp", "attached_vms": []},
+        "name": f"volume-{i}",
+        "path": "/tmp",
+        "State": "available" if i % 10 else "deleted",
+        "AttachedToVm": [f"vm-{i % 100}"],
+        "tags": []
+    } for i in range(n)]
+
+
+def measure(label, create, n):
+    repository = create()
+    repository.update(records(n))
+    timers = {
+        "startup": lambda: create().find_name(f"volume-{n // 2}"),
+        "list": lambda: repository.find(),
+        "find name": lambda: repository.find_name(f"volume-{n // 2}"),
+        "find vm": lambda: repository.find({"AttachedToVm": "vm-7"}),
+        "find state": lambda: repository.find({"State": "deleted"}),
+    }
+    for name, function in timers.items():
+        StopWatch.start(f"{label} {name}")
+        function()
+        StopWatch.stop(f"{label} {name}")
+    repository.delete_many({"cm.cloud": cloud})
+    return [f"{label} {name}" for name in timers]
+
+
+def mongo():
+    try:
+        from cloudmesh.volume.VolumeRepository import VolumeRepository
+        repository = VolumeRepository(cloud=cloud, kind="multipass")
+        repository.find_name("volume-0")
+    except Exception as e:
+        print(f"MongoDB not measured: {e}")
+        return None
+    return lambda: VolumeRepository(cloud=cloud, kind="multipass")
+
+
+def main(n=10000):
+    with tempfile.TemporaryDirectory() as path:
+        timers = measure(
+            "sqlite",
+            lambda: SqliteVolumeRepository(cloud=cloud, kind="multipass",
+                                           path=f"{path}/{cloud}.db"), n)
+        create = mongo()
+        if create:
+            timers += measure("mongo", create, n)
+    print(f"{'operation':<18} {'volumes':>8} {'time(s)':>10}")
+    for timer in timers:
+        print(f"{timer:<18} {n:>8} {StopWatch.get(timer, digits=4):>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,79 @@
+###############################################################
+# python benchmarking/startup.py [--repeat=5] [--heavy=0.05]
+#                                [--format=table|json|csv] [--save=FILE]
+#                                [--baseline=FILE] [--tolerance=0.2]
+###############################################################
+
+# Measures the startup of cms volume, e.g.
+#
+#   python benchmarking/startup.py --save=startup_baseline.json
+#   python benchmarking/startup.py --baseline=startup_baseline.json
+#
+# Each measurement runs in a new process: the import time of
+# cloudmesh.volume.Provider and of the volume command as reported by
+# python -X importtime, and the time to the first output and to the exit
+# of cms volume list, cms volume status and cms volume --help. The min,
+# p50, p95, max and mean over the repetitions are printed together with
+# the heavy modules that cloudmesh.volume imports at module level. With
+# --save the aggregates are written to a json file, which can be used as
+# --baseline of a later run on the same machine. With a baseline the p50
+# of each measurement is compared to it and reported as slower, faster or
+# same.
+
+import argparse
+import json
+
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+from cloudmesh.volume.benchmark.StartupBenchmark import StartupBenchmark
+
+
+def table(results):
+    lines = [f"{'measurement':<14} {'operation':<34} {'p50(s)':>8} "
+             f"{'max(s)':>8} {'failed':>6}"]
+    for entry in results:
+        p50 = "" if entry["p50"] is None else f"{entry['p50']:.4f}"
+        top = "" if entry["max"] is None else f"{entry['max']:.4f}"
+        lines.append(f"{entry['provider']:<14} {entry['operation']:<34} "
+                     f"{p50:>8} {top:>8} {entry['failed']:>6}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="startup benchmark of cms volume")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--heavy", type=float,
+                        default=StartupBenchmark.heavy,
+                        help="seconds from which an import is heavy")
+    parser.add_argument("--format", choices=["table", "json", "csv"],
+                        default="table")
+    parser.add_argument("--save", help="save the aggregates as json")
+    parser.add_argument("--baseline", help="compare with saved aggregates")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    benchmark = StartupBenchmark(repeat=arguments.repeat,
+                                 heavy=arguments.heavy)
+    results = benchmark.run()
+    if arguments.save:
+        BenchmarkLog.save(arguments.save, results)
+    if arguments.baseline:
+        log = BenchmarkLog(tolerance=arguments.tolerance)
+        results = log.compare(results, BenchmarkLog.load(arguments.baseline))
+    if arguments.format == "json":
+        print(json.dumps({"results": results,
+                          "imports": benchmark.imports,
+                          "errors": benchmark.errors}, indent=2))
+        return
+    if arguments.format == "csv" or arguments.baseline:
+        print(BenchmarkLog.csv(results), end="")
+    else:
+        print(table(results))
+    report = benchmark.report()
+    if report:
+        print()
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import functools
+import json
+import threading
+import time
+
+from cloudmesh.volume.VolumeTracer import VolumeTracer
+
+
+class InstrumentedClient(object):
+    """
+    A proxy of an SDK client that records its API calls with the
+    ApiProfiler and runs each of them in a span of the VolumeTracer.
+    Attributes that are objects, e.g. the disks of the azure
+    compute client, are proxied as well, so the method of a call is the
+    path of attributes, e.g. disks.create_or_update.
+
+    With execute=True the API call is the execute of a request, as in the
+    google discovery service, where
+
+        service.disks().get(project=..., zone=..., disk=...).execute()
+
+    is recorded as disks.get when execute is called. With profile=False
+    the calls are only traced.
+    """
+
+    basic = (str, bytes, int, float, bool, dict, list, tuple, set,
+             type(None))
+
+    def __init__(self, target, provider, path="", execute=False,
+                 profile=True):
+        self._target = target
+        self._provider = provider
+        self._path = path
+        self._execute = execute
+        self._profile = profile
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        method = f"{self._path}.{name}" if self._path else name
+        if callable(value):
+            if not self._execute:
+                return self._call(value, method)
+            if name == "execute":
+                return self._call(value, self._path)
+            return self._build(value, method)
+        if isinstance(value, InstrumentedClient.basic):
+            return value
+        return InstrumentedClient(value, self._provider, method,
+                                  self._execute, self._profile)
+
+    def _call(self, function, method):
+        provider = self._provider
+        profile = self._profile
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with VolumeTracer.span(f"{provider}.{method}",
+                                       provider=provider, method=method):
+                    result = function(*args, **kwargs)
+            except Exception:
+                if profile:
+                    ApiProfiler.record(provider, method,
+                                       time.perf_counter() - start,
+                                       error=True)
+                raise
+            if profile:
+                ApiProfiler.record(provider, method,
+                                   time.perf_counter() - start,
+                                   size=ApiProfiler.size(result))
+            return result
+
+        return call
+
+    def _build(self, function, method):
+        provider = self._provider
+        profile = self._profile
+
+        @functools.wraps(function)
+        def build(*args, **kwargs):
+            result = function(*args, **kwargs)
+            if isinstance(result, InstrumentedClient.basic):
+                return result
+            return InstrumentedClient(result, provider, method, True,
+                                      profile)
+
+        return build
+
+
+class ApiProfiler(object):
+    """
+    Records the API calls the volume providers make with their SDK clients.
+    The providers wrap their clients, e.g. the boto3 client of aws, with
+
+        self.client = ApiProfiler.wrap(boto3.client(...), "aws")
+
+    which returns the client itself unless the profiler is started, so
+    the calls are only recorded with
+
+        ApiProfiler.start()
+        ...
+        print(ApiProfiler.prometheus())
+
+    or with the --profile option of cms volume. For each provider and
+    method the number of calls, the errors, the retries, i.e. calls that
+    follow a failed call of the same method, the bytes of the responses
+    and a histogram of the latency are kept. The bytes are estimated as
+    the size of the response in json.
+    """
+
+    buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+    enabled = False
+
+    methods = {}
+
+    _failed = set()
+
+    _lock = threading.RLock()
+
+    @classmethod
+    def start(cls):
+        """
+        Starts recording the calls of the clients wrapped from now on
+        """
+        cls.enabled = True
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops recording, the recorded calls are kept
+        """
+        cls.enabled = False
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes the recorded calls
+        """
+        with cls._lock:
+            cls.methods = {}
+            cls._failed = set()
+
+    @classmethod
+    def wrap(cls, client, provider, execute=False):
+        """
+        Wraps an SDK client if the profiler or the VolumeTracer is started.
+        The calls are recorded if the profiler is started.
+
+        :param client: the client
+        :param provider: the kind of the provider, e.g. "aws"
+        :param execute: True if the API calls are made by the execute of
+                        requests, as in the google discovery service
+        :return: InstrumentedClient or the client
+        """
+        if isinstance(client, InstrumentedClient):
+            return client
+        if not cls.enabled and not VolumeTracer.enabled():
+            return client
+        return InstrumentedClient(client, provider, execute=execute,
+                                  profile=cls.enabled)
+
+    @classmethod
+    def record(cls, provider, method, seconds, size=0, error=False):
+        """
+        Records an API call
+
+        :param provider: the kind of the provider
+        :param method: the method of the client
+        :param seconds: the latency of the call
+        :param size: the bytes of the response
+        :param error: True if the call failed
+        """
+        key = (provider, method)
+        with cls._lock:
+            if key not in cls.methods:
+                cls.methods[key] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "bytes": 0,
+                    "seconds": 0.0,
+                    "buckets": [0] * (len(cls.buckets) + 1)
+                }
+            entry = cls.methods[key]
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["bytes"] += size
+            if key in cls._failed:
+                entry["retries"] += 1
+            if error:
+                entry["errors"] += 1
+                cls._failed.add(key)
+            else:
+                cls._failed.discard(key)
+            for i, bound in enumerate(cls.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            else:
+                entry["buckets"][-1] += 1
+
+    @staticmethod
+    def size(result):
+        """
+        Estimates the bytes of a response as the size of its json
+
+        :param result: the response of a call
+        :return: int, 0 if the size is not known
+        """
+        if hasattr(result, "data") and hasattr(result, "status"):
+            result = result.data
+        elif hasattr(result, "as_dict"):
+            result = result.as_dict()
+        elif not isinstance(result, (dict, list, tuple)):
+            return 0
+
+        def default(o):
+            if hasattr(o, "as_dict"):
+                return o.as_dict()
+            if hasattr(o, "__dict__"):
+                return vars(o)
+            return str(o)
+
+        try:
+            return len(json.dumps(result, default=default))
+        except (TypeError, ValueError, RecursionError):
+            return 0
+
+    @classmethod
+    def stats(cls):
+        """
+        The recorded calls
+
+        :return: list of dicts with provider, method, calls, errors,
+                 retries, bytes, seconds and the cumulative buckets of the
+                 latency histogram
+        """
+        result = []
+        with cls._lock:
+            for (provider, method), entry in sorted(cls.methods.items()):
+                buckets = {}
+                count = 0
+                for bound, n in zip(cls.buckets + ["+Inf"],
+                                    entry["buckets"]):
+                    count += n
+                    buckets[str(bound)] = count
+                result.append({
+                    "provider": provider,
+                    "method": method,
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "bytes": entry["bytes"],
+                    "seconds": round(entry["seconds"], 6),
+                    "buckets": buckets
+                })
+        return result
+
+    @classmethod
+    def json(cls):
+        """
+        The recorded calls as json
+
+        :return: string
+        """
+        return json.dumps(cls.stats(), indent=2)
+
+    @classmethod
+    def prometheus(cls):
+        """
+        The recorded calls in the text format of Prometheus
+
+        :return: string
+        """
+        stats = cls.stats()
+        name = "cloudmesh_volume_api"
+        lines = []
+        counters = [
+            ("calls", "calls_total", "API calls of the volume providers"),
+            ("errors", "errors_total", "API calls that failed"),
+            ("retries", "retries_total",
+             "API calls that follow a failed call of the method"),
+            ("bytes", "response_bytes_total",
+             "estimated bytes of the responses")
+        ]
+        for key, metric, description in counters:
+            lines.append(f"# HELP {name}_{metric} {description}")
+            lines.append(f"# TYPE {name}_{metric} counter")
+            for entry in stats:
+                labels = f'provider="{entry["provider"]}",' \
+                         f'method="{entry["method"]}"'
+                lines.append(f"{name}_{metric}{{{labels}}} {entry[key]}")
+        lines.append(f"# HELP {name}_seconds latency of the API calls")
+        lines.append(f"# TYPE {name}_seconds histogram")
+        for entry in stats:
+            labels = f'provider="{entry["provider"]}",' \
+                     f'method="{entry["method"]}"'
+            for bound, count in entry["buckets"].items():
+                lines.append(
+                    f'{name}_seconds_bucket{{{labels},le="{bound}"}} '
+                    f'{count}')
+            lines.append(f"{name}_seconds_sum{{{labels}}} "
+                         f"{entry['seconds']}")
+            lines.append(f"{name}_seconds_count{{{labels}}} "
+                         f"{entry['calls']}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def option(cls, f):
+        """
+        Decorator for do_volume. With --profile the profiler is started
+        for the command and the calls are printed after it, as json with
+        --output=json and in the text format of Prometheus otherwise.
+        """
+
+        @functools.wraps(f)
+        def wrapper(instance, args, arguments):
+            if not arguments.get("--profile"):
+                return f(instance, args, arguments)
+            cls.clear()
+            cls.start()
+            try:
+                return f(instance, args, arguments)
+            finally:
+                cls.stop()
+                if arguments.get("--output") == "json":
+                    print(cls.json())
+                else:
+                    print(cls.prometheus(), end="")
+
+        return wrapper
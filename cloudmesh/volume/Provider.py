@@ -2,8 +2,9 @@ from cloudmesh.common.Printer import Printer
 from cloudmesh.common.console import Console
 from cloudmesh.common.variables import Variables
 from cloudmesh.configuration.Config import Config
-from cloudmesh.mongo.DataBaseDecorator import DatabaseUpdate
-from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeCache import VolumeCache
+from cloudmesh.volume.VolumeTracer import VolumeTracer
+from cloudmesh.volume.VolumeUpdate import VolumeUpdate
 
 
 # class Provider(VolumeABC): # correct
@@ -22,7 +23,8 @@ class Provider(object):  # broken
                 "azure",
                 "google",
                 "openstack",
-                "oracle"]
+                "oracle",
+                "fake"]
         return kind
 
     @staticmethod
@@ -52,6 +54,9 @@ class Provider(object):  # broken
         elif kind == "oracle":
             from cloudmesh.volume.oracle.Provider import Provider as P
 
+        elif kind == "fake":
+            from cloudmesh.volume.fake.Provider import Provider as P
+
         else:
             Console.error(f"Compute provider {kind} not supported")
 
@@ -75,12 +80,14 @@ class Provider(object):  # broken
         if output == "table":
             order = self.provider.output[kind]['order']
             header = self.provider.output[kind]['header']
+            sort_keys = self.provider.output[kind].get('sort_keys',
+                                                       ["name"])
             if 'humanize' in self.provider.output[kind]:
                 humanize = self.provider.output[kind]['humanize']
             else:
                 humanize = None
             print(Printer.flatwrite(data,
-                                    sort_keys=["name"],
+                                    sort_keys=sort_keys,
                                     order=order,
                                     header=header,
                                     output=output,
@@ -101,20 +108,36 @@ class Provider(object):  # broken
         except:
             Console.error(f"provider {name} not found in {configuration}")
             raise ValueError(f"provider {name} not found in {configuration}")
+        VolumeTracer.configure()
         P = None
         if self.kind in ["multipass",
                          "aws",
                          "azure",
                          "google",
                          "openstack",
-                         "oracle"]:
+                         "oracle",
+                         "fake"]:
             P = Provider.get_provider(self.kind)
         if P is None:
             Console.error(f"provider {name} not supported")
             raise ValueError(f"provider {name} not supported")
         self.provider = P(self.cloud)
+        #
+        # a provider that keeps its volumes in an embedded database, e.g.
+        # multipass with database: sqlite, is listed without the cache,
+        # which is kept in MongoDB
+        #
+        repository = getattr(self.provider, "repository", None)
+        if getattr(repository, "database", "mongo") != "mongo":
+            self.cache = None
+        else:
+            self.cache = VolumeCache(cloud=self.cloud,
+                                     kind=self.kind,
+                                     provider=self.provider,
+                                     spec=self.spec)
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.create")
+    @VolumeUpdate()
     def create(self, **kwargs):
         """
         Create a volume.
@@ -134,19 +157,35 @@ class Provider(object):  # broken
             raise ValueError("Volume could not be created")
         return data
 
-    @DatabaseUpdate()
     def delete(self, name=None):
         """
         Delete volumes.
         If name is not given, delete the most recent volume.
+        After the volume is deleted in the cloud its record in the cache is
+        tombstoned. If the provider did not delete it, or the deleted volume
+        can not be identified, the cache is refreshed.
 
         :param name: List of volume name
         :return:
         """
+        d = self._delete(name=name)
+        if self.cache is not None:
+            self.cache.deleted(d)
+        return d
+
+    @VolumeTracer.traced("volume.delete")
+    @VolumeUpdate()
+    def _delete(self, name=None):
+        """
+        Delete a volume in the cloud and update its record in the database
+
+        :param name: volume name
+        :return: dict
+        """
         d = self.provider.delete(name)
         return d
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.list")
     def list(self, **kwargs):
         """
         This command list all volumes as follows:
@@ -159,14 +198,44 @@ class Provider(object):  # broken
         attaching to the vm. If region is given, under the current cloud,
         list all volumes in that region.
 
+        The volumes are read from the cache in MongoDB. The cloud is only
+        contacted if refresh is set or the cached listing is older than
+        max_age, which defaults to the ttl of the cloud. With refresh the
+        numbers of inserted, updated, unchanged and deleted volumes are
+        printed. Without a cache the volumes are listed by the provider.
+
+        The used space of multipass volumes is updated on every list. With
+        refresh all directories of the volumes are read again.
+
         :param names: List of volume names
         :param vm: The name of the virtual machine
         :param region:  The name of the region
         :param cloud: The name of the cloud
         :param refresh: If refresh the information is taken from the cloud
+        :param max_age: The maximum age of the cached volumes in seconds
         :return: dict
         """
-        data = self.provider.list(**kwargs)
+        if self.cache is None:
+            data = self.provider.list(refresh=kwargs.get("refresh") or False,
+                                      NAME=kwargs.get("NAME"),
+                                      NAMES=kwargs.get("NAMES"),
+                                      vm=kwargs.get("vm"),
+                                      region=kwargs.get("region"))
+        else:
+            data = self.cache.list(refresh=kwargs.get("refresh") or False,
+                                   max_age=kwargs.get("max_age"),
+                                   NAME=kwargs.get("NAME"),
+                                   NAMES=kwargs.get("NAMES"),
+                                   vm=kwargs.get("vm"),
+                                   region=kwargs.get("region"))
+            changes = self.cache.changes
+            if kwargs.get("refresh") and changes:
+                Console.ok(f"{self.cloud}: {changes['inserted']} inserted, "
+                           f"{changes['updated']} updated, "
+                           f"{changes['unchanged']} unchanged, "
+                           f"{changes['deleted']} deleted")
+        if self.kind == "multipass":
+            data = self.provider.scan(data, force=kwargs.get("refresh"))
         return data
 
     def info(self, name=None):
@@ -177,7 +246,7 @@ class Provider(object):  # broken
         :param name: volume name to match
         :return: dict
         """
-        volumes = self.provider.list()
+        volumes = self.list(NAME=name)
         for volume in volumes:
             if volume["cm"]["name"] == name:
                 return volume
@@ -192,7 +261,8 @@ class Provider(object):  # broken
         """
         return self.info(name=name)
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.status")
+    @VolumeUpdate()
     def status(self, name=None):
         """
         This function returns status of volume, such as "available", "in-use"
@@ -204,7 +274,8 @@ class Provider(object):  # broken
         volume_status = self.provider.status(name)
         return volume_status
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.attach")
+    @VolumeUpdate()
     def attach(self, names=None, vm=None):
         """
         Attach volume to a vm.
@@ -217,7 +288,8 @@ class Provider(object):  # broken
         result = self.provider.attach(names, vm)
         return result
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.detach")
+    @VolumeUpdate()
     def detach(self, name=None):
         """
         Detach volumes from vm.
@@ -234,7 +306,8 @@ class Provider(object):  # broken
             raise ValueError("Volume could not be detached")
         return result
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.add_tag")
+    @VolumeUpdate()
     def add_tag(self, **kwargs):
         """
         This function add tag to a volume.
@@ -255,7 +328,8 @@ class Provider(object):  # broken
             raise ValueError("Tag could not be added")
         return result
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.migrate")
+    @VolumeUpdate()
     def migrate(self, **kwargs):
         """
         Migrate volume from one vm to another vm in the same cloud service.
@@ -270,7 +344,8 @@ class Provider(object):  # broken
             raise ValueError("Volume could not be migrate")
         return result
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.sync")
+    @VolumeUpdate()
     def sync(self, **kwargs):
         """
         synchronize one volume with another volume in the same cloud service.
@@ -284,23 +359,74 @@ class Provider(object):  # broken
             raise ValueError("Volume could not be synchronized")
         return result
 
-    @DatabaseUpdate()
+    @VolumeTracer.traced("volume.verify")
+    @VolumeUpdate()
+    def verify(self, **kwargs):
+        """
+        Build the content-hash manifest of a volume, or compare the
+        manifests of two volumes in the same cloud service.
+
+        :param names (list): list of one or two volume names
+        :return: dict
+        """
+        try:
+            result = self.provider.verify(**kwargs)
+        except NotImplementedError:
+            raise ValueError(f"verify is not supported for {self.kind}")
+        if result is None:
+            raise ValueError("Volume could not be verified")
+        return result
+
+    @VolumeTracer.traced("volume.snapshot")
+    @VolumeUpdate()
+    def snapshot(self, **kwargs):
+        """
+        Take a snapshot of a volume
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name
+        :return: dict
+        """
+        try:
+            result = self.provider.snapshot(**kwargs)
+        except NotImplementedError:
+            raise ValueError(f"snapshot is not supported for {self.kind}")
+        if result is None:
+            raise ValueError("Snapshot could not be taken")
+        return result
+
+    @VolumeTracer.traced("volume.restore")
+    @VolumeUpdate()
+    def restore(self, **kwargs):
+        """
+        Restore a snapshot of a volume
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name, defaults to the last
+        :param path (string): the directory to restore into
+        :return: dict
+        """
+        try:
+            result = self.provider.restore(**kwargs)
+        except NotImplementedError:
+            raise ValueError(f"restore is not supported for {self.kind}")
+        if result is None:
+            raise ValueError("Snapshot could not be restored")
+        return result
+
+    @VolumeTracer.traced("volume.purge")
     def purge(self, **kwargs):
         """
-        purge deleted volumes in MongoDB database
+        purge deleted volumes in MongoDB database. Removes the records that
+        were tombstoned when the volumes disappeared from the cloud, as well
+        as the records the provider itself marks as deleted.
 
         :return: dict
         """
-        collection = f"{self.cloud}-volume"
-        self.cm = CmDatabase()
-        if self.cloud == 'aws' or self.cloud == 'multipass':
-            self.cm.collection(collection).delete_many({"State": "deleted"})
-        elif self.cloud == 'oracle':
-            self.cm.collection(collection).delete_many(
-                {"lifecycle_state": "deleted"})
-        elif self.cloud == 'azure':
-            self.cm.collection(collection).delete_many(
-                {"disk_state": "deleted"})
-        elif self.cm.cloud == 'google' or self.cloud == 'openstack':
-            self.cm.collection(collection).delete_many({"status": "deleted"})
-        return self.provider.list()
+        if self.cache is not None:
+            self.cache.reconciler.purge()
+        try:
+            self.provider.purge(**kwargs)
+        except NotImplementedError:
+            pass
+        return self.list()
@@ -0,0 +1,520 @@
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+
+from cloudmesh.common.util import path_expand
+
+
+class SqliteVolumeRepository(object):
+    """
+    Access to the volume records of a single cloud in an embedded SQLite
+    database. It has the interface of VolumeRepository, so a provider can
+    keep its volumes without a running MongoDB, e.g. multipass on a laptop
+    or in CI.
+
+    The database is a file per cloud, by default
+
+        ~/.cloudmesh/volume/<cloud>.db
+
+    It is opened in WAL mode, so readers do not block the writer. A record
+    is stored as json. The fields the providers query
+
+        cm.name, State, cm.state, path, cm.region, cm.deleted,
+        AttachedToVm and cm.attached_vms
+
+    are kept in indexed columns, the vms in a table of their own. The
+    records selected with the indexes are matched against the whole query,
+    so fields of a query without a column are supported as well. The
+    supported operators are equality, $in and $ne. Datetimes are stored as
+    ISO strings.
+
+    Writes run in an immediate transaction and increment cm.version, as in
+    VolumeRepository, so they are atomic also between processes.
+    """
+
+    database = "sqlite"
+
+    retries = 10
+
+    directory = "~/.cloudmesh/volume"
+
+    #
+    # the fields of a query that map to indexed columns
+    #
+    columns = {
+        "cm.name": "name",
+        "State": "state",
+        "cm.state": "cm_state",
+        "path": "path",
+        "cm.region": "region",
+        "cm.deleted": "deleted",
+    }
+
+    vm_fields = ["AttachedToVm", "cm.attached_vms"]
+
+    schema = [
+        "CREATE TABLE IF NOT EXISTS volume ("
+        " name TEXT PRIMARY KEY,"
+        " state TEXT,"
+        " cm_state TEXT,"
+        " path TEXT,"
+        " region TEXT,"
+        " deleted INTEGER NOT NULL DEFAULT 0,"
+        " data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS volume_vm ("
+        " name TEXT NOT NULL,"
+        " vm TEXT NOT NULL,"
+        " PRIMARY KEY (name, vm)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS volume_state ON volume (state)",
+        "CREATE INDEX IF NOT EXISTS volume_cm_state ON volume (cm_state)",
+        "CREATE INDEX IF NOT EXISTS volume_path ON volume (path)",
+        "CREATE INDEX IF NOT EXISTS volume_region ON volume (region)",
+        "CREATE INDEX IF NOT EXISTS volume_vm_vm ON volume_vm (vm)",
+    ]
+
+    def __init__(self, cloud=None, kind=None, path=None):
+        """
+        Initialize the repository for the volumes of a cloud
+
+        :param cloud: name of the cloud
+        :param kind: kind of the cloud, e.g. "multipass"
+        :param path: the database file, defaults to
+                     ~/.cloudmesh/volume/<cloud>.db
+        """
+        self.cloud = cloud
+        self.kind = kind
+        self.name = f"{cloud}-volume"
+        self.path = path_expand(
+            path or f"{SqliteVolumeRepository.directory}/{cloud}.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            for statement in SqliteVolumeRepository.schema:
+                self.db.execute(statement)
+
+    def close(self):
+        self.db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """
+        A write transaction. The database is locked for other writers
+        when the transaction starts, so records read in it do not change
+        until it is committed.
+        """
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.db.rollback()
+                raise
+            self.db.commit()
+
+    @staticmethod
+    def _get(entry, field):
+        value = entry
+        for key in field.split("."):
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    @staticmethod
+    def _set(entry, field, value):
+        keys = field.split(".")
+        for key in keys[:-1]:
+            entry = entry.setdefault(key, {})
+        entry[keys[-1]] = value
+
+    @staticmethod
+    def _match(value, condition):
+        """
+        Matches a value like MongoDB does. A list matches if one of its
+        elements matches.
+        """
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$in":
+                    if isinstance(value, list):
+                        if not any(v in operand for v in value):
+                            return False
+                    elif value not in operand:
+                        return False
+                elif operator == "$ne":
+                    if SqliteVolumeRepository._match(value, operand):
+                        return False
+                else:
+                    raise ValueError(f"operator {operator} not supported")
+            return True
+        if isinstance(value, list):
+            return condition in value or value == condition
+        return value == condition
+
+    @staticmethod
+    def matches(entry, query):
+        """
+        Checks if a record matches a query
+
+        :param entry: the record
+        :param query: dict of fields to values or conditions
+        :return: boolean
+        """
+        return all(SqliteVolumeRepository._match(
+            SqliteVolumeRepository._get(entry, field), condition)
+            for field, condition in (query or {}).items())
+
+    @staticmethod
+    def _condition(column, condition, args):
+        """
+        Translates the condition of a field to SQL
+
+        :return: the SQL expression or None if it can not be translated
+        """
+        if column == "deleted":
+            if condition is True:
+                return "deleted = 1"
+            if condition == {"$ne": True}:
+                return "deleted = 0"
+            return None
+        if isinstance(condition, dict):
+            if list(condition.keys()) == ["$in"]:
+                values = list(condition["$in"])
+                if not values:
+                    return "0"
+                args.extend(values)
+                return f"{column} IN ({','.join('?' * len(values))})"
+            if list(condition.keys()) == ["$ne"] and \
+                    not isinstance(condition["$ne"], (dict, list)):
+                args.append(condition["$ne"])
+                return f"({column} IS NULL OR {column} != ?)"
+            return None
+        if isinstance(condition, (list, bool)) or condition is None:
+            return None
+        args.append(condition)
+        return f"{column} = ?"
+
+    def _select(self, query):
+        """
+        Translates a query to SQL. The indexed fields are translated, the
+        query is checked against the selected records afterwards.
+
+        :return: the SQL statement and its arguments
+        """
+        where = []
+        args = []
+        for field, condition in (query or {}).items():
+            if field in SqliteVolumeRepository.columns:
+                sql = self._condition(
+                    SqliteVolumeRepository.columns[field], condition, args)
+            elif field in SqliteVolumeRepository.vm_fields:
+                sub = []
+                sql = self._condition("vm", condition, sub)
+                if sql is not None:
+                    args.extend(sub)
+                    sql = f"name IN (SELECT name FROM volume_vm " \
+                          f"WHERE {sql})"
+            else:
+                sql = None
+            if sql is not None:
+                where.append(sql)
+        statement = "SELECT data FROM volume"
+        if where:
+            statement += " WHERE " + " AND ".join(where)
+        return statement, args
+
+    @staticmethod
+    def projection(entry, fields=None):
+        """
+        Reduces a record to a list of fields
+
+        :param entry: the record
+        :param fields: list of field names, e.g. ["path", "cm.name"]
+        :return: dict
+        """
+        if not fields:
+            return entry
+        result = {}
+        for field in fields:
+            value = entry
+            keys = field.split(".")
+            for key in keys:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                target = result
+                for key in keys[:-1]:
+                    target = target.setdefault(key, {})
+                target[keys[-1]] = value
+        return result
+
+    def find(self, query=None, fields=None):
+        """
+        Find the volumes matching a query
+
+        :param query: MongoDB query
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        statement, args = self._select(query)
+        with self._lock:
+            rows = self.db.execute(statement, args).fetchall()
+        result = []
+        for (data,) in rows:
+            entry = json.loads(data)
+            if self.matches(entry, query):
+                result.append(self.projection(entry, fields))
+        return result
+
+    def find_one(self, name, fields=None):
+        """
+        Find a volume by name
+
+        :param name: volume name
+        :param fields: list of fields to return
+        :return: dict or None
+        """
+        result = self.find_name(name, fields=fields)
+        return result[0] if result else None
+
+    def find_name(self, name, fields=None):
+        """
+        Find a volume by name. The result is a list like the one of
+        CmDatabase.find_name.
+
+        :param name: volume name
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        return self.find({"cm.name": name}, fields=fields)
+
+    def find_names(self, names, fields=None):
+        """
+        Find volumes by name
+
+        :param names: list of volume names
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        if type(names) == str:
+            names = [names]
+        return self.find({"cm.name": {"$in": list(names)}}, fields=fields)
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        raise TypeError(f"{type(value)} is not serializable")
+
+    def _load(self, name):
+        row = self.db.execute("SELECT data FROM volume WHERE name = ?",
+                              (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, entry):
+        """
+        Writes a record with its indexed columns and vms
+        """
+        name = entry["cm"]["name"]
+        values = {column: self._get(entry, field)
+                  for field, column in self.columns.items()}
+        values["deleted"] = int(bool(values["deleted"]))
+        values["data"] = json.dumps(entry, default=self._default)
+        vms = set(self._get(entry, "cm.attached_vms") or []) | \
+            set(entry.get("AttachedToVm") or [])
+        self.db.execute(
+            f"INSERT OR REPLACE INTO volume ({', '.join(values)}) "
+            f"VALUES ({', '.join('?' * len(values))})",
+            list(values.values()))
+        self.db.execute("DELETE FROM volume_vm WHERE name = ?", (name,))
+        self.db.executemany(
+            "INSERT INTO volume_vm (name, vm) VALUES (?, ?)",
+            [(name, vm) for vm in sorted(vms)])
+
+    @staticmethod
+    def keys(entry):
+        """
+        The fields of an entry, the fields of its cm as "cm.<field>"
+
+        :param entry: dict
+        :return: set of field names
+        """
+        return {key for key in entry if key != "cm"} | \
+            {f"cm.{key}" for key in entry["cm"]}
+
+    def _write(self, entry, removed=None):
+        """
+        Writes an entry and increments its version. An entry without
+        cm.version replaces the stored record, only the fields of the
+        stored cm it does not have are kept. An entry with cm.version is
+        a changed record read with modify, its fields replace the ones of
+        the stored record and the removed fields are deleted. Must be
+        called in a transaction.
+
+        :param entry: dict
+        :param removed: the fields the change removed, see keys
+        :return: False if the version of the entry is outdated
+        """
+        cm = entry["cm"]
+        stored = self._load(cm["name"])
+        if "version" in cm and (stored is None or stored["cm"].get(
+                "version") != cm["version"]):
+            return False
+        if stored is None:
+            stored = {"cm": {}}
+        elif "version" not in cm:
+            #
+            # a volume that is created again is no longer deleted
+            #
+            stored = {"cm": {key: value for key, value in stored["cm"].items()
+                             if key not in ["deleted", "deleted_at"]}}
+        now = str(datetime.datetime.utcnow())
+        cm["created"] = stored["cm"].get("created", now)
+        cm["modified"] = now
+        cm["collection"] = self.name
+        cm["version"] = (stored["cm"].get("version") or 0) + 1
+        entry.pop("_id", None)
+        for key in removed or []:
+            if key.startswith("cm."):
+                stored["cm"].pop(key[3:], None)
+            else:
+                stored.pop(key, None)
+        stored.update({key: value for key, value in entry.items()
+                       if key != "cm"})
+        stored["cm"].update(cm)
+        self._store(stored)
+        return True
+
+    def update(self, entries):
+        """
+        Inserts or updates volumes. An entry without cm.version is inserted
+        or replaces the stored record, keeping the fields of the stored cm
+        the entry does not have. An entry with
+        cm.version is only written if the stored record still has this
+        version. Otherwise the stored record is newer and is returned
+        instead of the entry.
+
+        :param entries: a dict or a list of dicts
+        :return: list of the stored dicts
+        """
+        if type(entries) == dict:
+            entries = [entries]
+        result = []
+        with self._transaction():
+            for entry in entries:
+                if entry is None:
+                    continue
+                if self._write(entry):
+                    result.append(entry)
+                else:
+                    result.append(self._load(entry["cm"]["name"]))
+        return result
+
+    def _update(self, name, function, changes=None, fields=None):
+        """
+        Changes the lists of a volume in a transaction and increments its
+        version
+
+        :return: the updated dict or None if the volume does not exist
+        """
+        with self._transaction():
+            entry = self._load(name)
+            if entry is None:
+                return None
+            function(entry)
+            for field, value in (changes or {}).items():
+                self._set(entry, field, value)
+            entry["cm"]["modified"] = str(datetime.datetime.utcnow())
+            entry["cm"]["version"] = (entry["cm"].get("version") or 0) + 1
+            self._store(entry)
+        return self.projection(entry, fields)
+
+    def add_to_set(self, name, values, changes=None, fields=None):
+        """
+        Adds values to list fields of a volume atomically, values that are
+        already in a list are not added again
+
+        :param name: volume name
+        :param values: dict of list fields to the values to add, e.g.
+                       {"AttachedToVm": ["vm1"]}
+        :param changes: dict of fields to set in the same update
+        :param fields: list of fields to return
+        :return: the updated dict or None if the volume does not exist
+        """
+        def _add(entry):
+            for field, value in values.items():
+                current = self._get(entry, field) or []
+                self._set(entry, field,
+                          current + [v for v in value if v not in current])
+
+        return self._update(name, _add, changes=changes, fields=fields)
+
+    def pull(self, name, values, changes=None, fields=None):
+        """
+        Removes values from list fields of a volume atomically
+
+        :param name: volume name
+        :param values: dict of list fields to the values to remove
+        :param changes: dict of fields to set in the same update
+        :param fields: list of fields to return
+        :return: the updated dict or None if the volume does not exist
+        """
+        def _remove(entry):
+            for field, value in values.items():
+                current = self._get(entry, field) or []
+                self._set(entry, field,
+                          [v for v in current if v not in value])
+
+        return self._update(name, _remove, changes=changes, fields=fields)
+
+    def modify(self, name, function, fields=None):
+        """
+        Changes a volume with compare and swap. The volume is read, changed
+        by function and written if its version did not change in between.
+        Otherwise it is read again and function is applied to the newer
+        record.
+
+        :param name: volume name
+        :param function: gets the dict of the volume and returns the changed
+                         dict, or None to leave the volume unchanged
+        :param fields: list of fields read, must include cm
+        :return: the written dict or None if the volume does not exist
+        """
+        for _ in range(self.retries):
+            entry = self.find_one(name, fields=fields)
+            if entry is None:
+                return None
+            entry["cm"].setdefault("version", None)
+            keys = self.keys(entry)
+            changed = function(entry)
+            if changed is None:
+                return entry
+            with self._transaction():
+                if self._write(changed,
+                               removed=keys - self.keys(changed)):
+                    return changed
+        raise ValueError(f"volume {name} was changed concurrently "
+                         f"{self.retries} times")
+
+    def delete_many(self, query=None):
+        """
+        Removes the volumes matching a query
+
+        :param query: MongoDB query
+        :return: number of removed records
+        """
+        names = [entry["cm"]["name"]
+                 for entry in self.find(query, fields=["cm.name"])]
+        with self._transaction():
+            for name in names:
+                self.db.execute("DELETE FROM volume WHERE name = ?", (name,))
+                self.db.execute("DELETE FROM volume_vm WHERE name = ?",
+                                (name,))
+        return len(names)
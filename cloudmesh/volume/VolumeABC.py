@@ -155,6 +155,37 @@ class VolumeABC(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def verify(self, **kwargs):
+        """
+        This function builds the content-hash manifest of one volume, or
+        compares the manifests of two volumes in the same cloud service.
+
+        :param NAMES (list): list of one or two volume names
+        :return: dict
+        """
+        raise NotImplementedError
+
+    def snapshot(self, **kwargs):
+        """
+        This function takes a snapshot of a volume
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name
+        :return: dict
+        """
+        raise NotImplementedError
+
+    def restore(self, **kwargs):
+        """
+        This function restores a snapshot of a volume
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name
+        :param path (string): the directory to restore into
+        :return: dict
+        """
+        raise NotImplementedError
+
     def purge(self, **kwargs):
         """
         This function purge all the deleted volume in MongoDB database
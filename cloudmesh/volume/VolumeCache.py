@@ -0,0 +1,364 @@
+import threading
+import time
+
+from cloudmesh.common.console import Console
+from cloudmesh.common.parameter import Parameter
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeIndex import VolumeIndex
+from cloudmesh.volume.VolumeReconciler import VolumeReconciler
+from cloudmesh.volume.VolumeTracer import VolumeTracer
+
+
+class VolumeCache(object):
+    """
+    Read-through cache in front of the list function of a volume provider.
+
+    The volumes of a cloud are kept in the MongoDB collection
+    "<cloud>-volume". Every record carries the time it was fetched from the
+    cloud in cm.fetched_at (seconds since the epoch). A listing is answered
+    from the collection as long as the last full listing of the cloud is
+    younger than the time to live (ttl) of the cloud. Otherwise the provider
+    is asked for a full listing, which is reconciled with the collection
+    before the query is answered. Volumes that disappeared from the cloud
+    are tombstoned and no longer listed.
+
+    Concurrent refreshes of the same cloud are coalesced. Within a process
+    only one thread lists the cloud while the others wait for its result.
+    Between processes a lease stored in the "volume-cache" collection makes
+    sure only one cms process lists the cloud at a time.
+
+    The records hold the canonical fields of VolumeRecord. The payload of
+    the provider is only stored if cloudmesh.volume.<cloud>.cm.raw is True.
+
+    The ttl is read from cloudmesh.volume.<cloud>.cm.ttl and defaults to the
+    value in VolumeCache.ttl for the kind of the cloud. A ttl of None means
+    the records never expire, which is the case for multipass where the
+    database is the only source of truth. For such authoritative kinds a
+    refresh does not list anything.
+
+    The contention of the refreshes in this process is counted in
+    VolumeCache.contention: the listings of the clouds, the refreshes that
+    were coalesced with another one, and the seconds spent waiting for the
+    lock of a cloud and for the lease of another process.
+    """
+
+    collection = "volume-cache"
+
+    ttl = {
+        "multipass": None,
+        "aws": 60,
+        "azure": 60,
+        "google": 60,
+        "openstack": 60,
+        "oracle": 60,
+        "fake": 60,
+    }
+
+    lease = 120
+
+    authoritative = VolumeReconciler.authoritative
+
+    #
+    # the canonical fields of VolumeRecord a filter of the list function
+    # is matched against
+    #
+    query_fields = {
+        "vm": "cm.attached_vms",
+        "region": "cm.region",
+    }
+
+    contention = {
+        "refreshes": 0,
+        "coalesced": 0,
+        "lock_wait": 0.0,
+        "lease_wait": 0.0,
+    }
+
+    _locks = {}
+    _generation = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, cloud=None, kind=None, provider=None, spec=None):
+        """
+        Initialize the cache for a cloud
+
+        :param cloud: name of the cloud
+        :param kind: kind of the cloud, e.g. "aws"
+        :param provider: the provider object that lists the cloud
+        :param spec: the cloudmesh.volume.<cloud> dict of the configuration
+        """
+        self.cloud = cloud
+        self.kind = kind
+        self.provider = provider
+        self.cm = CmDatabase()
+        self.volumes = f"{cloud}-volume"
+        raw = spec.get("cm", {}).get("raw") if spec is not None else None
+        self.raw = raw in [True, "True", "true"]
+        self.reconciler = VolumeReconciler(cloud=cloud, kind=kind,
+                                           raw=self.raw)
+        VolumeIndex(cloud=cloud, kind=kind).ensure()
+        self.changes = None
+        ttl = VolumeCache.ttl.get(kind, 60)
+        if spec is not None and "ttl" in spec.get("cm", {}):
+            ttl = spec["cm"]["ttl"]
+            ttl = None if ttl in [None, "None", "none"] else float(ttl)
+        self.ttl = ttl
+
+    def _lock(self):
+        """
+        returns the lock that serializes refreshes of the cloud within
+        this process
+
+        :return: threading.Lock
+        """
+        with VolumeCache._locks_lock:
+            if self.cloud not in VolumeCache._locks:
+                VolumeCache._locks[self.cloud] = threading.Lock()
+            return VolumeCache._locks[self.cloud]
+
+    @classmethod
+    def count(cls, key, value=1):
+        """
+        Adds to a counter of the contention
+
+        :param key: the counter, e.g. "lock_wait"
+        :param value: the number or seconds added
+        """
+        with cls._locks_lock:
+            cls.contention[key] += value
+
+    @classmethod
+    def statistics(cls, reset=False):
+        """
+        The counters of the contention
+
+        :param reset: if True the counters are set to 0
+        :return: dict
+        """
+        with cls._locks_lock:
+            result = dict(cls.contention)
+            if reset:
+                for key in cls.contention:
+                    cls.contention[key] = type(cls.contention[key])(0)
+        return result
+
+    def fetched_at(self):
+        """
+        The time of the last full listing of the cloud
+
+        :return: seconds since the epoch or None
+        """
+        marker = self.cm.collection(VolumeCache.collection).find_one(
+            {"cloud": self.cloud}, {"_id": 0, "fetched_at": 1})
+        if marker is None:
+            return None
+        return marker.get("fetched_at")
+
+    def age(self):
+        """
+        The age of the cached listing of the cloud
+
+        :return: age in seconds or None if the cloud was never listed
+        """
+        fetched_at = self.fetched_at()
+        if fetched_at is None:
+            return None
+        return time.time() - fetched_at
+
+    def is_fresh(self, max_age=None):
+        """
+        Checks if the cached listing can be used
+
+        :param max_age: the maximum age in seconds, defaults to the ttl
+        :return: boolean
+        """
+        max_age = self.ttl if max_age is None else float(max_age)
+        if self.kind in VolumeCache.authoritative and max_age is None:
+            return True
+        age = self.age()
+        if age is None:
+            return False
+        return max_age is None or age <= max_age
+
+    def _acquire_lease(self):
+        """
+        Acquires the lease for listing the cloud between processes
+
+        :return: True if the lease was acquired
+        """
+        col = self.cm.collection(VolumeCache.collection)
+        now = time.time()
+        col.update_one({"cloud": self.cloud},
+                       {"$setOnInsert": {"fetched_at": None, "lease": 0}},
+                       upsert=True)
+        r = col.update_one({"cloud": self.cloud, "lease": {"$lt": now}},
+                           {"$set": {"lease": now + VolumeCache.lease}})
+        return r.modified_count == 1
+
+    def _release_lease(self, fetched_at=None):
+        """
+        Releases the lease and records the time of the listing
+
+        :param fetched_at: the time the listing was fetched, None if the
+                           listing failed
+        """
+        update = {"lease": 0}
+        if fetched_at is not None:
+            update["fetched_at"] = fetched_at
+        self.cm.collection(VolumeCache.collection).update_one(
+            {"cloud": self.cloud}, {"$set": update})
+
+    def _wait_for_lease(self, before):
+        """
+        Waits until the process holding the lease finished the listing
+
+        :param before: the time of the last listing before waiting
+        :return: True if a newer listing is available
+        """
+        timeout = time.time() + VolumeCache.lease
+        while time.time() < timeout:
+            time.sleep(0.5)
+            marker = self.cm.collection(VolumeCache.collection).find_one(
+                {"cloud": self.cloud}, {"_id": 0})
+            if marker is None:
+                return False
+            if marker.get("fetched_at") != before:
+                return True
+            if marker.get("lease", 0) < time.time():
+                return False
+        return False
+
+    def store(self, data, fetched_at=None):
+        """
+        Reconciles a full listing with the volume collection of the cloud
+        and stamps each record with the time it was fetched
+
+        :param data: list of volume dicts as returned by the provider
+        :param fetched_at: the time of the listing, defaults to now
+        :return: dict with the counts of inserted, updated, unchanged and
+                 deleted records, which are also set as attributes of the
+                 volume.reconcile span
+        """
+        if data is None:
+            return None
+        if type(data) == dict:
+            data = [data]
+        with VolumeTracer.span("volume.reconcile", cloud=self.cloud) as span:
+            self.changes = self.reconciler.reconcile(data,
+                                                     fetched_at=fetched_at)
+            for key, value in self.changes.items():
+                span.set_attribute(f"volume.{key}", value)
+        return self.changes
+
+    def deleted(self, data):
+        """
+        Updates the cache after a delete in the cloud. The records of the
+        deleted volumes are tombstoned. If the result of the delete holds a
+        volume that is not deleted, or no volume at all, the cache is
+        refreshed instead. The records of authoritative kinds are updated by
+        their providers.
+
+        :param data: the volume dicts returned by the delete
+        :return: number of tombstoned records
+        """
+        if self.kind in VolumeCache.authoritative:
+            return 0
+        if type(data) == dict:
+            data = [data]
+        data = [entry for entry in data or [] if entry is not None]
+        count = self.reconciler.tombstone(data)
+        if count == 0 or count < len(data):
+            self.refresh()
+        return count
+
+    def refresh(self):
+        """
+        Lists all volumes of the cloud and writes them into the cache.
+        Refreshes that run at the same time are coalesced, only one listing
+        of the cloud is in flight.
+
+        :return: the time the cache was last refreshed
+        """
+        generation = VolumeCache._generation.get(self.cloud, 0)
+        self.changes = None
+        start = time.perf_counter()
+        with self._lock():
+            VolumeCache.count("lock_wait", time.perf_counter() - start)
+            #
+            # another thread refreshed while we were waiting for the lock
+            #
+            if VolumeCache._generation.get(self.cloud, 0) != generation:
+                VolumeCache.count("coalesced")
+                return self.fetched_at()
+            before = self.fetched_at()
+            start = time.perf_counter()
+            while not self._acquire_lease():
+                #
+                # another process is listing the cloud
+                #
+                if self._wait_for_lease(before):
+                    VolumeCache.count("lease_wait",
+                                      time.perf_counter() - start)
+                    VolumeCache.count("coalesced")
+                    return self.fetched_at()
+            VolumeCache.count("lease_wait", time.perf_counter() - start)
+            VolumeCache.count("refreshes")
+            fetched_at = None
+            try:
+                fetched_at = time.time()
+                if self.kind not in VolumeCache.authoritative:
+                    data = self.provider.list(refresh=True, NAME=None,
+                                              NAMES=None, vm=None,
+                                              region=None)
+                    self.store(data, fetched_at=fetched_at)
+            except Exception as e:
+                fetched_at = None
+                Console.error(f"could not refresh the volumes of {self.cloud}")
+                raise e
+            finally:
+                self._release_lease(fetched_at=fetched_at)
+            VolumeCache._generation[self.cloud] = generation + 1
+        return fetched_at
+
+    def query(self, **kwargs):
+        """
+        Creates the MongoDB query for the filters of the list function
+
+        :param NAME: name of volume
+        :param NAMES: list of volume names
+        :param vm: name of vm
+        :param region: name of region
+        :return: dict
+        """
+        fields = VolumeCache.query_fields
+        query = {"cm.deleted": {"$ne": True}}
+        names = kwargs.get("NAMES")
+        if kwargs.get("NAME"):
+            query["cm.name"] = kwargs["NAME"]
+        elif names:
+            if type(names) == str:
+                names = Parameter.expand(names)
+            query["cm.name"] = {"$in": list(names)}
+        for key in ["vm", "region"]:
+            if kwargs.get(key):
+                query[fields[key]] = kwargs[key]
+        return query
+
+    def list(self, refresh=False, max_age=None, **kwargs):
+        """
+        Lists the volumes of the cloud from the cache. The cache is refreshed
+        first if refresh is True or the cached listing is older than max_age.
+
+        :param refresh: If True the information is taken from the cloud
+        :param max_age: the maximum age of the cached listing in seconds,
+                        defaults to the ttl of the cloud
+        :param NAME: name of volume
+        :param NAMES: list of volume names
+        :param vm: name of vm
+        :param region: name of region
+        :return: list of dicts
+        """
+        if refresh or not self.is_fresh(max_age=max_age):
+            self.refresh()
+        return self.cm.find(collection=self.volumes,
+                            query=self.query(**kwargs))
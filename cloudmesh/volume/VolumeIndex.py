@@ -0,0 +1,107 @@
+import threading
+
+from pymongo import ASCENDING
+from cloudmesh.mongo.CmDatabase import CmDatabase
+
+
+class VolumeIndex(object):
+    """
+    Creates the secondary indexes of the "<cloud>-volume" collections.
+
+    The cached queries of the providers look up volumes by cm.name, by the
+    vm they are attached to and by region. Without indexes each lookup is a
+    collection scan. The indexes are created the first time a collection is
+    used by a process. Creating an index that already exists is a no-op in
+    MongoDB, so this is cheap on every later start.
+
+    Fields holding lists, such as cm.attached_vms, get multikey indexes
+    automatically.
+    """
+
+    #
+    # indexes common to all providers, including the canonical fields of
+    # VolumeRecord. The compound index also serves the upsert of
+    # CmDatabase.update, which matches on cm.name, cm.cloud and cm.kind.
+    #
+    common = [
+        [("cm.name", ASCENDING), ("cm.cloud", ASCENDING),
+         ("cm.kind", ASCENDING)],
+        [("cm.deleted", ASCENDING)],
+        [("cm.id", ASCENDING)],
+        [("cm.attached_vms", ASCENDING)],
+        [("cm.region", ASCENDING)],
+        [("cm.state", ASCENDING)],
+    ]
+
+    #
+    # indexes for the vm, region and state fields of the providers whose
+    # records keep their own schema. The records of the clouds only hold
+    # the canonical fields of VolumeRecord.
+    #
+    schema = {
+        "multipass": [
+            [("AttachedToVm", ASCENDING)],
+            [("path", ASCENDING)],
+            [("State", ASCENDING)],
+        ],
+    }
+
+    _ensured = set()
+    _lock = threading.Lock()
+
+    def __init__(self, cloud=None, kind=None):
+        """
+        Initialize the index manager for a cloud
+
+        :param cloud: name of the cloud
+        :param kind: kind of the cloud, e.g. "aws"
+        """
+        self.cloud = cloud
+        self.kind = kind
+        self.cm = CmDatabase()
+        self.collection = f"{cloud}-volume"
+
+    def indexes(self):
+        """
+        The indexes of the volume collection of the cloud
+
+        :return: list of lists of (field, direction) tuples
+        """
+        return VolumeIndex.common + VolumeIndex.schema.get(self.kind, [])
+
+    def ensure(self, force=False):
+        """
+        Creates the indexes of the volume collection and of the volume
+        cache if this was not yet done by this process
+
+        :param force: create the indexes even if they were already created
+        :return: True if the indexes were created
+        """
+        with VolumeIndex._lock:
+            if self.collection in VolumeIndex._ensured and not force:
+                return False
+            col = self.cm.collection(self.collection)
+            for keys in self.indexes():
+                col.create_index(keys, background=True)
+            self.cm.collection("volume-cache").create_index(
+                [("cloud", ASCENDING)], unique=True, background=True)
+            VolumeIndex._ensured.add(self.collection)
+        return True
+
+    @staticmethod
+    def uses_index(plan):
+        """
+        Checks if a query plan returned by explain uses an index
+
+        :param plan: the result of cursor.explain()
+        :return: boolean
+        """
+        if "queryPlanner" in plan:
+            plan = plan["queryPlanner"]["winningPlan"]
+        if plan.get("stage") in ["IXSCAN", "IDHACK", "COUNT_SCAN"]:
+            return True
+        stages = []
+        if "inputStage" in plan:
+            stages.append(plan["inputStage"])
+        stages.extend(plan.get("inputStages", []))
+        return any(VolumeIndex.uses_index(stage) for stage in stages)
@@ -0,0 +1,281 @@
+import cProfile
+import functools
+import os
+import pstats
+
+from cloudmesh.common.util import path_expand
+
+
+class VolumeProfiler(object):
+    """
+    Profiles a volume command with cProfile. If the environment variable
+    CLOUDMESH_VOLUME_CPROFILE is set to a file, e.g.
+
+        CLOUDMESH_VOLUME_CPROFILE=~/volume.folded cms volume list --refresh
+
+    the command is run under the profiler. The stacks are written to the
+    file in the collapsed format of flamegraph.pl, speedscope and inferno,
+    one line per stack with the microseconds spent in it, and the raw
+    statistics of cProfile to the file with .prof appended. After the
+    command the functions that took the most time are printed, together
+    with the time spent in importing modules, reading the configuration,
+    the network and the database.
+
+    cProfile records the callers of each function, not whole stacks. The
+    stacks are reconstructed from the callers, where the time of a
+    function called from several places is split by the time each caller
+    spent in it, as flameprof does. Callers below a share of
+    VolumeProfiler.cutoff are not followed, their time stays in a shorter
+    stack that starts at the function they called.
+    """
+
+    variable = "CLOUDMESH_VOLUME_CPROFILE"
+
+    top = 20
+
+    #
+    # the parts of the file names of the functions in each category. The
+    # time of a stack is counted for the category of its outermost
+    # function in a category, e.g. the socket reads of pymongo are
+    # database time, the network calls of an import are import time.
+    #
+    categories = {
+        "imports": ["<frozen importlib._bootstrap>"],
+        "config": ["cloudmesh/configuration/", "cloudmesh/common/variables",
+                   "/yaml/", "/oyaml"],
+        "database": ["/pymongo/", "cloudmesh/mongo/", "/sqlite3/",
+                     "VolumeRepository.py"],
+        "network": ["/http/client", "/urllib3/", "/requests/", "/socket.py",
+                    "/ssl.py", "/httplib2/", "/botocore/endpoint"],
+    }
+
+    #
+    # fractions of the time of a function below this are not followed to
+    # its callers
+    #
+    cutoff = 0.001
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self._stats = None
+        self._paths = {}
+
+    def run(self, function, *args, **kwargs):
+        """
+        Calls a function under the profiler
+
+        :param function: the function
+        :return: the result of the function
+        """
+        self.profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.profile.disable()
+            self._stats = None
+
+    def stats(self):
+        """
+        The statistics of the profile
+
+        :return: pstats.Stats
+        """
+        if self._stats is None:
+            self._stats = pstats.Stats(self.profile)
+            self._paths = {}
+        return self._stats
+
+    @staticmethod
+    def label(function):
+        """
+        The name of a function in the stacks
+
+        :param function: the key of pstats, (filename, line, name)
+        :return: string
+        """
+        filename, line, name = function
+        if filename == "~":
+            return name
+        parts = filename.replace("\\", "/").split("/")
+        return f"{'/'.join(parts[-2:])}:{name}"
+
+    def _callers(self, function, visiting):
+        """
+        The stacks that call a function with the fraction of its time
+        that is spent in each of them
+
+        :param function: the key of pstats
+        :param visiting: the functions on the current path
+        :return: list of (tuple of functions, fraction)
+        """
+        if function in self._paths:
+            return self._paths[function]
+        everyone = self.stats().stats[function][4]
+        callers = {caller: edge for caller, edge in everyone.items()
+                   if caller not in visiting}
+        if not callers:
+            result = [((function,), 1.0)]
+        else:
+            total = sum(edge[3] for edge in callers.values())
+            result = []
+            for caller, edge in callers.items():
+                weight = edge[3] / total if total else 1 / len(callers)
+                if weight < VolumeProfiler.cutoff:
+                    continue
+                for path, fraction in self._callers(caller,
+                                                    visiting | {function}):
+                    if fraction * weight >= VolumeProfiler.cutoff:
+                        result.append((path + (function,),
+                                       fraction * weight))
+            #
+            # the time of the callers that were cut off stays with the
+            # function, so that the stacks add up to its time
+            #
+            kept = sum(fraction for path, fraction in result)
+            if kept < 1.0 - VolumeProfiler.cutoff:
+                result.append(((function,), 1.0 - kept))
+        #
+        # the stacks are only complete if no caller was left out because
+        # it is on the current path
+        #
+        if len(callers) == len(everyone):
+            self._paths[function] = result
+        return result
+
+    def stacks(self):
+        """
+        The time spent in each stack
+
+        :return: dict of tuples of functions to seconds
+        """
+        result = {}
+        for function, entry in self.stats().stats.items():
+            seconds = entry[2]
+            if seconds <= 0:
+                continue
+            for path, fraction in self._callers(function, frozenset()):
+                result[path] = result.get(path, 0) + seconds * fraction
+        return result
+
+    def collapsed(self):
+        """
+        The stacks in the collapsed format of flamegraph.pl
+
+        :return: string
+        """
+        lines = []
+        for path, seconds in sorted(self.stacks().items()):
+            microseconds = int(seconds * 1e6)
+            if microseconds > 0:
+                label = ";".join(self.label(function).replace(";", ",")
+                                 for function in path)
+                lines.append(f"{label} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def category(function):
+        """
+        The category of a function
+
+        :param function: the key of pstats
+        :return: the name of the category or None
+        """
+        filename = function[0].replace("\\", "/")
+        for category, parts in VolumeProfiler.categories.items():
+            for part in parts:
+                if part in filename:
+                    return category
+        return None
+
+    def split(self):
+        """
+        The time spent in each category
+
+        :return: dict of the categories and "other" to seconds
+        """
+        result = {category: 0.0 for category in VolumeProfiler.categories}
+        result["other"] = 0.0
+        for path, seconds in self.stacks().items():
+            category = "other"
+            for function in path:
+                found = VolumeProfiler.category(function)
+                if found is not None:
+                    category = found
+                    break
+            result[category] += seconds
+        return result
+
+    def functions(self, n=None):
+        """
+        The functions with the most cumulative time
+
+        :param n: the number of functions, defaults to VolumeProfiler.top
+        :return: list of dicts with function, calls, self and cumulative
+        """
+        n = n or VolumeProfiler.top
+        entries = sorted(self.stats().stats.items(),
+                         key=lambda item: item[1][3], reverse=True)
+        return [{
+            "function": self.label(function),
+            "calls": entry[1],
+            "self": entry[2],
+            "cumulative": entry[3]
+        } for function, entry in entries[:n]]
+
+    def summary(self, n=None):
+        """
+        The functions with the most cumulative time and the time of the
+        categories as text
+
+        :param n: the number of functions
+        :return: string
+        """
+        total = self.stats().total_tt
+        lines = [f"# profile of {total:.3f}s",
+                 f"{'calls':>8} {'self(s)':>9} {'cum(s)':>9}  function"]
+        for entry in self.functions(n):
+            lines.append(f"{entry['calls']:>8} {entry['self']:>9.3f} "
+                         f"{entry['cumulative']:>9.3f}  "
+                         f"{entry['function']}")
+        lines.append("")
+        for category, seconds in self.split().items():
+            share = seconds / total if total else 0
+            lines.append(f"{category:<10} {seconds:>9.3f}s {share:>7.1%}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """
+        Writes the collapsed stacks to a file and the statistics of cProfile
+        to the file with .prof appended
+
+        :param path: the file
+        """
+        path = path_expand(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        self.stats().dump_stats(f"{path}.prof")
+
+    @classmethod
+    def option(cls, f):
+        """
+        Decorator for do_volume. If CLOUDMESH_VOLUME_CPROFILE is set the
+        command is profiled, the stacks are written to the file it names
+        and the summary is printed after the command.
+        """
+
+        @functools.wraps(f)
+        def wrapper(instance, args, arguments):
+            path = os.environ.get(cls.variable)
+            if not path:
+                return f(instance, args, arguments)
+            profiler = cls()
+            try:
+                return profiler.run(f, instance, args, arguments)
+            finally:
+                profiler.save(path)
+                print(profiler.summary())
+
+        return wrapper
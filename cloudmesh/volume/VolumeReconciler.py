@@ -0,0 +1,293 @@
+import datetime
+import time
+
+from pymongo import InsertOne
+from pymongo import UpdateMany
+from pymongo import UpdateOne
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+
+
+class VolumeReconciler(object):
+    """
+    Reconciles a fresh listing of a cloud with the "<cloud>-volume"
+    collection.
+
+    The listing is compared with the stored records by volume id. New
+    volumes are inserted, changed volumes are updated field by field and
+    volumes that are no longer in the listing are marked as deleted with a
+    tombstone (cm.deleted = True). All changes are written with a single
+    bulk_write. Tombstoned records are removed by purge.
+
+    The records of the clouds are stored with the canonical fields of
+    VolumeRecord only, the payload of the provider is kept if raw is True.
+
+    Counts of the changes are returned as dict with the keys inserted,
+    updated, unchanged and deleted.
+    """
+
+    #
+    # the field of a record that identifies the volume in the cloud
+    #
+    id_fields = {
+        "multipass": "cm.name",
+        "aws": "cm.id",
+        "azure": "cm.id",
+        "google": "cm.id",
+        "openstack": "cm.id",
+        "oracle": "cm.id",
+        "fake": "cm.id",
+    }
+
+    #
+    # kinds whose records in the database are the volumes themselves
+    #
+    authoritative = ["multipass"]
+
+    #
+    # bookkeeping fields of the cm dict that are not part of the listing
+    #
+    keep = ["created", "modified", "collection", "fetched_at", "deleted",
+            "deleted_at", "version"]
+
+    def __init__(self, cloud=None, kind=None, raw=False):
+        """
+        Initialize the reconciler for a cloud
+
+        :param cloud: name of the cloud
+        :param kind: kind of the cloud, e.g. "aws"
+        :param raw: if True the payload of the provider is stored
+        """
+        self.cloud = cloud
+        self.kind = kind
+        self.raw = raw
+        self.cm = CmDatabase()
+        self.collection = f"{cloud}-volume"
+        self.id_field = VolumeReconciler.id_fields.get(kind, "cm.name")
+
+    @staticmethod
+    def _get(entry, field):
+        """
+        get the value of a dotted field from a dict
+
+        :param entry: the dict
+        :param field: the field, e.g. "cm.name"
+        :return: the value or None
+        """
+        value = entry
+        for key in field.split("."):
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+    def key(self, entry):
+        """
+        The field that identifies the volume a record describes and its
+        value
+
+        :param entry: the volume dict
+        :return: (field, id), the field is cm.name if the record has no id
+        """
+        volume_id = self._get(entry, self.id_field)
+        if volume_id is None:
+            return "cm.name", self._get(entry, "cm.name")
+        return self.id_field, volume_id
+
+    def volume_id(self, entry):
+        """
+        The id of the volume a record describes
+
+        :param entry: the volume dict
+        :return: the id, the name of the volume if the record has no id
+        """
+        return self.key(entry)[1]
+
+    @staticmethod
+    def by_field(keys):
+        """
+        Groups volume ids by the field they are stored in
+
+        :param keys: iterable of (field, id)
+        :return: dict of fields to lists of ids
+        """
+        groups = {}
+        for field, volume_id in keys:
+            groups.setdefault(field, []).append(volume_id)
+        return groups
+
+    @staticmethod
+    def normalize(value):
+        """
+        Converts a value to the form it has after a round trip through
+        MongoDB, so that fresh and stored values can be compared. Datetimes
+        are stored in UTC without timezone and with millisecond precision.
+
+        :param value: the value
+        :return: the normalized value
+        """
+        if isinstance(value, dict):
+            return {k: VolumeReconciler.normalize(v) for k, v in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [VolumeReconciler.normalize(v) for v in value]
+        elif isinstance(value, datetime.datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(datetime.timezone.utc)
+                value = value.replace(tzinfo=None)
+            return value.replace(microsecond=value.microsecond // 1000 * 1000)
+        return value
+
+    def diff(self, entry, stored):
+        """
+        Computes the update that turns the stored record into the fresh one.
+        Only changed fields are set, fields that disappeared are unset.
+
+        :param entry: the fresh volume dict
+        :param stored: the stored volume dict
+        :return: dict with the $set and $unset operations, empty if the
+                 record did not change
+        """
+        changed = {}
+        removed = {}
+        for key, value in entry.items():
+            if key == "cm":
+                cm = stored.get("cm") or {}
+                for cm_key, cm_value in value.items():
+                    if cm_key in VolumeReconciler.keep:
+                        continue
+                    cm_value = self.normalize(cm_value)
+                    if cm_key not in cm or cm[cm_key] != cm_value:
+                        changed[f"cm.{cm_key}"] = cm_value
+                for cm_key in cm:
+                    if cm_key not in value and \
+                            cm_key not in VolumeReconciler.keep:
+                        removed[f"cm.{cm_key}"] = ""
+            else:
+                value = self.normalize(value)
+                if key not in stored or stored[key] != value:
+                    changed[key] = value
+        for key in stored:
+            if key not in entry and key not in ["_id", "cm"]:
+                removed[key] = ""
+        if stored.get("cm", {}).get("deleted"):
+            removed["cm.deleted"] = ""
+            removed["cm.deleted_at"] = ""
+        update = {}
+        if changed:
+            update["$set"] = changed
+        if removed:
+            update["$unset"] = removed
+        return update
+
+    def reconcile(self, data, fetched_at=None):
+        """
+        Applies a full listing of the cloud to the volume collection
+
+        :param data: list of volume dicts as returned by the provider
+        :param fetched_at: the time of the listing, defaults to now
+        :return: dict with the counts of inserted, updated, unchanged and
+                 deleted records
+        """
+        if self.kind not in VolumeReconciler.authoritative:
+            data = VolumeRecord.canonical(data or [], raw=self.raw)
+        fetched_at = fetched_at or time.time()
+        now = str(datetime.datetime.utcnow())
+        col = self.cm.collection(self.collection)
+        stored = {}
+        fields = {}
+        for record in col.find({}, {"_id": 0}):
+            field, volume_id = self.key(record)
+            stored[volume_id] = record
+            fields[volume_id] = field
+
+        operations = []
+        unchanged = []
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        seen = set()
+        for entry in data or []:
+            volume_id = self.volume_id(entry)
+            seen.add(volume_id)
+            if volume_id not in stored:
+                entry = self.normalize(entry)
+                entry["cm"].update({
+                    "created": now,
+                    "modified": now,
+                    "fetched_at": fetched_at
+                })
+                operations.append(InsertOne(entry))
+                counts["inserted"] += 1
+                continue
+            update = self.diff(entry, stored[volume_id])
+            if update:
+                update.setdefault("$set", {}).update({
+                    "cm.modified": now,
+                    "cm.fetched_at": fetched_at
+                })
+                operations.append(
+                    UpdateOne({fields[volume_id]: volume_id}, update))
+                counts["updated"] += 1
+            else:
+                unchanged.append(volume_id)
+                counts["unchanged"] += 1
+
+        for field, ids in self.by_field(
+                (fields[volume_id], volume_id)
+                for volume_id in unchanged).items():
+            operations.append(
+                UpdateMany({field: {"$in": ids}},
+                           {"$set": {"cm.fetched_at": fetched_at}}))
+
+        gone = [volume_id for volume_id, record in stored.items()
+                if volume_id not in seen and
+                not record.get("cm", {}).get("deleted")]
+        for field, ids in self.by_field(
+                (fields[volume_id], volume_id) for volume_id in gone).items():
+            operations.append(self._tombstone(field, ids, now))
+        counts["deleted"] = len(gone)
+
+        if operations:
+            col.bulk_write(operations, ordered=False)
+        return counts
+
+    @staticmethod
+    def _tombstone(field, ids, now):
+        return UpdateMany({field: {"$in": ids}},
+                          {"$set": {"cm.deleted": True,
+                                    "cm.deleted_at": now,
+                                    "cm.modified": now}})
+
+    def tombstone(self, data):
+        """
+        Marks the records of volumes that were deleted in the cloud as
+        deleted, without listing the cloud. Only volumes whose canonical
+        state is deleted are marked. The records of authoritative kinds are
+        kept up to date by their providers and are not changed.
+
+        :param data: list of the volume dicts returned by a delete
+        :return: number of volumes that were marked
+        """
+        if data is None or self.kind in VolumeReconciler.authoritative:
+            return 0
+        if type(data) == dict:
+            data = [data]
+        keys = [self.key(entry) for entry in data
+                if self._get(entry, "cm.state") == "deleted"]
+        keys = [(field, volume_id) for field, volume_id in keys
+                if volume_id is not None]
+        now = str(datetime.datetime.utcnow())
+        operations = [self._tombstone(field, ids, now)
+                      for field, ids in self.by_field(keys).items()]
+        if operations:
+            self.cm.collection(self.collection).bulk_write(operations,
+                                                           ordered=False)
+        return len(keys)
+
+    def purge(self):
+        """
+        Removes all tombstoned records from the volume collection
+
+        :return: number of removed records
+        """
+        r = self.cm.collection(self.collection).delete_many(
+            {"cm.deleted": True})
+        return r.deleted_count
@@ -0,0 +1,385 @@
+class VolumeRecord(object):
+    """
+    The normalized description of a volume shared by all providers.
+
+    Every provider returns the volume in the shape of its SDK and names the
+    fields differently, e.g. the status is State in aws, status in google,
+    lifecycle_state in oracle and disk_state in azure. A VolumeRecord holds
+    the canonical fields
+
+        id, name, cloud, region, size_gb, state, attached_vms, tags,
+        fetched_at
+
+    The state is one of VolumeRecord.states. The tags are a dict. The
+    original payload is kept in raw. It is only converted to a dict when it
+    is accessed, so a record created from an SDK object does not pay for
+    the conversion unless the payload is needed.
+
+    The providers store the canonical fields in the cm dict of each volume,
+    so that the cache, the filters, purge and Print can use one schema:
+
+        cm.id, cm.name, cm.cloud, cm.region, cm.size_gb, cm.state,
+        cm.attached_vms, cm.tags, cm.fetched_at
+
+    The records of the clouds are written to the database with canonical,
+    which keeps the payload only on demand. The records of multipass are
+    the volumes themselves and are stored with all their fields.
+    """
+
+    __slots__ = ["id",
+                 "name",
+                 "cloud",
+                 "region",
+                 "size_gb",
+                 "state",
+                 "attached_vms",
+                 "tags",
+                 "fetched_at",
+                 "_raw",
+                 "_payload"]
+
+    states = ["creating",
+              "available",
+              "in-use",
+              "deleting",
+              "deleted",
+              "error",
+              "unknown"]
+
+    #
+    # the states of the providers that are not already canonical
+    #
+    state_map = {
+        "google": {
+            "CREATING": "creating",
+            "RESTORING": "creating",
+            "READY": "available",
+            "FAILED": "error",
+            "DELETING": "deleting",
+        },
+        "oracle": {
+            "PROVISIONING": "creating",
+            "RESTORING": "creating",
+            "AVAILABLE": "available",
+            "TERMINATING": "deleting",
+            "TERMINATED": "deleted",
+            "FAULTY": "error",
+        },
+        "fake": {
+            "attaching": "in-use",
+            "detaching": "in-use",
+        },
+        "azure": {
+            "Unattached": "available",
+            "Attached": "in-use",
+            "Reserved": "in-use",
+            "ActiveSAS": "in-use",
+            "ReadyToUpload": "creating",
+            "ActiveUpload": "creating",
+        },
+    }
+
+    output = {
+        "volume": {
+            "sort_keys": ["cm.name"],
+            "order": ["cm.name",
+                      "cm.cloud",
+                      "cm.region",
+                      "cm.size_gb",
+                      "cm.state",
+                      "cm.attached_vms",
+                      "cm.tags"],
+            "header": ["Name",
+                       "Cloud",
+                       "Region",
+                       "Size(GB)",
+                       "State",
+                       "Attached To Vm",
+                       "Tags"]
+        }
+    }
+
+    def __init__(self,
+                 id=None,
+                 name=None,
+                 cloud=None,
+                 region=None,
+                 size_gb=None,
+                 state=None,
+                 attached_vms=None,
+                 tags=None,
+                 fetched_at=None,
+                 raw=None):
+        """
+        Create a volume record
+
+        :param id: the id of the volume in the cloud
+        :param name: the name of the volume
+        :param cloud: the name of the cloud
+        :param region: the region, zone or path of the volume
+        :param size_gb: the size in GB
+        :param state: one of VolumeRecord.states
+        :param attached_vms: list of vm names
+        :param tags: dict of tags
+        :param fetched_at: time the volume was fetched, seconds since epoch
+        :param raw: the original payload, a dict or an SDK object
+        """
+        self.id = id
+        self.name = name
+        self.cloud = cloud
+        self.region = region
+        self.size_gb = size_gb
+        self.state = state
+        self.attached_vms = attached_vms or []
+        self.tags = tags or {}
+        self.fetched_at = fetched_at
+        self._raw = None
+        self._payload = raw
+
+    def __repr__(self):
+        return f"VolumeRecord(name={self.name!r}, cloud={self.cloud!r}, " \
+               f"state={self.state!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, VolumeRecord):
+            return NotImplemented
+        return self.cm() == other.cm()
+
+    @property
+    def raw(self):
+        """
+        The original payload of the volume as dict. SDK objects are
+        converted on first access.
+
+        :return: dict or None
+        """
+        if self._raw is None and self._payload is not None:
+            payload = self._payload
+            if isinstance(payload, dict):
+                self._raw = payload
+            elif hasattr(payload, "as_dict"):
+                self._raw = payload.as_dict()
+            elif hasattr(payload, "to_dict"):
+                self._raw = payload.to_dict()
+            elif hasattr(payload, "swagger_types"):
+                self._raw = {key: getattr(payload, key)
+                             for key in payload.swagger_types}
+            else:
+                self._raw = dict(vars(payload))
+            self._payload = None
+        return self._raw
+
+    @raw.setter
+    def raw(self, value):
+        self._raw = None
+        self._payload = value
+
+    def cm(self):
+        """
+        The canonical fields as they are stored in the cm dict of a volume
+
+        :return: dict
+        """
+        cm = {
+            "id": self.id,
+            "name": self.name,
+            "cloud": self.cloud,
+            "region": self.region,
+            "size_gb": self.size_gb,
+            "state": self.state,
+            "attached_vms": self.attached_vms,
+            "tags": self.tags,
+        }
+        if self.fetched_at is not None:
+            cm["fetched_at"] = self.fetched_at
+        return cm
+
+    def to_dict(self, raw=True):
+        """
+        Converts the record to the dict that is stored in the database. The
+        fields of the cm dict of a dict payload are kept.
+
+        :param raw: if True the original payload is included
+        :return: dict
+        """
+        if raw:
+            d = dict(self.raw or {})
+            cm = dict(d.get("cm", {}))
+        else:
+            payload = self._payload if self._raw is None else self._raw
+            d = {}
+            cm = dict(payload.get("cm", {})) \
+                if isinstance(payload, dict) else {}
+        cm.update(self.cm())
+        cm["kind"] = "volume"
+        d["cm"] = cm
+        return d
+
+    @staticmethod
+    def canonical(entries, raw=False):
+        """
+        Converts volume dicts that carry the canonical fields in their cm
+        dict, e.g. the result of update_dict, to the dicts stored in the
+        database
+
+        :param entries: list of volume dicts
+        :param raw: if True the original payload is kept
+        :return: list of dicts
+        """
+        return [VolumeRecord.from_dict(entry).to_dict(raw=raw)
+                for entry in entries if entry is not None]
+
+    @staticmethod
+    def from_dict(entry):
+        """
+        Creates a record from a volume dict that carries the canonical
+        fields in its cm dict, e.g. a record read from the database
+
+        :param entry: the volume dict
+        :return: VolumeRecord
+        """
+        cm = entry.get("cm", {})
+        return VolumeRecord(id=cm.get("id"),
+                            name=cm.get("name"),
+                            cloud=cm.get("cloud"),
+                            region=cm.get("region"),
+                            size_gb=cm.get("size_gb"),
+                            state=cm.get("state"),
+                            attached_vms=cm.get("attached_vms"),
+                            tags=cm.get("tags"),
+                            fetched_at=cm.get("fetched_at"),
+                            raw=entry)
+
+    @staticmethod
+    def state_of(kind, state):
+        """
+        Converts the state of a provider to a canonical state
+
+        :param kind: kind of the provider
+        :param state: the state as reported by the provider
+        :return: one of VolumeRecord.states
+        """
+        if state is None:
+            return "unknown"
+        state = str(state)
+        mapped = VolumeRecord.state_map.get(kind, {}).get(state)
+        if mapped is not None:
+            return mapped
+        state = state.lower()
+        if state in VolumeRecord.states:
+            return state
+        return "unknown"
+
+    @staticmethod
+    def _last(value):
+        """
+        Returns the last part of an url or resource path
+
+        :param value: string
+        :return: string
+        """
+        if isinstance(value, str) and "/" in value:
+            return value.rsplit("/", 1)[1]
+        return value
+
+    @staticmethod
+    def _size(value):
+        """
+        Converts a size to an int
+
+        :param value: the size
+        :return: int or None
+        """
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def from_entry(kind, entry, cloud=None):
+        """
+        Creates a record from a volume dict returned by a provider
+
+        :param kind: kind of the provider, e.g. "aws"
+        :param entry: the volume dict of the provider
+        :param cloud: name of the cloud
+        :return: VolumeRecord
+        """
+        cm = entry.get("cm", {})
+        _get = entry.get
+        _last = VolumeRecord._last
+        _size = VolumeRecord._size
+        if kind == "aws":
+            tags = {tag["Key"]: tag["Value"] for tag in _get("Tags") or []
+                    if tag["Key"] != "Name"}
+            record = VolumeRecord(id=_get("VolumeId"),
+                                  region=_get("AvailabilityZone"),
+                                  size_gb=_size(_get("Size")),
+                                  state=_get("State"),
+                                  attached_vms=_get("AttachedToVm"),
+                                  tags=tags)
+        elif kind == "google":
+            state = _get("status")
+            if state == "READY" and _get("users"):
+                state = "in-use"
+            labels = _get("labels") or {}
+            if isinstance(labels, list):
+                labels = {label: "" for label in labels}
+            record = VolumeRecord(id=_get("id"),
+                                  region=_last(_get("zone")),
+                                  size_gb=_size(_get("sizeGb")),
+                                  state=state,
+                                  attached_vms=[_last(user) for user in
+                                                _get("users") or []],
+                                  tags=labels)
+        elif kind == "oracle":
+            record = VolumeRecord(id=_get("id"),
+                                  region=_get("availability_domain"),
+                                  size_gb=_size(_get("size_in_gbs")),
+                                  state=_get("lifecycle_state"),
+                                  tags=_get("freeform_tags"))
+        elif kind == "openstack":
+            record = VolumeRecord(id=_get("id"),
+                                  region=_get("availability_zone"),
+                                  size_gb=_size(_get("size")),
+                                  state=_get("status"),
+                                  attached_vms=[
+                                      attachment.get("server_id") for
+                                      attachment in _get("attachments") or []],
+                                  tags=_get("metadata"))
+        elif kind == "azure":
+            managed_by = _get("managed_by")
+            record = VolumeRecord(id=_get("id"),
+                                  region=_get("location"),
+                                  size_gb=_size(_get("disk_size_gb")),
+                                  state=_get("disk_state"),
+                                  attached_vms=[_last(managed_by)]
+                                  if managed_by else [],
+                                  tags=_get("tags"))
+        elif kind == "fake":
+            record = VolumeRecord(id=_get("id"),
+                                  region=_get("zone"),
+                                  size_gb=_size(_get("size")),
+                                  state=_get("state"),
+                                  attached_vms=_get("vms"),
+                                  tags=_get("tags"))
+        elif kind == "multipass":
+            tags = {}
+            for tag in _get("tags") or []:
+                tags.update(tag)
+            record = VolumeRecord(id=_get("name") or cm.get("name"),
+                                  region=_get("path"),
+                                  size_gb=_get("size_gb"),
+                                  state=_get("State"),
+                                  attached_vms=_get("AttachedToVm"),
+                                  tags=tags)
+        else:
+            record = VolumeRecord.from_dict(entry)
+        record.name = cm.get("name", record.name) or _get("name")
+        record.cloud = cloud or cm.get("cloud")
+        record.state = VolumeRecord.state_of(kind, record.state)
+        record.attached_vms = list(record.attached_vms or [])
+        record.tags = dict(record.tags or {})
+        record.fetched_at = cm.get("fetched_at")
+        record.raw = entry
+        return record
@@ -0,0 +1,299 @@
+import datetime
+
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from pymongo import ReturnDocument
+from cloudmesh.volume.VolumeIndex import VolumeIndex
+
+
+class VolumeRepository(object):
+    """
+    Access to the volume records of a single cloud.
+
+    CmDatabase.find_name and find_names search every collection of the
+    cloudmesh database, including vms, keys, images and the volumes of all
+    other clouds. The repository only queries the "<cloud>-volume"
+    collection, so a lookup uses the indexes of that collection and can
+    only return volumes of the cloud.
+
+    All queries accept a list of fields. Only these fields are read from
+    the database, e.g. ["path"] or ["cm.name", "AttachedToVm"]. If no
+    fields are given the whole record is returned.
+
+    Every write increments the version of a record, cm.version. A record
+    that is written back after it was read and modified is only stored if
+    its version did not change in between, so concurrent operations on the
+    same volume do not overwrite each other. Lists such as AttachedToVm are
+    changed atomically in the database with add_to_set and pull, other
+    changes are retried with modify until they apply to the latest version.
+
+    SqliteVolumeRepository has the same interface for providers that keep
+    their volumes without MongoDB.
+    """
+
+    database = "mongo"
+
+    retries = 10
+
+    def __init__(self, cloud=None, kind=None):
+        """
+        Initialize the repository for the volumes of a cloud
+
+        :param cloud: name of the cloud
+        :param kind: kind of the cloud, e.g. "multipass"
+        """
+        self.cloud = cloud
+        self.kind = kind
+        self.cm = CmDatabase()
+        self.name = f"{cloud}-volume"
+        VolumeIndex(cloud=cloud, kind=kind).ensure()
+
+    @property
+    def collection(self):
+        """
+        The MongoDB collection of the volumes
+
+        :return: pymongo collection
+        """
+        return self.cm.collection(self.name)
+
+    @staticmethod
+    def projection(fields=None):
+        """
+        Creates the projection for a list of fields
+
+        :param fields: list of field names
+        :return: dict
+        """
+        projection = {"_id": 0}
+        if fields:
+            for field in fields:
+                projection[field] = 1
+        return projection
+
+    def find(self, query=None, fields=None):
+        """
+        Find the volumes matching a query
+
+        :param query: MongoDB query
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        return list(self.collection.find(query or {},
+                                         self.projection(fields)))
+
+    def find_one(self, name, fields=None):
+        """
+        Find a volume by name
+
+        :param name: volume name
+        :param fields: list of fields to return
+        :return: dict or None
+        """
+        return self.collection.find_one({"cm.name": name},
+                                        self.projection(fields))
+
+    def find_name(self, name, fields=None):
+        """
+        Find a volume by name. The result is a list like the one of
+        CmDatabase.find_name.
+
+        :param name: volume name
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        return self.find({"cm.name": name}, fields=fields)
+
+    def find_names(self, names, fields=None):
+        """
+        Find volumes by name
+
+        :param names: list of volume names
+        :param fields: list of fields to return
+        :return: list of dicts
+        """
+        if type(names) == str:
+            names = [names]
+        return self.find({"cm.name": {"$in": list(names)}}, fields=fields)
+
+    def update(self, entries):
+        """
+        Inserts or updates volumes. An entry without cm.version is inserted
+        or replaces the stored record, keeping the fields of the stored cm
+        the entry does not have. An entry with
+        cm.version is only written if the stored record still has this
+        version. Otherwise the stored record is newer and is returned
+        instead of the entry.
+
+        :param entries: a dict or a list of dicts
+        :return: list of the stored dicts
+        """
+        if type(entries) == dict:
+            entries = [entries]
+        result = []
+        for entry in entries:
+            if entry is None:
+                continue
+            if self._write(entry):
+                result.append(entry)
+            else:
+                result.append(self.find_one(entry["cm"]["name"]))
+        return result
+
+    @staticmethod
+    def keys(entry):
+        """
+        The fields of an entry, the fields of its cm as "cm.<field>"
+
+        :param entry: dict
+        :return: set of field names
+        """
+        return {key for key in entry if key != "cm"} | \
+            {f"cm.{key}" for key in entry["cm"]}
+
+    def _write(self, entry, removed=None):
+        """
+        Writes an entry and increments its version. An entry without
+        cm.version is a fresh record of the cloud and replaces the stored
+        record as CmDatabase.update does, only the fields of the stored cm
+        it does not have are kept. An entry with cm.version is a changed
+        record read with modify, which may only have some of the fields,
+        so its fields are set and the removed fields are unset.
+
+        :param entry: dict
+        :param removed: the fields the change removed, see keys
+        :return: False if the version of the entry is outdated
+        """
+        cm = entry["cm"]
+        now = str(datetime.datetime.utcnow())
+        cm["modified"] = now
+        cm["collection"] = self.name
+        entry.pop("_id", None)
+        if "version" in cm:
+            values = {key: value for key, value in entry.items()
+                      if key != "cm"}
+            values.update({f"cm.{key}": value for key, value in cm.items()
+                           if key not in ["version", "created"]})
+            update = {"$set": values, "$inc": {"cm.version": 1}}
+            if removed:
+                update["$unset"] = {key: "" for key in removed}
+            r = self.collection.update_one(
+                {"cm.name": cm["name"], "cm.version": cm["version"]},
+                update)
+            if r.matched_count == 0:
+                return False
+            cm["version"] = (cm["version"] or 0) + 1
+            return True
+        key = {"cm.kind": cm["kind"],
+               "cm.cloud": cm["cloud"],
+               "cm.name": cm["name"]}
+        for _ in range(self.retries):
+            old = self.collection.find_one(key, {"_id": 0, "cm": 1})
+            stored = dict(old["cm"]) if old else {"created": now}
+            version = stored.get("version")
+            #
+            # a volume that is created again is no longer deleted
+            #
+            stored.pop("deleted", None)
+            stored.pop("deleted_at", None)
+            stored.update({field: value for field, value in cm.items()
+                           if field not in ["version", "created"]})
+            stored["version"] = (version or 0) + 1
+            document = {field: value for field, value in entry.items()
+                        if field != "cm"}
+            document["cm"] = stored
+            if old is None:
+                self.collection.replace_one(key, document, upsert=True)
+            elif self.collection.replace_one(
+                    dict(key, **{"cm.version": version}),
+                    document).matched_count == 0:
+                continue
+            entry["cm"] = stored
+            return True
+        raise ValueError(f"volume {cm['name']} was changed concurrently "
+                         f"{self.retries} times")
+
+    def _update(self, name, update, changes=None, fields=None):
+        """
+        Applies a MongoDB update to a volume and increments its version
+
+        :return: the updated dict or None if the volume does not exist
+        """
+        update["$set"] = dict(changes or {})
+        update["$set"]["cm.modified"] = str(datetime.datetime.utcnow())
+        update["$inc"] = {"cm.version": 1}
+        return self.collection.find_one_and_update(
+            {"cm.name": name},
+            update,
+            projection=self.projection(fields),
+            return_document=ReturnDocument.AFTER)
+
+    def add_to_set(self, name, values, changes=None, fields=None):
+        """
+        Adds values to list fields of a volume atomically, values that are
+        already in a list are not added again
+
+        :param name: volume name
+        :param values: dict of list fields to the values to add, e.g.
+                       {"AttachedToVm": ["vm1"]}
+        :param changes: dict of fields to set in the same update
+        :param fields: list of fields to return
+        :return: the updated dict or None if the volume does not exist
+        """
+        return self._update(name,
+                            {"$addToSet": {field: {"$each": list(value)}
+                                           for field, value in
+                                           values.items()}},
+                            changes=changes,
+                            fields=fields)
+
+    def pull(self, name, values, changes=None, fields=None):
+        """
+        Removes values from list fields of a volume atomically
+
+        :param name: volume name
+        :param values: dict of list fields to the values to remove
+        :param changes: dict of fields to set in the same update
+        :param fields: list of fields to return
+        :return: the updated dict or None if the volume does not exist
+        """
+        return self._update(name,
+                            {"$pull": {field: {"$in": list(value)}
+                                       for field, value in values.items()}},
+                            changes=changes,
+                            fields=fields)
+
+    def modify(self, name, function, fields=None):
+        """
+        Changes a volume with compare and swap. The volume is read, changed
+        by function and written if its version did not change in between.
+        Otherwise it is read again and function is applied to the newer
+        record.
+
+        :param name: volume name
+        :param function: gets the dict of the volume and returns the changed
+                         dict, or None to leave the volume unchanged
+        :param fields: list of fields read, must include cm
+        :return: the written dict or None if the volume does not exist
+        """
+        for _ in range(self.retries):
+            entry = self.find_one(name, fields=fields)
+            if entry is None:
+                return None
+            entry["cm"].setdefault("version", None)
+            keys = self.keys(entry)
+            changed = function(entry)
+            if changed is None:
+                return entry
+            if self._write(changed, removed=keys - self.keys(changed)):
+                return changed
+        raise ValueError(f"volume {name} was changed concurrently "
+                         f"{self.retries} times")
+
+    def delete_many(self, query=None):
+        """
+        Removes the volumes matching a query
+
+        :param query: MongoDB query
+        :return: number of removed records
+        """
+        return self.collection.delete_many(query or {}).deleted_count
@@ -0,0 +1,329 @@
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+from cloudmesh.common.console import Console
+from cloudmesh.common.util import path_expand
+
+
+class Span(object):
+    """
+    A span of the local tracer. Its methods are the ones of an
+    OpenTelemetry span that the volume providers use.
+    """
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "UNSET"
+        self.start = time.time()
+        self.end = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        self.events.append({
+            "name": name,
+            "timestamp": VolumeTracer.timestamp(time.time()),
+            "attributes": dict(attributes or {})
+        })
+
+    def record_exception(self, exception):
+        self.add_event("exception", {
+            "exception.type": type(exception).__name__,
+            "exception.message": str(exception)
+        })
+
+    def set_status(self, status):
+        self.status = status
+
+    def to_dict(self):
+        """
+        The span in the json format of the OpenTelemetry console exporter,
+        with the duration in seconds added
+
+        :return: dict
+        """
+        return {
+            "name": self.name,
+            "context": {
+                "trace_id": f"0x{self.trace_id}",
+                "span_id": f"0x{self.span_id}"
+            },
+            "parent_id": f"0x{self.parent_id}" if self.parent_id else None,
+            "start_time": VolumeTracer.timestamp(self.start),
+            "end_time": VolumeTracer.timestamp(self.end),
+            "duration": round((self.end or self.start) - self.start, 6),
+            "status": {"status_code": self.status},
+            "attributes": self.attributes,
+            "events": self.events
+        }
+
+
+class NoOpSpan(object):
+    """
+    The span of the default tracer, it records nothing
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+    def set_status(self, status):
+        pass
+
+
+class VolumeTracer(object):
+    """
+    Traces the operations of the volume facade and the steps of the
+    providers, e.g. the stop, attach, poll and start of a google attach,
+    as spans:
+
+        with VolumeTracer.span("google.wait", disk=name):
+            ...
+
+        @VolumeTracer.traced("google.attach")
+        def attach(self, names, vm=None):
+            ...
+
+    The SDK calls of the clients wrapped with ApiProfiler.wrap are child
+    spans of the step that makes them.
+
+    By default the tracer does nothing. It is configured by the
+    environment variable CLOUDMESH_VOLUME_TRACE when the facade is
+    created:
+
+        CLOUDMESH_VOLUME_TRACE=~/.cloudmesh/volume/trace.json
+            the spans are recorded locally. The spans of a trace are
+            appended to the file as json lines when its root span ends,
+            and are then removed from spans.
+        CLOUDMESH_VOLUME_TRACE=otel
+            the spans are created with the OpenTelemetry tracer of
+            cloudmesh.volume, if opentelemetry-api is installed
+
+    Instead of the environment variable start and use can be called.
+    """
+
+    variable = "CLOUDMESH_VOLUME_TRACE"
+
+    tracer = None
+
+    path = None
+
+    spans = []
+
+    _local = threading.local()
+
+    _lock = threading.RLock()
+
+    @classmethod
+    def configure(cls, environ=None):
+        """
+        Starts the tracer from the environment variable, if it is set and
+        the tracer is not started yet
+
+        :param environ: the environment, defaults to os.environ
+        """
+        value = (environ if environ is not None else os.environ).get(
+            cls.variable)
+        if not value or cls.tracer is not None:
+            return
+        if value == "otel":
+            try:
+                from opentelemetry import trace
+                cls.use(trace.get_tracer("cloudmesh.volume"))
+            except ImportError:
+                Console.error(f"{cls.variable}=otel requires "
+                              f"opentelemetry-api")
+        else:
+            cls.start(path=value)
+
+    @classmethod
+    def start(cls, path=None):
+        """
+        Starts recording spans locally
+
+        :param path: the json lines file the traces are appended to
+        """
+        cls.path = path_expand(path) if path else None
+        cls.tracer = "local"
+
+    @classmethod
+    def use(cls, tracer):
+        """
+        Creates the spans with another tracer, e.g. of OpenTelemetry
+
+        :param tracer: an object with start_as_current_span
+        """
+        cls.path = None
+        cls.tracer = tracer
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops tracing, the recorded spans are kept
+        """
+        cls.tracer = None
+
+    @classmethod
+    def enabled(cls):
+        return cls.tracer is not None
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes the recorded spans
+        """
+        with cls._lock:
+            cls.spans = []
+
+    @staticmethod
+    def timestamp(t):
+        if t is None:
+            return None
+        return datetime.datetime.fromtimestamp(
+            t, datetime.timezone.utc).isoformat()
+
+    @classmethod
+    def _stack(cls):
+        if not hasattr(cls._local, "stack"):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    @contextlib.contextmanager
+    def span(cls, name, **attributes):
+        """
+        A span that is a child of the current span of the thread
+
+        :param name: the name, e.g. "aws.wait"
+        :param attributes: the attributes of the span
+        :return: the span
+        """
+        tracer = cls.tracer
+        if tracer is None:
+            yield NoOpSpan()
+        elif tracer != "local":
+            with tracer.start_as_current_span(name,
+                                              attributes=attributes) as span:
+                yield span
+        else:
+            stack = cls._stack()
+            parent = stack[-1] if stack else None
+            span = Span(name,
+                        parent.trace_id if parent else os.urandom(16).hex(),
+                        parent_id=parent.span_id if parent else None,
+                        attributes=attributes)
+            stack.append(span)
+            try:
+                yield span
+                if span.status == "UNSET":
+                    span.set_status("OK")
+            except BaseException as e:
+                span.record_exception(e)
+                span.set_status("ERROR")
+                raise
+            finally:
+                span.end = time.time()
+                stack.pop()
+                with cls._lock:
+                    cls.spans.append(span)
+                if parent is None and cls.path:
+                    cls.export(cls.path, trace_id=span.trace_id)
+                    with cls._lock:
+                        cls.spans = [s for s in cls.spans
+                                     if s.trace_id != span.trace_id]
+
+    @classmethod
+    def traced(cls, name):
+        """
+        Decorator that runs a method in a span. The cloud of the instance
+        is added as attribute.
+
+        :param name: the name of the span, e.g. "volume.attach"
+        """
+
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(instance, *args, **kwargs):
+                if cls.tracer is None:
+                    return f(instance, *args, **kwargs)
+                cloud = getattr(instance, "cloud", None)
+                with cls.span(name, cloud=str(cloud)):
+                    return f(instance, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def export(cls, path, trace_id=None):
+        """
+        Appends recorded spans to a json lines file
+
+        :param path: the file
+        :param trace_id: only the spans of this trace, defaults to all
+        :return: number of spans written
+        """
+        with cls._lock:
+            spans = [span for span in cls.spans
+                     if trace_id is None or span.trace_id == trace_id]
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "a") as f:
+                for span in spans:
+                    f.write(json.dumps(span.to_dict()) + "\n")
+        return len(spans)
+
+    @staticmethod
+    def load(path):
+        """
+        Reads the spans of a json lines file
+
+        :param path: the file
+        :return: list of dicts
+        """
+        with open(path_expand(path)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @staticmethod
+    def format(spans):
+        """
+        Formats spans as a tree of their durations per trace, so the step
+        of a slow operation that took the time can be seen
+
+        :param spans: list of dicts as written by export
+        :return: string
+        """
+        children = {}
+        for span in spans:
+            children.setdefault(span["parent_id"], []).append(span)
+        lines = []
+
+        def add(span, depth):
+            lines.append(f"{span['duration']:>10.3f}s "
+                         f"{'  ' * depth}{span['name']} "
+                         f"{span['status']['status_code']}")
+            for child in sorted(children.get(span["context"]["span_id"], []),
+                                key=lambda s: s["start_time"]):
+                add(child, depth + 1)
+
+        for root in sorted(children.get(None, []),
+                           key=lambda s: s["start_time"]):
+            add(root, 0)
+        return "\n".join(lines)
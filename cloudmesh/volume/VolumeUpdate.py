@@ -0,0 +1,40 @@
+import functools
+
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeReconciler import VolumeReconciler
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+
+
+class VolumeUpdate(object):
+    """
+    Decorator for the methods of the volume Provider. Like DatabaseUpdate
+    of cloudmesh.mongo, it writes the dict or list of dicts returned by the
+    method to the database and returns the stored list. A return value of
+    None is passed through.
+
+    The records are written to the repository of the cloud provider, if it
+    has one, so a provider that keeps its volumes in SQLite does not need
+    MongoDB. Otherwise they are written with CmDatabase.update.
+
+    Like the cache, only the canonical fields of VolumeRecord are written
+    for the clouds, the records of multipass keep all their fields.
+    """
+
+    def __call__(self, f):
+        @functools.wraps(f)
+        def wrapper(provider, *args, **kwargs):
+            current = f(provider, *args, **kwargs)
+            if current is None:
+                return None
+            if type(current) == dict:
+                current = [current]
+            if provider.kind not in VolumeReconciler.authoritative:
+                cache = getattr(provider, "cache", None)
+                current = VolumeRecord.canonical(
+                    current, raw=getattr(cache, "raw", False))
+            repository = getattr(provider.provider, "repository", None)
+            if repository is not None:
+                return repository.update(current)
+            return CmDatabase().update(current)
+
+        return wrapper
@@ -3,8 +3,12 @@ from time import sleep
 import boto3
 from cloudmesh.common.console import Console
 from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.ApiProfiler import ApiProfiler
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeRepository import VolumeRepository
 
 
 class Provider(VolumeABC):
@@ -44,48 +48,7 @@ class Provider(VolumeABC):
         'deleting'
     ]
 
-    output = {
-
-        "volume": {
-            "sort_keys": ["cm.name"],
-            "order": ["cm.name",
-                      "cm.cloud",
-                      "cm.kind",
-                      "cm.region",
-                      # "AvailabilityZone",
-                      # "CreateTime",
-                      # "Encrypted",
-                      "Size",
-                      # "SnapshotId",
-                      "State",
-                      # "VolumeId",
-                      # "Iops",
-                      "cm.tags",
-                      "VolumeType",
-                      # "created",
-                      "AttachedToVm",
-                      # "UpdateTime"
-                      ],
-            "header": ["Name",
-                       "Cloud",
-                       "Kind",
-                       "Region",
-                       # "AvailabilityZone",
-                       # "Create Time",
-                       # "Encrypted",
-                       "Size(GB)",
-                       # "SnapshotId",
-                       "Status",
-                       # "VolumeId",
-                       # "Iops",
-                       "Tags",
-                       "Volume Type",
-                       # "Created",
-                       "Attached To Vm",
-                       # "Update Time"
-                       ],
-        }
-    }
+    output = VolumeRecord.output
 
     def __init__(self, name=None):
         """
@@ -97,13 +60,14 @@ class Provider(VolumeABC):
         config = Config()
         self.default = config[f"cloudmesh.volume.{self.cloud}.default"]
         self.cred = config[f'cloudmesh.volume.{self.cloud}.credentials']
-        self.client = boto3.client('ec2',
-                                   region_name=self.default['region_name'],
-                                   aws_access_key_id=self.cred['EC2_ACCESS_ID'],
-                                   aws_secret_access_key=self.cred[
-                                       'EC2_SECRET_KEY']
-                                   )
+        self.client = ApiProfiler.wrap(
+            boto3.client('ec2',
+                         region_name=self.default['region_name'],
+                         aws_access_key_id=self.cred['EC2_ACCESS_ID'],
+                         aws_secret_access_key=self.cred['EC2_SECRET_KEY']),
+            "aws")
         self.cm = CmDatabase()
+        self.repository = VolumeRepository(cloud=self.cloud, kind="aws")
 
     def update_dict(self, results):
         """
@@ -188,6 +152,8 @@ class Provider(VolumeABC):
                 "region": entry["AvailabilityZone"],
                 "tags": tags
             })
+            entry["cm"].update(
+                VolumeRecord.from_entry("aws", entry, self.cloud).cm())
             d.append(entry)
         return d
 
@@ -317,6 +283,26 @@ class Provider(VolumeABC):
         sleep(time)
         return False
 
+    def wait_snapshot(self, snapshot_id, timeout=360):
+        """
+        This function waits until a snapshot is completed. The state is
+        read with the client of the provider, so the polls are profiled
+        and traced like all other API calls.
+
+        :param snapshot_id: the snapshot id
+        :param timeout: time to wait in seconds
+        :return: the state of the snapshot
+        """
+        with VolumeTracer.span("aws.wait_snapshot"):
+            waited = 0
+            while True:
+                state = self.client.describe_snapshots(
+                    SnapshotIds=[snapshot_id])['Snapshots'][0]['State']
+                if state == "completed" or waited >= timeout:
+                    return state
+                sleep(5)
+                waited += 5
+
     def status(self, name):
         """
         This function get volume status, such as "in-use", "available",
@@ -337,6 +323,7 @@ class Provider(VolumeABC):
         # volume_status = volume['Volumes'][0]['State']
         return result
 
+    @VolumeTracer.traced("aws.create")
     def create(self, **kwargs):
         """
         This function create a new volume, with defalt parameters in
@@ -427,6 +414,7 @@ class Provider(VolumeABC):
         result['Volumes'][0]['AttachedToVm'] = []
         return result
 
+    @VolumeTracer.traced("aws.list")
     def list(self, **kwargs):
 
         """
@@ -492,25 +480,25 @@ class Provider(VolumeABC):
             result = self.update_AttachedToVm(result)
             result = self.update_dict(result)
         elif kwargs and not kwargs['refresh']:
-            result = self.cm.find(cloud=self.cloud, kind='volume')
+            result = self.repository.find()
             for key in kwargs:
                 if key == 'NAME' and kwargs['NAME']:
-                    result = self.cm.find_name(name=kwargs['NAME'])
+                    result = self.repository.find_name(name=kwargs['NAME'])
                 elif key == 'NAMES' and kwargs['NAMES']:
-                    result = self.cm.find_names(names=kwargs['NAMES'])
+                    result = self.repository.find_names(names=kwargs['NAMES'])
                 elif key == 'vm' and kwargs['vm']:
-                    result = self.cm.find(collection=f"{self.cloud}-volume",
-                                          query={'AttachedToVm': kwargs['vm']})
+                    result = self.repository.find(
+                        {'cm.attached_vms': kwargs['vm']})
                 elif key == 'region' and kwargs['region']:
-                    result = self.cm.find(collection=f"{self.cloud}-volume",
-                                          query={'AvailabilityZone': kwargs[
-                                              'region']})
+                    result = self.repository.find(
+                        {'cm.region': kwargs['region']})
         else:
             result = self.client.describe_volumes()
             result = self.update_AttachedToVm(result)
             result = self.update_dict(result)
         return result
 
+    @VolumeTracer.traced("aws.delete")
     def delete(self, name):
         """
         This function delete one volume.
@@ -530,21 +518,23 @@ class Provider(VolumeABC):
         volume_id = self.find_volume_id(name)
         if result['Volumes'][0]['State'] == 'available':
             response = self.client.delete_volume(VolumeId=volume_id)
-            stop_timeout = 360
-            time = 0
-            while time <= stop_timeout:
-                sleep(5)
-                time += 5
-                try:
-                    volume_status = self.status(name=name)[0]['State']
-                except:
-                    break
+            with VolumeTracer.span("aws.wait_volume"):
+                stop_timeout = 360
+                time = 0
+                while time <= stop_timeout:
+                    sleep(5)
+                    time += 5
+                    try:
+                        volume_status = self.status(name=name)[0]['State']
+                    except:
+                        break
             result['Volumes'][0]['State'] = 'deleted'
         else:
             Console.error("volume is not available")
         result = self.update_dict(result)
         return result
 
+    @VolumeTracer.traced("aws.attach")
     def attach(self,
                names,
                vm,
@@ -582,6 +572,7 @@ class Provider(VolumeABC):
                     pass
         return self.list(NAMES=names, refresh=True)
 
+    @VolumeTracer.traced("aws.detach")
     def detach(self,
                name):
 
@@ -597,16 +588,18 @@ class Provider(VolumeABC):
         if volume_status == 'in-use':
             volume_id = self.find_volume_id(volume_name=name)
             rresponse = self.client.detach_volume(VolumeId=volume_id)
-        stop_timeout = 360
-        time = 0
-        while time <= stop_timeout:
-            sleep(5)
-            time += 5
-            volume_status = self.status(name=name)[0]['State']
-            if volume_status == "available":
-                break
+        with VolumeTracer.span("aws.wait_volume"):
+            stop_timeout = 360
+            time = 0
+            while time <= stop_timeout:
+                sleep(5)
+                time += 5
+                volume_status = self.status(name=name)[0]['State']
+                if volume_status == "available":
+                    break
         return self.list(NAME=name, refresh=True)[0]
 
+    @VolumeTracer.traced("aws.add_tag")
     def add_tag(self, **kwargs):
 
         """
@@ -641,6 +634,7 @@ class Provider(VolumeABC):
             result = self.list(NAME=kwargs['NAME'], refresh=True)[0]
         return result
 
+    @VolumeTracer.traced("aws.migrate")
     def migrate(self, **kwargs):
         """
         Migrate volume from one vm to another vm.
@@ -674,26 +668,19 @@ class Provider(VolumeABC):
             else:
                 snapshot_id = self.client.create_snapshot(
                     VolumeId=volume_id, )['SnapshotId']
-                ec2 = boto3.resource('ec2')
-                snapshot = ec2.Snapshot(snapshot_id)
-                start_timeout = 360
-                time = 0
-                while time <= start_timeout:
-                    sleep(5)
-                    time += 5
-                    if snapshot.state == "completed":
-                        break
+                self.wait_snapshot(snapshot_id)
                 kwargs['snapshot'] = snapshot_id
                 kwargs['region'] = vm_region
                 new_volume = self.create(name=volume_name, **kwargs)
-                start_timeout = 360
-                time = 0
-                while time <= start_timeout:
-                    sleep(5)
-                    time += 5
-                    status = self.status(name=volume_name)[0]['State']
-                    if status == "available":
-                        break
+                with VolumeTracer.span("aws.wait_volume"):
+                    start_timeout = 360
+                    time = 0
+                    while time <= start_timeout:
+                        sleep(5)
+                        time += 5
+                        status = self.status(name=volume_name)[0]['State']
+                        if status == "available":
+                            break
                 self.attach(names=[volume_name, ], vm=vm)
                 response = self.client.delete_volume(VolumeId=volume_id)
         else:
@@ -701,6 +688,7 @@ class Provider(VolumeABC):
         result = self.list(NAME=kwargs['NAME'], refresh=True)[0]
         return result
 
+    @VolumeTracer.traced("aws.sync")
     def sync(self, **kwargs):
         """
         sync contents of one volume to another volume
@@ -715,26 +703,19 @@ class Provider(VolumeABC):
         volume_2_id = self.find_volume_id(volume_name=volume_2)
         snapshot_id = self.client.create_snapshot(
             VolumeId=volume_2_id, )['SnapshotId']
-        ec2 = boto3.resource('ec2')
-        snapshot = ec2.Snapshot(snapshot_id)
-        start_timeout = 360
-        time = 0
-        while time <= start_timeout:
-            sleep(5)
-            time += 5
-            if snapshot.state == "completed":
-                break
+        self.wait_snapshot(snapshot_id)
         self.delete(name=volume_1)
         kwargs = {'region': volume_1_region, 'snapshot': snapshot_id,
                   'NAME': volume_1}
         new_volume = self.create(**kwargs)
-        start_timeout = 360
-        time = 0
-        while time <= start_timeout:
-            sleep(5)
-            time += 5
-            status = self.status(name=volume_1)[0]['State']
-            if status == "available":
-                break
+        with VolumeTracer.span("aws.wait_volume"):
+            start_timeout = 360
+            time = 0
+            while time <= start_timeout:
+                sleep(5)
+                time += 5
+                status = self.status(name=volume_1)[0]['State']
+                if status == "available":
+                    break
         return self.list(NAME=volume_1, refresh=True)[0]
 
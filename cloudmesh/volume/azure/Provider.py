@@ -4,7 +4,10 @@ from azure.mgmt.compute import ComputeManagementClient
 from cloudmesh.common.Printer import Printer
 from cloudmesh.common.console import Console
 from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.ApiProfiler import ApiProfiler
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 
 
 class Provider(VolumeABC):
@@ -70,28 +73,7 @@ class Provider(VolumeABC):
         'VERIFY_RESIZE'
     ]
 
-    output = {
-
-        "volume": {
-            "sort_keys": ["cm.name"],
-            "order": ["cm.name",
-                      "cm.cloud",
-                      "cm.kind",
-                      "cm.location",
-                      "cm.size",
-                      "cm.group_name",
-                      "id",
-                      ],
-            "header": ["Name",
-                       "Cloud",
-                       "Kind",
-                       "Region",
-                       "Size",
-                       "Group_Name",
-                       "Id",
-                       ],
-        }
-    }
+    output = VolumeRecord.output
 
     # need to update output
 
@@ -152,8 +134,18 @@ class Provider(VolumeABC):
         subscription = cred['AZURE_SUBSCRIPTION_ID']
 
         # Management Clients
-        self.compute_client = ComputeManagementClient(
-            credentials, subscription)
+        self.compute_client = ApiProfiler.wrap(
+            ComputeManagementClient(credentials, subscription), "azure")
+
+    def _result(self, poller):
+        """
+        Waits for the result of a long running operation
+
+        :param poller: the poller of the operation
+        :return: the result
+        """
+        with VolumeTracer.span("azure.wait"):
+            return poller.result()
 
     def Print(self, data, kind=None, output="table"):
         """
@@ -167,7 +159,7 @@ class Provider(VolumeABC):
         order = self.output["volume"]['order']
         header = self.output["volume"]['header']
         print(Printer.flatwrite(data,
-                                sort_keys=["name"],
+                                sort_keys=self.output["volume"]["sort_keys"],
                                 order=order,
                                 header=header,
                                 output=output,
@@ -206,9 +198,12 @@ class Provider(VolumeABC):
                 "size": self.size,
                 "group_name": self.group_name,
             })
+            entry["cm"].update(
+                VolumeRecord.from_entry("azure", entry, self.cloud).cm())
             d.append(entry)
         return d
 
+    @VolumeTracer.traced("azure.create")
     def create(self, **kwargs):
         """
         Create a volume.
@@ -232,10 +227,11 @@ class Provider(VolumeABC):
             }
         )
         # return after create
-        results = disk_creation.result().as_dict()
+        results = self._result(disk_creation).as_dict()
         result = self.update_dict([results])
         return result
 
+    @VolumeTracer.traced("azure.delete")
     def delete(self, name=None):
         """
         Delete volumes.
@@ -252,10 +248,11 @@ class Provider(VolumeABC):
             }
         )
         # return after deleting
-        results = disk_deletion.result()
+        results = self._result(disk_deletion)
         result = self.update_dict(results)
         return result
 
+    @VolumeTracer.traced("azure.list")
     def list(self, **kwargs):
         """
         This command list all volumes as follows:
@@ -287,6 +284,7 @@ class Provider(VolumeABC):
             found.extend(result)
         return found
 
+    @VolumeTracer.traced("azure.attach")
     def attach(self, names=None, vm=None):
         """
         This function attaches a given volume to a given instance
@@ -314,11 +312,13 @@ class Provider(VolumeABC):
                     vm,
                     virtual_machine
                 )
-            async_disk_attach.wait(10)
-            results = async_disk_attach.result().as_dict()
+            with VolumeTracer.span("azure.wait"):
+                async_disk_attach.wait(10)
+            results = self._result(async_disk_attach).as_dict()
             result = self.update_dict([results])
             return result
 
+    @VolumeTracer.traced("azure.detach")
     def detach(self, name=None):
         """
         Detach volumes from vm.
@@ -341,7 +341,7 @@ class Provider(VolumeABC):
             virtual_machine
         )
         # return after detaching
-        results = async_vm_update.result().as_dict()
+        results = self._result(async_vm_update).as_dict()
         result = self.update_dict([results])
         return result[0]
 
@@ -385,6 +385,7 @@ class Provider(VolumeABC):
         result = self.update_dict([results])
         return result
 
+    @VolumeTracer.traced("azure.add_tag")
     def add_tag(self, **kwargs):
         """
         This function add tag to a volume.
@@ -414,12 +415,14 @@ class Provider(VolumeABC):
                 }
             }
         )
-        async_vm_update.wait()
+        with VolumeTracer.span("azure.wait"):
+            async_vm_update.wait()
         # return after adding tags
-        results = async_vm_update.result().as_dict()
+        results = self._result(async_vm_update).as_dict()
         result = self.update_dict([results])
         return result[0]
 
+    @VolumeTracer.traced("azure.migrate")
     def migrate(self, **kwargs):
         """
         Migrate volume from one vm to another vm.
@@ -431,6 +434,7 @@ class Provider(VolumeABC):
         """
         raise NotImplementedError
 
+    @VolumeTracer.traced("azure.sync")
     def sync(self, names):
         """
         synchronize one volume with another volume
@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import math
+
+
+class BenchmarkLog(object):
+    """
+    Reads the results of cloudmesh Benchmark from logs. Benchmark.print
+    with csv=True writes its timers as lines
+
+        # csv,timer,status,time,start,tag,uname.node,user,...
+        # csv,test_02_volume_provider/test_provider_volume_create,ok,0.75,...
+
+    between the output of pytest. The logs are read line by line, so any
+    number of them can be read, and the csv lines are returned as records.
+    The tag of a record is the provider, e.g. aws, the timer the operation.
+
+    The records are aggregated by provider and operation over all runs
+
+        {
+            "provider": "aws",
+            "operation": "test_02_volume_provider/test_provider_volume_list",
+            "count": number of runs with status ok,
+            "failed": number of runs with another status,
+            "min": seconds, "p50": seconds, "p95": seconds,
+            "max": seconds, "mean": seconds
+        }
+
+    and can be compared with a baseline of aggregates saved as json.
+    """
+
+    prefix = "# csv,"
+
+    statistics = ["min", "p50", "p95", "max", "mean"]
+
+    def __init__(self, tolerance=0.2):
+        """
+        Initialize the reader
+
+        :param tolerance: the fraction by which the p50 of an operation may
+                          differ from the baseline before it is reported as
+                          slower or faster
+        """
+        self.tolerance = tolerance
+
+    def records(self, paths):
+        """
+        The csv records of the logs. A record has the fields of the csv
+        header that precedes it, the time as float and the log it is from.
+        The last field, platform.version, may contain commas.
+
+        :param paths: list of paths of logs
+        :return: generator of dicts
+        """
+        for path in paths:
+            header = None
+            with open(path, errors="replace") as log:
+                for line in log:
+                    if not line.startswith(BenchmarkLog.prefix):
+                        continue
+                    line = line[len(BenchmarkLog.prefix):].rstrip("\n")
+                    if line.startswith("timer,"):
+                        header = line.split(",")
+                        continue
+                    if header is None:
+                        continue
+                    values = line.split(",", len(header) - 1)
+                    if len(values) != len(header):
+                        continue
+                    record = dict(zip(header, values))
+                    try:
+                        record["time"] = float(record["time"])
+                    except (KeyError, ValueError):
+                        continue
+                    record["log"] = path
+                    yield record
+
+    @staticmethod
+    def percentile(values, p):
+        """
+        The percentile of sorted values, interpolated linearly between the
+        closest ranks
+
+        :param values: sorted list of numbers
+        :param p: percentile between 0 and 100
+        :return: float or None if there are no values
+        """
+        if not values:
+            return None
+        k = (len(values) - 1) * p / 100
+        f = math.floor(k)
+        c = math.ceil(k)
+        if f == c:
+            return values[int(k)]
+        return values[f] + (values[c] - values[f]) * (k - f)
+
+    def aggregate(self, records):
+        """
+        Aggregates the times of the records by provider and operation
+
+        :param records: iterable of records
+        :return: list of dicts sorted by provider and operation
+        """
+        times = {}
+        failed = {}
+        for record in records:
+            key = (record.get("tag"), record["timer"])
+            times.setdefault(key, [])
+            failed.setdefault(key, 0)
+            if record.get("status") == "ok":
+                times[key].append(record["time"])
+            else:
+                failed[key] += 1
+        result = []
+        for (provider, operation), values in sorted(
+                times.items(), key=lambda item: (str(item[0][0]),
+                                                 item[0][1])):
+            values = sorted(values)
+            entry = {
+                "provider": provider,
+                "operation": operation,
+                "count": len(values),
+                "failed": failed[(provider, operation)],
+                "min": values[0] if values else None,
+                "p50": self.percentile(values, 50),
+                "p95": self.percentile(values, 95),
+                "max": values[-1] if values else None,
+                "mean": sum(values) / len(values) if values else None,
+            }
+            for key in BenchmarkLog.statistics:
+                if entry[key] is not None:
+                    entry[key] = round(entry[key], 4)
+            result.append(entry)
+        return result
+
+    def compare(self, results, baseline):
+        """
+        Compares aggregates with the aggregates of a baseline. The status of
+        an operation is
+
+            slower: its p50 is more than tolerance above the baseline
+            faster: its p50 is more than tolerance below the baseline
+            same: otherwise
+            new: it is not in the baseline
+            missing: it is only in the baseline
+
+        :param results: list of aggregates
+        :param baseline: list of aggregates
+        :return: list of dicts with provider, operation, baseline, p50,
+                 ratio and status
+        """
+        before = {(e["provider"], e["operation"]): e for e in baseline}
+        after = {(e["provider"], e["operation"]): e for e in results}
+        result = []
+        for key in sorted(set(before) | set(after),
+                          key=lambda k: (str(k[0]), k[1])):
+            old = (before.get(key) or {}).get("p50")
+            new = (after.get(key) or {}).get("p50")
+            ratio = None
+            if key not in before:
+                status = "new"
+            elif key not in after:
+                status = "missing"
+            elif not old or new is None:
+                status = "same"
+            else:
+                ratio = round(new / old, 3)
+                if ratio > 1 + self.tolerance:
+                    status = "slower"
+                elif ratio < 1 - self.tolerance:
+                    status = "faster"
+                else:
+                    status = "same"
+            result.append({
+                "provider": key[0],
+                "operation": key[1],
+                "baseline": old,
+                "p50": new,
+                "ratio": ratio,
+                "status": status
+            })
+        return result
+
+    @staticmethod
+    def load(path):
+        """
+        Reads aggregates saved with save
+
+        :param path: path of the json file
+        :return: list of dicts
+        """
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def save(path, results):
+        """
+        Saves aggregates as json, e.g. as baseline
+
+        :param path: path of the json file
+        :param results: list of dicts
+        """
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    @staticmethod
+    def csv(results):
+        """
+        Formats aggregates or a comparison as csv
+
+        :param results: list of dicts
+        :return: string
+        """
+        if not results:
+            return ""
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(results[0].keys()),
+                                lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+        return output.getvalue()
@@ -0,0 +1,173 @@
+import datetime
+import types
+
+
+class FakePoller(object):
+    """
+    A long running operation of the azure SDK that is already done
+    """
+
+    def __init__(self, result=None):
+        self._result = result
+
+    def wait(self, timeout=None):
+        return None
+
+    def done(self):
+        return True
+
+    def result(self, timeout=None):
+        return self._result
+
+
+class FakeModel(types.SimpleNamespace):
+    """
+    A model of the azure SDK, as_dict returns its attributes
+    """
+
+    def as_dict(self):
+        result = {}
+        for key, value in vars(self).items():
+            if isinstance(value, FakeModel):
+                value = value.as_dict()
+            elif isinstance(value, list):
+                value = [v.as_dict() if isinstance(v, FakeModel) else v
+                         for v in value]
+            result[key] = value
+        return result
+
+
+class FakeAzure(object):
+    """
+    A stand-in for the ComputeManagementClient of the azure volume
+    provider. It implements the calls of the provider on a FakeCloud:
+
+        disks: create_or_update, delete, get, list_by_resource_group
+        virtual_machines: get, create_or_update
+
+    Disks are attached and detached by updating the data disks of a vm, as
+    in azure. The long running operations return a FakePoller that is done.
+    """
+
+    url = "/subscriptions/benchmark/resourceGroups/{group}/providers/" \
+          "Microsoft.Compute"
+
+    def __init__(self, cloud):
+        """
+        :param cloud: the FakeCloud
+        """
+        self.cloud = cloud
+        self.disks = types.SimpleNamespace(
+            create_or_update=self.create_or_update_disk,
+            delete=self.delete_disk,
+            get=self.get_disk,
+            list_by_resource_group=self.list_disks)
+        self.virtual_machines = types.SimpleNamespace(
+            get=self.get_vm,
+            create_or_update=self.create_or_update_vm)
+
+    @staticmethod
+    def modules(cloud):
+        """
+        The modules to put into sys.modules instead of azure.common and
+        azure.mgmt.compute
+
+        :param cloud: the FakeCloud
+        :return: dict of module names to modules
+        """
+        azure = types.ModuleType("azure")
+        common = types.ModuleType("azure.common")
+        credentials = types.ModuleType("azure.common.credentials")
+        credentials.ServicePrincipalCredentials = \
+            lambda **kwargs: FakeModel(**kwargs)
+        mgmt = types.ModuleType("azure.mgmt")
+        compute = types.ModuleType("azure.mgmt.compute")
+        compute.ComputeManagementClient = \
+            lambda credentials, subscription, **kwargs: FakeAzure(cloud)
+        models = types.ModuleType("azure.mgmt.compute.models")
+        models.DiskCreateOption = types.SimpleNamespace(attach="Attach",
+                                                        empty="Empty")
+        azure.common = common
+        common.credentials = credentials
+        azure.mgmt = mgmt
+        mgmt.compute = compute
+        compute.models = models
+        return {
+            "azure": azure,
+            "azure.common": common,
+            "azure.common.credentials": credentials,
+            "azure.mgmt": mgmt,
+            "azure.mgmt.compute": compute,
+            "azure.mgmt.compute.models": models,
+        }
+
+    def _disk(self, volume, group="default"):
+        base = self.url.format(group=group)
+        managed_by = None
+        if volume["vms"]:
+            managed_by = f"{base}/virtualMachines/{volume['vms'][0]}"
+        return FakeModel(
+            id=f"{base}/disks/{volume['name']}",
+            name=volume["name"],
+            location=volume["zone"],
+            disk_size_gb=volume["size"],
+            disk_state="Attached" if volume["vms"] else "Unattached",
+            managed_by=managed_by,
+            tags=dict(volume["tags"]),
+            time_created=datetime.datetime.fromtimestamp(volume["created"]))
+
+    def create_or_update_disk(self, group, name, parameters):
+        self.cloud.call("azure.disks.create_or_update")
+        volume = self.cloud.find(name=name)
+        if volume is None:
+            volume = self.cloud.create(name,
+                                       size=parameters.get("disk_size_gb"),
+                                       zone=parameters.get("location"))
+        tags = parameters.get("tags")
+        if tags:
+            volume["tags"][tags["Key"]] = tags["Value"]
+        return FakePoller(self._disk(volume, group))
+
+    def delete_disk(self, group, name, *args, **kwargs):
+        self.cloud.call("azure.disks.delete")
+        volume = self.cloud.find(name=name)
+        if volume is not None:
+            self.cloud.delete(volume)
+        return FakePoller(None)
+
+    def get_disk(self, group, name):
+        self.cloud.call("azure.disks.get")
+        volume = self.cloud.find(name=name)
+        if volume is None:
+            raise ValueError(f"disk {name} not found")
+        return self._disk(volume, group)
+
+    def list_disks(self, group):
+        self.cloud.call("azure.disks.list_by_resource_group")
+        return [self._disk(volume, group) for volume in self.cloud.list()]
+
+    def get_vm(self, group, name):
+        self.cloud.call("azure.virtual_machines.get")
+        disks = [FakeModel(lun=1, name=volume["name"])
+                 for volume in self.cloud.list() if name in volume["vms"]]
+        return FakeModel(
+            id=f"{self.url.format(group=group)}/virtualMachines/{name}",
+            name=name,
+            location=self.cloud.zone,
+            storage_profile=FakeModel(data_disks=disks))
+
+    def create_or_update_vm(self, group, name, vm):
+        self.cloud.call("azure.virtual_machines.create_or_update")
+        names = [disk["name"] if isinstance(disk, dict) else disk.name
+                 for disk in vm.storage_profile.data_disks]
+        for volume in self.cloud.list():
+            if volume["name"] in names:
+                self.cloud.attach(volume, name)
+            elif name in volume["vms"]:
+                self.cloud.detach(volume, name)
+        return FakePoller(FakeModel(
+            id=vm.id,
+            name=name,
+            location=vm.location,
+            storage_profile=FakeModel(data_disks=[
+                FakeModel(lun=1, name=n) for n in names])))
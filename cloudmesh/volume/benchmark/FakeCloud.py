@@ -0,0 +1,167 @@
+import itertools
+import threading
+import time
+from collections import Counter
+
+
+class FakeCloud(object):
+    """
+    The in-memory state of a cloud for the offline benchmarks.
+
+    The stand-ins of the cloud SDKs, e.g. FakeEc2 for boto3, keep their
+    volumes and vms in a FakeCloud and translate them into the objects the
+    SDK returns. Every API call of a stand-in is counted by its name, e.g.
+    "ec2.describe_volumes", and is delayed by the latency of the call:
+
+        cloud = FakeCloud(latency=0.05,
+                          latencies={"ec2.create_volume": 0.5})
+
+    Providers wait for a cloud in polling loops with time.sleep or the
+    waiters of the SDK. The stand-ins change the state of a volume at once,
+    so a wait is not slept but only added to waited, the seconds the
+    provider would have waited.
+
+    A volume is a dict
+
+        {
+            "name": name,
+            "id": unique id,
+            "size": size in GB,
+            "zone": availability zone,
+            "state": "available", "in-use" or "deleted",
+            "vms": [names of the vms the volume is attached to],
+            "tags": {key: value},
+            "created": seconds since epoch
+        }
+
+    and a vm a dict with name, id and state ("running" or "stopped").
+    """
+
+    zone = "zone-a"
+
+    def __init__(self, latency=0.0, latencies=None, vms=10):
+        """
+        Initialize the cloud
+
+        :param latency: seconds every API call takes
+        :param latencies: dict of call names to the seconds they take
+        :param vms: number of vms, they are named vm-0, vm-1, ...
+        """
+        self.latency = latency or 0.0
+        self.latencies = latencies or {}
+        self.calls = Counter()
+        self.waited = 0.0
+        self.volumes = {}
+        self.vms = {f"vm-{i}": {"name": f"vm-{i}",
+                                "id": f"i-{i:08d}",
+                                "state": "running"} for i in range(vms)}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def call(self, name):
+        """
+        Counts an API call and delays it by its latency
+
+        :param name: name of the call
+        """
+        with self._lock:
+            self.calls[name] += 1
+        latency = self.latencies.get(name, self.latency)
+        if latency:
+            time.sleep(latency)
+
+    def sleep(self, seconds):
+        """
+        Records a wait of a provider instead of sleeping
+
+        :param seconds: the seconds the provider waits
+        """
+        with self._lock:
+            self.waited += seconds or 0
+
+    def reset(self):
+        """
+        Clears the counted calls and waits
+        """
+        with self._lock:
+            self.calls.clear()
+            self.waited = 0.0
+
+    def next_id(self, prefix):
+        return f"{prefix}-{next(self._ids):08d}"
+
+    def create(self, name, size=1, zone=None, tags=None):
+        """
+        Creates a volume
+
+        :return: dict of the volume
+        """
+        with self._lock:
+            volume = {
+                "name": name,
+                "id": self.next_id("vol"),
+                "size": int(size or 1),
+                "zone": zone or FakeCloud.zone,
+                "state": "available",
+                "vms": [],
+                "tags": dict(tags or {}),
+                "created": time.time()
+            }
+            self.volumes[volume["id"]] = volume
+            return volume
+
+    def find(self, name=None, id=None):
+        """
+        Finds a volume that is not deleted by name or id
+
+        :return: dict or None
+        """
+        if id is not None:
+            volume = self.volumes.get(id)
+            if volume and volume["state"] != "deleted":
+                return volume
+            return None
+        for volume in self.volumes.values():
+            if volume["name"] == name and volume["state"] != "deleted":
+                return volume
+        return None
+
+    def list(self):
+        """
+        The volumes that are not deleted
+
+        :return: list of dicts
+        """
+        return [volume for volume in self.volumes.values()
+                if volume["state"] != "deleted"]
+
+    def delete(self, volume):
+        with self._lock:
+            volume["state"] = "deleted"
+            volume["vms"] = []
+
+    def attach(self, volume, vm):
+        with self._lock:
+            if vm not in volume["vms"]:
+                volume["vms"].append(vm)
+            volume["state"] = "in-use"
+
+    def detach(self, volume, vm=None):
+        with self._lock:
+            if vm is None:
+                volume["vms"] = []
+            elif vm in volume["vms"]:
+                volume["vms"].remove(vm)
+            if not volume["vms"]:
+                volume["state"] = "available"
+
+    def vm(self, name=None, id=None):
+        """
+        Finds a vm by name or id
+
+        :return: dict or None
+        """
+        for vm in self.vms.values():
+            if vm["name"] == name or (id is not None and vm["id"] == id):
+                return vm
+        return None
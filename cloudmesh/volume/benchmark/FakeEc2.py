@@ -0,0 +1,146 @@
+import copy
+import datetime
+import types
+
+
+class FakeEc2(object):
+    """
+    A stand-in for the boto3 EC2 client of the aws volume provider. It
+    implements the calls of the provider on a FakeCloud and returns the
+    dicts of the EC2 API:
+
+        describe_volumes, describe_instances, create_volume, delete_volume,
+        attach_volume, detach_volume, create_tags
+
+    An attach of a volume that is already in use fails like in EC2, the
+    provider then tries the next device.
+    """
+
+    def __init__(self, cloud):
+        """
+        :param cloud: the FakeCloud
+        """
+        self.cloud = cloud
+
+    @staticmethod
+    def modules(cloud):
+        """
+        The modules to put into sys.modules instead of boto3
+
+        :param cloud: the FakeCloud
+        :return: dict of module names to modules
+        """
+        boto3 = types.ModuleType("boto3")
+        boto3.client = lambda *args, **kwargs: FakeEc2(cloud)
+        boto3.resource = lambda *args, **kwargs: FakeEc2(cloud)
+        return {"boto3": boto3}
+
+    def _volume(self, volume):
+        tags = [{"Key": "Name", "Value": volume["name"]}] + \
+               [{"Key": key, "Value": value}
+                for key, value in volume["tags"].items()]
+        return copy.deepcopy({
+            "Attachments": [{
+                "Device": "/dev/sdb",
+                "InstanceId": self.cloud.vm(name=vm)["id"],
+                "State": "attached",
+                "VolumeId": volume["id"],
+                "DeleteOnTermination": False
+            } for vm in volume["vms"]],
+            "AvailabilityZone": volume["zone"],
+            "CreateTime": datetime.datetime.fromtimestamp(volume["created"]),
+            "Encrypted": False,
+            "Size": volume["size"],
+            "State": volume["state"],
+            "VolumeId": volume["id"],
+            "Tags": tags,
+            "VolumeType": "gp2"
+        })
+
+    def _instance(self, vm):
+        return {
+            "InstanceId": vm["id"],
+            "State": {"Name": vm["state"]},
+            "Tags": [{"Key": "Name", "Value": vm["name"]}]
+        }
+
+    @staticmethod
+    def _filter(filters, name):
+        for f in filters or []:
+            if f["Name"] == name:
+                return f["Values"]
+        return None
+
+    def describe_volumes(self, Filters=None, **kwargs):
+        self.cloud.call("ec2.describe_volumes")
+        volumes = self.cloud.list()
+        names = self._filter(Filters, "tag:Name")
+        if names is not None:
+            volumes = [v for v in volumes if v["name"] in names]
+        ids = self._filter(Filters, "attachment.instance-id")
+        if ids is not None:
+            volumes = [v for v in volumes
+                       if any(self.cloud.vm(name=vm)["id"] in ids
+                              for vm in v["vms"])]
+        zones = self._filter(Filters, "availability-zone")
+        if zones is not None:
+            volumes = [v for v in volumes if v["zone"] in zones]
+        return {"Volumes": [self._volume(v) for v in volumes]}
+
+    def describe_instances(self, Filters=None, InstanceIds=None, **kwargs):
+        self.cloud.call("ec2.describe_instances")
+        vms = list(self.cloud.vms.values())
+        names = self._filter(Filters, "tag:Name")
+        if names is not None:
+            vms = [vm for vm in vms if vm["name"] in names]
+        if InstanceIds is not None:
+            vms = [vm for vm in vms if vm["id"] in InstanceIds]
+        return {"Reservations": [{"Instances": [self._instance(vm)]}
+                                 for vm in vms]}
+
+    def create_volume(self, AvailabilityZone=None, Size=None,
+                      TagSpecifications=None, **kwargs):
+        self.cloud.call("ec2.create_volume")
+        name = None
+        for spec in TagSpecifications or []:
+            for tag in spec["Tags"]:
+                if tag["Key"] == "Name":
+                    name = tag["Value"]
+        volume = self.cloud.create(name, size=Size, zone=AvailabilityZone)
+        return self._volume(volume)
+
+    def delete_volume(self, VolumeId=None, **kwargs):
+        self.cloud.call("ec2.delete_volume")
+        volume = self.cloud.find(id=VolumeId)
+        if volume is None or volume["vms"]:
+            raise ValueError(f"volume {VolumeId} can not be deleted")
+        self.cloud.delete(volume)
+        return {}
+
+    def attach_volume(self, Device=None, InstanceId=None, VolumeId=None,
+                      **kwargs):
+        self.cloud.call("ec2.attach_volume")
+        volume = self.cloud.find(id=VolumeId)
+        vm = self.cloud.vm(id=InstanceId)
+        if volume is None or vm is None or volume["vms"]:
+            raise ValueError(f"volume {VolumeId} can not be attached")
+        self.cloud.attach(volume, vm["name"])
+        return {"Device": Device, "InstanceId": InstanceId,
+                "VolumeId": VolumeId, "State": "attaching"}
+
+    def detach_volume(self, VolumeId=None, **kwargs):
+        self.cloud.call("ec2.detach_volume")
+        volume = self.cloud.find(id=VolumeId)
+        self.cloud.detach(volume)
+        return {"VolumeId": VolumeId, "State": "detaching"}
+
+    def create_tags(self, Resources=None, Tags=None, **kwargs):
+        self.cloud.call("ec2.create_tags")
+        for id in Resources or []:
+            volume = self.cloud.find(id=id)
+            for tag in Tags or []:
+                if tag["Key"] == "Name":
+                    volume["name"] = tag["Value"]
+                else:
+                    volume["tags"][tag["Key"]] = tag["Value"]
+        return {}
@@ -0,0 +1,249 @@
+import copy
+import datetime
+import types
+
+
+class HttpError(Exception):
+    """
+    Stand-in for googleapiclient.errors.HttpError
+    """
+
+    def __init__(self, status, reason=""):
+        super().__init__(f"{status} {reason}")
+        self.status = status
+
+
+class FakeRequest(object):
+    """
+    A request of the discovery service, the call is made by execute
+    """
+
+    def __init__(self, cloud, name, function):
+        self.cloud = cloud
+        self.name = name
+        self.function = function
+
+    def execute(self):
+        self.cloud.call(self.name)
+        return copy.deepcopy(self.function())
+
+
+class FakeGoogle(object):
+    """
+    A stand-in for the Google Compute Engine discovery service of the
+    google volume provider. It implements the disk and instance calls of
+    the provider on a FakeCloud and returns the dicts of the API:
+
+        disks(): get, insert, list, aggregatedList, delete, setLabels
+        instances(): get, aggregatedList, stop, start, attachDisk,
+                     detachDisk
+
+    build and the loading of the service account credentials are counted
+    as calls, as they read a file or fetch the discovery document.
+    """
+
+    url = "https://www.googleapis.com/compute/v1/projects"
+
+    def __init__(self, cloud, project="benchmark"):
+        """
+        :param cloud: the FakeCloud
+        :param project: the project id
+        """
+        self.cloud = cloud
+        self.project = project
+
+    @staticmethod
+    def modules(cloud):
+        """
+        The modules to put into sys.modules instead of googleapiclient and
+        google.oauth2
+
+        :param cloud: the FakeCloud
+        :return: dict of module names to modules
+        """
+        def build(*args, **kwargs):
+            cloud.call("google.build")
+            return FakeGoogle(cloud)
+
+        def from_service_account_file(*args, **kwargs):
+            cloud.call("google.credentials")
+            return object()
+
+        googleapiclient = types.ModuleType("googleapiclient")
+        discovery = types.ModuleType("googleapiclient.discovery")
+        discovery.build = build
+        errors = types.ModuleType("googleapiclient.errors")
+        errors.HttpError = HttpError
+        googleapiclient.discovery = discovery
+        googleapiclient.errors = errors
+        google = types.ModuleType("google")
+        oauth2 = types.ModuleType("google.oauth2")
+        service_account = types.ModuleType("google.oauth2.service_account")
+        service_account.Credentials = types.SimpleNamespace(
+            from_service_account_file=from_service_account_file)
+        google.oauth2 = oauth2
+        oauth2.service_account = service_account
+        return {
+            "googleapiclient": googleapiclient,
+            "googleapiclient.discovery": discovery,
+            "googleapiclient.errors": errors,
+            "google": google,
+            "google.oauth2": oauth2,
+            "google.oauth2.service_account": service_account,
+        }
+
+    def _zone(self, zone):
+        return f"{self.url}/{self.project}/zones/{zone}"
+
+    def _disk(self, volume):
+        disk = {
+            "kind": "compute#disk",
+            "id": volume["id"],
+            "creationTimestamp": datetime.datetime.fromtimestamp(
+                volume["created"]).isoformat(),
+            "name": volume["name"],
+            "sizeGb": str(volume["size"]),
+            "zone": self._zone(volume["zone"]),
+            "status": "READY",
+            "selfLink": f"{self._zone(volume['zone'])}/disks/"
+                        f"{volume['name']}",
+            "type": f"{self._zone(volume['zone'])}/diskTypes/pd-standard",
+            "labelFingerprint": "42WmSpB8rSM=",
+        }
+        if volume["vms"]:
+            disk["users"] = [f"{self._zone(volume['zone'])}/instances/{vm}"
+                             for vm in volume["vms"]]
+        if volume["tags"]:
+            disk["labels"] = dict(volume["tags"])
+        return disk
+
+    def _instance(self, vm):
+        return {
+            "kind": "compute#instance",
+            "id": vm["id"],
+            "name": vm["name"],
+            "zone": self._zone(self.cloud.zone),
+            "status": "RUNNING" if vm["state"] == "running" else "TERMINATED"
+        }
+
+    def _get_volume(self, name):
+        volume = self.cloud.find(name=name)
+        if volume is None:
+            raise HttpError(404, f"disk {name} not found")
+        return volume
+
+    @staticmethod
+    def _last(url):
+        return url.rsplit("/", 1)[-1]
+
+    def disks(self):
+        cloud = self.cloud
+
+        def get(project=None, zone=None, disk=None):
+            def _get():
+                return self._disk(self._get_volume(disk))
+
+            return FakeRequest(cloud, "google.disks.get", _get)
+
+        def insert(project=None, zone=None, body=None):
+            def _insert():
+                cloud.create(body["name"], size=body.get("sizeGb"),
+                             zone=zone)
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return FakeRequest(cloud, "google.disks.insert", _insert)
+
+        def _list(project=None, zone=None, **kwargs):
+            def _list():
+                return {"items": [self._disk(v) for v in cloud.list()
+                                  if v["zone"] == zone]}
+
+            return FakeRequest(cloud, "google.disks.list", _list)
+
+        def aggregatedList(project=None, **kwargs):
+            def _aggregated():
+                items = {}
+                for volume in cloud.list():
+                    items.setdefault(f"zones/{volume['zone']}",
+                                     {"disks": []})["disks"].append(
+                        self._disk(volume))
+                return {"items": items}
+
+            return FakeRequest(cloud, "google.disks.aggregatedList",
+                               _aggregated)
+
+        def delete(project=None, zone=None, disk=None):
+            def _delete():
+                cloud.delete(self._get_volume(disk))
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return FakeRequest(cloud, "google.disks.delete", _delete)
+
+        def setLabels(project=None, zone=None, resource=None, body=None):
+            def _set_labels():
+                self._get_volume(resource)["tags"] = dict(body["labels"])
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return FakeRequest(cloud, "google.disks.setLabels", _set_labels)
+
+        return types.SimpleNamespace(get=get, insert=insert, list=_list,
+                                     aggregatedList=aggregatedList,
+                                     delete=delete, setLabels=setLabels)
+
+    def instances(self):
+        cloud = self.cloud
+
+        def _vm(name):
+            vm = cloud.vm(name=name)
+            if vm is None:
+                raise HttpError(404, f"instance {name} not found")
+            return vm
+
+        def get(project=None, zone=None, instance=None):
+            return FakeRequest(cloud, "google.instances.get",
+                               lambda: self._instance(_vm(instance)))
+
+        def aggregatedList(project=None, **kwargs):
+            def _aggregated():
+                return {"items": {f"zones/{cloud.zone}": {
+                    "instances": [self._instance(vm)
+                                  for vm in cloud.vms.values()]}}}
+
+            return FakeRequest(cloud, "google.instances.aggregatedList",
+                               _aggregated)
+
+        def _state(name, state):
+            def _set():
+                _vm(name)["state"] = state
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return _set
+
+        def stop(project=None, zone=None, instance=None):
+            return FakeRequest(cloud, "google.instances.stop",
+                               _state(instance, "stopped"))
+
+        def start(project=None, zone=None, instance=None):
+            return FakeRequest(cloud, "google.instances.start",
+                               _state(instance, "running"))
+
+        def attachDisk(project=None, zone=None, instance=None, body=None):
+            def _attach():
+                volume = self._get_volume(self._last(body["source"]))
+                cloud.attach(volume, _vm(instance)["name"])
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return FakeRequest(cloud, "google.instances.attachDisk", _attach)
+
+        def detachDisk(project=None, zone=None, instance=None,
+                       deviceName=None):
+            def _detach():
+                cloud.detach(self._get_volume(deviceName), instance)
+                return {"kind": "compute#operation", "status": "RUNNING"}
+
+            return FakeRequest(cloud, "google.instances.detachDisk", _detach)
+
+        return types.SimpleNamespace(get=get, aggregatedList=aggregatedList,
+                                     stop=stop, start=start,
+                                     attachDisk=attachDisk,
+                                     detachDisk=detachDisk)
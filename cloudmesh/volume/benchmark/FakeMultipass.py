@@ -0,0 +1,77 @@
+import json
+import types
+
+
+class FakeMultipass(object):
+    """
+    A stand-in for the multipass command of the multipass volume provider.
+    The provider runs multipass in two places, which are both replaced:
+
+        shell: Shell.run of MultipassInfo, answers
+               multipass info --all --format=json
+        pool: the MountPool of the provider, runs multipass mount and
+              unmount for (path, vm) pairs
+
+    The vms are the vms of the FakeCloud, a volume is mounted into a vm
+    at its own path. Every info and every mount or unmount of a pair is
+    counted as a call.
+    """
+
+    def __init__(self, cloud):
+        """
+        :param cloud: the FakeCloud
+        """
+        self.cloud = cloud
+        self.mounts = {name: {} for name in cloud.vms}
+        self.shell = types.SimpleNamespace(run=self.info)
+
+    def pool(self, workers=None):
+        """
+        Creates the pool, all pools share the mounts of the FakeMultipass
+
+        :param workers: ignored, the pairs are run one after the other
+        :return: the FakeMultipass
+        """
+        return self
+
+    def info(self, command):
+        """
+        The output of multipass info --all --format=json
+
+        :param command: the command
+        :return: json string
+        """
+        self.cloud.call("multipass.info")
+        return json.dumps({"errors": [], "info": {
+            name: {"state": "Running" if vm["state"] == "running"
+                   else "Stopped",
+                   "mounts": {path: {"source_path": path}
+                              for path in self.mounts[name]}}
+            for name, vm in self.cloud.vms.items()}})
+
+    def run(self, action, pairs):
+        """
+        Mounts or unmounts (path, vm) pairs
+
+        :param action: "mount" or "unmount"
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts with path, vm, command, returncode and output
+        """
+        results = []
+        for path, vm in pairs:
+            self.cloud.call(f"multipass.{action}")
+            returncode, output = 0, ""
+            if vm not in self.mounts:
+                returncode, output = 2, f"instance \"{vm}\" does not exist"
+            elif action == "mount":
+                self.mounts[vm][path] = True
+            else:
+                self.mounts[vm].pop(path, None)
+            results.append({
+                "path": path,
+                "vm": vm,
+                "command": ["multipass", action, path, vm],
+                "returncode": returncode,
+                "output": output
+            })
+        return results
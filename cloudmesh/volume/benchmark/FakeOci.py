@@ -0,0 +1,132 @@
+import datetime
+import types
+
+
+class FakeOci(object):
+    """
+    A stand-in for the oci SDK of the oracle volume provider. It implements
+    the calls of the provider on a FakeCloud and returns responses with the
+    model objects in data:
+
+        BlockstorageClient: list_volumes, get_volume, create_volume,
+                            update_volume, delete_volume
+        ComputeClient: list_instances, attach_volume, detach_volume,
+                       get_volume_attachment
+        wait_until
+
+    The models of the requests, e.g. CreateVolumeDetails, keep their
+    keyword arguments as attributes.
+    """
+
+    states = {"available": "AVAILABLE",
+              "in-use": "AVAILABLE",
+              "deleted": "TERMINATED"}
+
+    def __init__(self, cloud):
+        """
+        :param cloud: the FakeCloud
+        """
+        self.cloud = cloud
+        self.attachments = {}
+
+    @staticmethod
+    def modules(cloud):
+        """
+        The modules to put into sys.modules instead of oci
+
+        :param cloud: the FakeCloud
+        :return: dict of module names to modules
+        """
+        fake = FakeOci(cloud)
+
+        def wait_until(client, response, attribute, state, **kwargs):
+            cloud.call("oci.wait_until")
+            return response
+
+        def model(name):
+            return type(name, (types.SimpleNamespace,), {})
+
+        oci = types.ModuleType("oci")
+        oci.wait_until = wait_until
+        oci.core = types.SimpleNamespace(
+            BlockstorageClient=lambda config, **kwargs: fake,
+            ComputeClient=lambda config, **kwargs: fake,
+            models=types.SimpleNamespace(
+                CreateVolumeDetails=model("CreateVolumeDetails"),
+                AttachIScsiVolumeDetails=model("AttachIScsiVolumeDetails"),
+                UpdateVolumeDetails=model("UpdateVolumeDetails")))
+        return {"oci": oci}
+
+    @staticmethod
+    def _response(data):
+        return types.SimpleNamespace(data=data, status=200)
+
+    def _volume(self, volume):
+        return types.SimpleNamespace(
+            display_name=volume["name"],
+            availability_domain=volume["zone"],
+            time_created=datetime.datetime.fromtimestamp(volume["created"]),
+            size_in_gbs=volume["size"],
+            lifecycle_state=self.states[volume["state"]],
+            id=volume["id"],
+            freeform_tags=dict(volume["tags"]))
+
+    def list_volumes(self, compartment_id, **kwargs):
+        self.cloud.call("oci.list_volumes")
+        return self._response([self._volume(v) for v in self.cloud.list()])
+
+    def get_volume(self, volume_id, **kwargs):
+        self.cloud.call("oci.get_volume")
+        return self._response(self._volume(self.cloud.volumes[volume_id]))
+
+    def create_volume(self, details, **kwargs):
+        self.cloud.call("oci.create_volume")
+        volume = self.cloud.create(details.display_name,
+                                   size=getattr(details, "size_in_gbs", 50),
+                                   zone=details.availability_domain)
+        return self._response(self._volume(volume))
+
+    def update_volume(self, volume_id, details, **kwargs):
+        self.cloud.call("oci.update_volume")
+        volume = self.cloud.volumes[volume_id]
+        volume["tags"] = dict(details.freeform_tags)
+        return self._response(self._volume(volume))
+
+    def delete_volume(self, volume_id=None, **kwargs):
+        self.cloud.call("oci.delete_volume")
+        self.cloud.delete(self.cloud.volumes[volume_id])
+        return self._response(None)
+
+    def list_instances(self, compartment_id, **kwargs):
+        self.cloud.call("oci.list_instances")
+        return self._response([
+            types.SimpleNamespace(display_name=vm["name"], id=vm["id"],
+                                  lifecycle_state="RUNNING")
+            for vm in self.cloud.vms.values()])
+
+    def _attachment(self, attachment_id):
+        volume_id, vm, state = self.attachments[attachment_id]
+        return types.SimpleNamespace(id=attachment_id, volume_id=volume_id,
+                                     instance_id=vm, lifecycle_state=state)
+
+    def attach_volume(self, details, **kwargs):
+        self.cloud.call("oci.attach_volume")
+        vm = self.cloud.vm(id=details.instance_id)
+        volume = self.cloud.volumes[details.volume_id]
+        self.cloud.attach(volume, vm["name"])
+        attachment_id = self.cloud.next_id("attachment")
+        self.attachments[attachment_id] = [volume["id"], vm["id"],
+                                           "ATTACHED"]
+        return self._response(self._attachment(attachment_id))
+
+    def detach_volume(self, attachment_id, **kwargs):
+        self.cloud.call("oci.detach_volume")
+        attachment = self.attachments[attachment_id]
+        vm = self.cloud.vm(id=attachment[1])
+        self.cloud.detach(self.cloud.volumes[attachment[0]], vm["name"])
+        attachment[2] = "DETACHED"
+        return self._response(None)
+
+    def get_volume_attachment(self, attachment_id, **kwargs):
+        self.cloud.call("oci.get_volume_attachment")
+        return self._response(self._attachment(attachment_id))
@@ -0,0 +1,109 @@
+import datetime
+import types
+
+
+class FakeOpenstack(object):
+    """
+    A stand-in for the connection of the openstack SDK used by the
+    openstack volume provider. openstack.connect returns a FakeOpenstack
+    that implements the calls of the provider on a FakeCloud and returns
+    the volumes and servers as dicts:
+
+        list_volumes, get_volume, create_volume, update_volume,
+        delete_volume, get_server, list_servers, attach_volume,
+        detach_volume
+
+    connect is counted as a call, as it authenticates with keystone.
+    """
+
+    def __init__(self, cloud):
+        """
+        :param cloud: the FakeCloud
+        """
+        self.cloud = cloud
+
+    @staticmethod
+    def modules(cloud):
+        """
+        The modules to put into sys.modules instead of openstack
+
+        :param cloud: the FakeCloud
+        :return: dict of module names to modules
+        """
+        def connect(**kwargs):
+            cloud.call("openstack.connect")
+            return FakeOpenstack(cloud)
+
+        openstack = types.ModuleType("openstack")
+        openstack.connect = connect
+        return {"openstack": openstack}
+
+    def _volume(self, volume):
+        return {
+            "id": volume["id"],
+            "name": volume["name"],
+            "size": volume["size"],
+            "status": volume["state"],
+            "availability_zone": volume["zone"],
+            "created_at": datetime.datetime.fromtimestamp(
+                volume["created"]).isoformat(),
+            "volume_type": "__DEFAULT__",
+            "metadata": dict(volume["tags"]),
+            "attachments": [{"server_id": self.cloud.vm(name=vm)["id"],
+                             "volume_id": volume["id"]}
+                            for vm in volume["vms"]]
+        }
+
+    def _find(self, name_or_id):
+        return self.cloud.find(name=name_or_id) or \
+            self.cloud.find(id=name_or_id)
+
+    def list_volumes(self):
+        self.cloud.call("openstack.list_volumes")
+        return [self._volume(v) for v in self.cloud.list()]
+
+    def get_volume(self, name_or_id=None):
+        self.cloud.call("openstack.get_volume")
+        volume = self._find(name_or_id)
+        return self._volume(volume) if volume else None
+
+    def create_volume(self, name=None, size=None, volume_type=None,
+                      **kwargs):
+        self.cloud.call("openstack.create_volume")
+        return self._volume(self.cloud.create(name, size=size))
+
+    def update_volume(self, name_or_id=None, metadata=None, **kwargs):
+        self.cloud.call("openstack.update_volume")
+        volume = self._find(name_or_id)
+        volume["tags"].update(metadata or {})
+        return self._volume(volume)
+
+    def delete_volume(self, name_or_id=None, **kwargs):
+        self.cloud.call("openstack.delete_volume")
+        volume = self._find(name_or_id)
+        if volume is None:
+            return False
+        self.cloud.delete(volume)
+        return True
+
+    def get_server(self, name_or_id=None):
+        self.cloud.call("openstack.get_server")
+        vm = self.cloud.vm(name=name_or_id, id=name_or_id)
+        if vm is None:
+            return None
+        return {"id": vm["id"], "name": vm["name"], "status": "ACTIVE"}
+
+    def list_servers(self):
+        self.cloud.call("openstack.list_servers")
+        return [{"id": vm["id"], "name": vm["name"], "status": "ACTIVE"}
+                for vm in self.cloud.vms.values()]
+
+    def attach_volume(self, server, volume, device=None, wait=True,
+                      timeout=None):
+        self.cloud.call("openstack.attach_volume")
+        self.cloud.attach(self._find(volume["id"]), server["name"])
+        return {"server_id": server["id"], "volume_id": volume["id"]}
+
+    def detach_volume(self, server, volume, wait=True, timeout=None):
+        self.cloud.call("openstack.detach_volume")
+        self.cloud.detach(self._find(volume["id"]), server["name"])
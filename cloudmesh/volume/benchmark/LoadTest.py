@@ -0,0 +1,332 @@
+import concurrent.futures
+import contextlib
+import io
+import random
+import tempfile
+import time
+from collections import Counter
+
+from cloudmesh.volume.VolumeCache import VolumeCache
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+def work(test, index, count, directory):
+    """
+    Runs the operations of a worker process with its own FakeCloud
+
+    :param test: dict of the parameters of the LoadTest
+    :param index: the number of the worker
+    :param count: the number of operations
+    :param directory: the directory shared by the workers
+    :return: dict with the samples, api calls and cache contention
+    """
+    test = LoadTest(**test)
+    cloud = FakeCloud(latency=test.latency, latencies=test.latencies,
+                      vms=test.vms)
+    VolumeCache.statistics(reset=True)
+    with contextlib.redirect_stdout(io.StringIO()), \
+            test.benchmark.facade(test.kind, cloud, directory,
+                                  database=test.database) as facade:
+        samples = test.work(facade(), index, count)
+    return {
+        "samples": samples,
+        "api": dict(cloud.calls),
+        "cache": VolumeCache.statistics()
+    }
+
+
+class LoadTest(object):
+    """
+    Drives the volume facade cloudmesh.volume.Provider with many workers
+    at the same time to find the limits of the volume management before a
+    CI fleet that creates and deletes hundreds of volumes does:
+
+        test = LoadTest(kind="aws", workers=32, operations=2000,
+                        latency=0.01)
+        print(LoadTest.table(test.run()))
+
+    The clouds are the SDK stand-ins of ProviderBenchmark. Each worker
+    creates its own facade, as a cms process would, and runs its share of
+    the operations. The operation is chosen at random with the weights of
+    the mix. An attach, detach or delete needs a volume of the worker in
+    the right state. If there is none, a volume is created instead.
+
+    The workers are threads that share one FakeCloud, or with
+    processes=True processes that have a FakeCloud each. In both cases
+    they share the repository in SQLite, or with database="mongo" the
+    MongoDB of cloudmesh.yaml and its VolumeCache.
+
+    The report contains the throughput, the percentiles of the latency
+    and the error rate of each operation, the errors by type, the API
+    calls and the contention counted by VolumeCache.
+    """
+
+    mix = {
+        "create": 2,
+        "list": 4,
+        "attach": 2,
+        "detach": 2,
+        "delete": 2,
+    }
+
+    def __init__(self, kind="aws", workers=8, operations=1000, mix=None,
+                 latency=0.0, latencies=None, processes=False, seed=0,
+                 database="sqlite", vms=10):
+        """
+        Initialize the load test
+
+        :param kind: the kind of the provider
+        :param workers: the number of workers
+        :param operations: the number of operations of all workers
+        :param mix: dict of the operations to their weights
+        :param latency: seconds every API call takes
+        :param latencies: dict of API call names to the seconds they take
+        :param processes: if True the workers are processes
+        :param seed: the seed of the random choice of the operations
+        :param database: "sqlite" or "mongo"
+        :param vms: the number of vms the volumes are attached to
+        """
+        self.kind = kind
+        self.workers = int(workers)
+        self.operations = int(operations)
+        self.mix = dict(mix or LoadTest.mix)
+        self.latency = latency
+        self.latencies = latencies
+        self.processes = processes
+        self.seed = seed
+        self.database = database
+        self.vms = int(vms)
+        self.benchmark = ProviderBenchmark(latency=latency,
+                                           latencies=latencies)
+
+    def parameters(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "operations": self.operations,
+            "mix": self.mix,
+            "latency": self.latency,
+            "latencies": self.latencies,
+            "processes": self.processes,
+            "seed": self.seed,
+            "database": self.database,
+            "vms": self.vms
+        }
+
+    @staticmethod
+    def parse(mix):
+        """
+        Parses a mix given as string, e.g. "create=1,list=8,delete=1"
+
+        :param mix: string
+        :return: dict
+        """
+        result = {}
+        for entry in mix.split(","):
+            operation, weight = entry.split("=")
+            operation = operation.strip()
+            if operation not in LoadTest.mix:
+                raise ValueError(f"unknown operation {operation}")
+            result[operation] = float(weight)
+        return result
+
+    def work(self, facade, index, count):
+        """
+        Runs operations with a facade
+
+        :param facade: the volume facade
+        :param index: the number of the worker
+        :param count: the number of operations
+        :return: list of (operation, start, seconds, error) tuples, the
+                 error is the name of the exception or None
+        """
+        rng = random.Random(f"{self.seed}-{index}")
+        operations = list(self.mix)
+        weights = [self.mix[operation] for operation in operations]
+        vm = f"vm-{index % self.vms}"
+        available = []
+        attached = []
+        created = 0
+        samples = []
+        for i in range(count):
+            operation = rng.choices(operations, weights)[0]
+            if operation in ["attach", "delete"] and not available:
+                operation = "create"
+            elif operation == "detach" and not attached:
+                operation = "create"
+            if operation == "create":
+                name = f"load-{index}-{created}"
+                created += 1
+            elif operation in ["attach", "delete"]:
+                name = available.pop(rng.randrange(len(available)))
+            elif operation == "detach":
+                name = attached.pop(rng.randrange(len(attached)))
+            error = None
+            start = time.time()
+            counter = time.perf_counter()
+            try:
+                if operation == "create":
+                    facade.create(NAME=name, size=None, volume_type=None,
+                                  description=None, region=None)
+                    available.append(name)
+                elif operation == "list":
+                    facade.list(NAME=None, NAMES=None, vm=None,
+                                region=None)
+                elif operation == "attach":
+                    facade.attach(names=[name], vm=vm)
+                    attached.append(name)
+                elif operation == "detach":
+                    facade.detach(name=name)
+                    available.append(name)
+                elif operation == "delete":
+                    facade.delete(name=name)
+            except Exception as e:
+                error = type(e).__name__
+                if operation == "attach":
+                    available.append(name)
+                elif operation == "detach":
+                    attached.append(name)
+            samples.append((operation, start,
+                            time.perf_counter() - counter, error))
+        return samples
+
+    def shares(self):
+        """
+        The number of operations of each worker
+
+        :return: list of int
+        """
+        share, rest = divmod(self.operations, self.workers)
+        return [share + (1 if i < rest else 0) for i in range(self.workers)]
+
+    def run(self):
+        """
+        Runs the load test
+
+        :return: dict, the report
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            if self.processes:
+                results = self._processes(directory)
+            else:
+                results = self._threads(directory)
+        samples = []
+        api = Counter()
+        cache = Counter()
+        for result in results:
+            samples.extend(result["samples"])
+            api.update(result["api"])
+            cache.update(result["cache"])
+        return self.report(samples, api=dict(api), cache=dict(cache))
+
+    def _threads(self, directory):
+        cloud = FakeCloud(latency=self.latency, latencies=self.latencies,
+                          vms=self.vms)
+        VolumeCache.statistics(reset=True)
+        with contextlib.redirect_stdout(io.StringIO()), \
+                self.benchmark.facade(self.kind, cloud, directory,
+                                      database=self.database) as facade:
+            facades = [facade() for i in range(self.workers)]
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers) as executor:
+                futures = [executor.submit(self.work, facades[i], i, count)
+                           for i, count in enumerate(self.shares())]
+                samples = []
+                for future in futures:
+                    samples.extend(future.result())
+        return [{
+            "samples": samples,
+            "api": dict(cloud.calls),
+            "cache": VolumeCache.statistics()
+        }]
+
+    def _processes(self, directory):
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers) as executor:
+            futures = [executor.submit(work, self.parameters(), i, count,
+                                       directory)
+                       for i, count in enumerate(self.shares())]
+            return [future.result() for future in futures]
+
+    def report(self, samples, api=None, cache=None):
+        """
+        Aggregates the samples of a run
+
+        :param samples: list of (operation, start, seconds, error)
+        :param api: dict of the API calls by name
+        :param cache: dict of the contention counted by VolumeCache
+        :return: dict
+        """
+        wall = 0.0
+        if samples:
+            wall = max(start + seconds for _, start, seconds, _ in samples) \
+                - min(start for _, start, _, _ in samples)
+        operations = {}
+        errors = Counter()
+        for operation in LoadTest.mix:
+            times = sorted(seconds for name, _, seconds, _ in samples
+                           if name == operation)
+            if not times:
+                continue
+            failed = [error for name, _, _, error in samples
+                      if name == operation and error is not None]
+            errors.update(f"{operation}: {error}" for error in failed)
+            operations[operation] = {
+                "count": len(times),
+                "errors": len(failed),
+                "error_rate": round(len(failed) / len(times), 4),
+                "throughput": round(len(times) / wall, 2) if wall else None,
+                "p50": round(BenchmarkLog.percentile(times, 50), 6),
+                "p95": round(BenchmarkLog.percentile(times, 95), 6),
+                "p99": round(BenchmarkLog.percentile(times, 99), 6),
+                "max": round(times[-1], 6),
+            }
+        failed = sum(entry["errors"] for entry in operations.values())
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "mode": "processes" if self.processes else "threads",
+            "database": self.database,
+            "latency": self.latency,
+            "count": len(samples),
+            "time": round(wall, 4),
+            "throughput": round(len(samples) / wall, 2) if wall else None,
+            "error_rate": round(failed / len(samples), 4) if samples else 0,
+            "operations": operations,
+            "errors": dict(errors),
+            "api": api or {},
+            "cache": cache or {}
+        }
+
+    @staticmethod
+    def table(report):
+        """
+        Formats a report as table
+
+        :param report: dict
+        :return: string
+        """
+        lines = [f"{report['kind']} {report['workers']} {report['mode']} "
+                 f"{report['database']}: {report['count']} operations in "
+                 f"{report['time']:.2f}s, {report['throughput']} ops/s, "
+                 f"error rate {report['error_rate']:.2%}",
+                 f"{'operation':<10} {'count':>6} {'errors':>6} "
+                 f"{'ops/s':>8} {'p50(ms)':>9} {'p95(ms)':>9} "
+                 f"{'p99(ms)':>9} {'max(ms)':>9}"]
+        for operation, entry in report["operations"].items():
+            lines.append(
+                f"{operation:<10} {entry['count']:>6} {entry['errors']:>6} "
+                f"{entry['throughput'] or 0:>8.1f} "
+                f"{entry['p50'] * 1000:>9.2f} {entry['p95'] * 1000:>9.2f} "
+                f"{entry['p99'] * 1000:>9.2f} {entry['max'] * 1000:>9.2f}")
+        for error, count in sorted(report["errors"].items()):
+            lines.append(f"error {error}: {count}")
+        cache = report["cache"]
+        if cache:
+            lines.append(f"cache: {cache.get('refreshes', 0)} refreshes, "
+                         f"{cache.get('coalesced', 0)} coalesced, "
+                         f"{cache.get('lock_wait', 0):.3f}s lock wait, "
+                         f"{cache.get('lease_wait', 0):.3f}s lease wait")
+        return "\n".join(lines)
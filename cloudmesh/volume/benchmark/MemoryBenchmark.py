@@ -0,0 +1,328 @@
+import concurrent.futures
+import contextlib
+import io
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+def measure(parameters, kind, n, trace):
+    """
+    Measures a kind in a worker process
+
+    :param parameters: dict of the parameters of the MemoryBenchmark
+    :param kind: the kind of the provider
+    :param n: the number of volumes
+    :param trace: if True the allocations are traced
+    :return: list of dicts, one for each phase
+    """
+    return MemoryBenchmark(**parameters).measure(kind, n, trace)
+
+
+class MemoryBenchmark(object):
+    """
+    Measures the memory of listing many volumes. A FakeCloud is filled
+    with n volumes and listed by the provider of a kind with the stand-ins
+    of its SDK, so every provider lists payloads of its own shape, e.g.
+    the Tags of AWS, the users and labels of Google and the as_dict tree
+    of Azure:
+
+        benchmark = MemoryBenchmark(sizes=[10000, 100000])
+        rows = benchmark.run(kinds=["aws", "google"])
+        print(MemoryBenchmark.table(rows))
+
+    A listing goes through three phases:
+
+        normalize: the provider lists the cloud and update_dict adds the
+                   cm dict, multipass, which lists its repository, runs
+                   update_dict on its records
+        cache: the listing is written to the repository of the provider
+               and read back, with database="mongo" it is reconciled with
+               the VolumeCache in MongoDB and read from it
+        print: the facade prints the listing as table with
+               Printer.flatwrite
+
+    Each phase is reported as a dict
+
+        {
+            "kind": kind,
+            "volumes": n,
+            "phase": "normalize", "cache" or "print",
+            "time": seconds,
+            "rss": bytes the peak RSS of the process grew in the phase,
+            "peak": peak of the memory allocated in the phase in bytes,
+            "retained": bytes still allocated after the phase,
+            "per_volume": peak / n
+        }
+
+    The peak RSS of a process only grows, so each kind and size is
+    measured in a new process. As tracemalloc itself needs memory, the
+    RSS is measured in one process and the allocations in another.
+    """
+
+    phases = ["normalize", "cache", "print"]
+
+    sizes = [10000, 100000]
+
+    #
+    # the bytes per volume the peak of the allocations of a phase may
+    # reach before it is reported as over budget. The peaks do not depend
+    # on the number of volumes, at 10000 and 100000 volumes they are at
+    # most 2300, 6300 and 2100 bytes per volume, for aws.
+    #
+    budget = {
+        "normalize": 3500,
+        "cache": 9500,
+        "print": 3200,
+    }
+
+    def __init__(self, sizes=None, database="sqlite", processes=True,
+                 budget=None):
+        """
+        Initialize the benchmark
+
+        :param sizes: the numbers of volumes, defaults to
+                      MemoryBenchmark.sizes
+        :param database: "sqlite" or "mongo"
+        :param processes: if True each measurement runs in a new process
+        :param budget: dict of phases to bytes per volume, defaults to
+                       MemoryBenchmark.budget
+        """
+        self.sizes = [int(n) for n in sizes or MemoryBenchmark.sizes]
+        self.database = database
+        self.processes = processes
+        self.budget = dict(MemoryBenchmark.budget, **(budget or {}))
+        self.benchmark = ProviderBenchmark()
+
+    def parameters(self):
+        return {
+            "sizes": self.sizes,
+            "database": self.database,
+            "processes": False,
+            "budget": self.budget
+        }
+
+    @staticmethod
+    def rss():
+        """
+        The peak RSS of the process
+
+        :return: bytes
+        """
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    @staticmethod
+    def populate(cloud, kind, n):
+        """
+        Fills a cloud with n volumes, every third is attached to a vm
+
+        :param cloud: the FakeCloud
+        :param kind: the kind of the provider
+        :param n: the number of volumes
+        """
+        vms = list(cloud.vms)
+        for i in range(n):
+            name = f"volume-{i}"
+            tags = {"project": "benchmark", "owner": f"user-{i % 10}"}
+            if kind == "aws":
+                tags["Name"] = name
+            volume = cloud.create(name, size=1 + i % 100, tags=tags)
+            if i % 3 == 0:
+                volume["state"] = "in-use"
+                volume["vms"] = [vms[i % len(vms)]]
+            if kind == "fake":
+                volume["events"] = [(0.0, volume["state"],
+                                     list(volume["vms"]))]
+
+    @staticmethod
+    def records(cloud, directory):
+        """
+        The records of the volumes of a cloud as the multipass provider
+        keeps them in its repository
+
+        :param cloud: the FakeCloud
+        :param directory: the directory of the volumes
+        :return: list of dicts
+        """
+        return [{
+            "name": volume["name"],
+            "path": f"{directory}/volumes",
+            "size_gb": volume["size"],
+            "State": "in-use" if volume["vms"] else "available",
+            "AttachedToVm": list(volume["vms"]),
+            "tags": [{key: value}
+                     for key, value in volume["tags"].items()],
+            "time": str(volume["created"])
+        } for volume in cloud.list()]
+
+    def phases_of(self, kind, facade, cloud, directory):
+        """
+        The functions of the phases of a kind. Each function gets the
+        result of the phase before.
+
+        :return: dict of phases to functions
+        """
+        provider = facade.provider
+
+        def normalize(data):
+            if kind == "multipass":
+                return provider.update_dict(self.records(cloud, directory))
+            return provider.list(refresh=True, NAME=None, NAMES=None,
+                                 vm=None, region=None)
+
+        def cache(data):
+            if facade.cache is not None:
+                facade.cache.store(data)
+                return facade.cache.list(NAME=None, NAMES=None, vm=None,
+                                         region=None)
+            provider.repository.update(data)
+            return provider.list(refresh=False, NAME=None, NAMES=None,
+                                 vm=None, region=None)
+
+        def _print(data):
+            facade.Print(data, kind="volume", output="table")
+            return data
+
+        return {"normalize": normalize, "cache": cache, "print": _print}
+
+    def measure(self, kind, n, trace=False):
+        """
+        Lists n volumes of a kind through the phases in this process
+
+        :param kind: the kind of the provider
+        :param n: the number of volumes
+        :param trace: if True the allocations are traced, otherwise the
+                      RSS is measured
+        :return: list of dicts, one for each phase
+        """
+        cloud = FakeCloud()
+        self.populate(cloud, kind, n)
+        rows = []
+        if trace:
+            tracemalloc.start()
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    contextlib.redirect_stdout(io.StringIO()), \
+                    self.benchmark.facade(kind, cloud, directory,
+                                          database=self.database) \
+                    as facade:
+                instance = facade()
+                functions = self.phases_of(kind, instance, cloud,
+                                           directory)
+                data = None
+                for phase in MemoryBenchmark.phases:
+                    rss = self.rss()
+                    memory = 0
+                    if trace:
+                        memory = self.benchmark.reset_peak()
+                    start = time.perf_counter()
+                    data = functions[phase](data)
+                    wall = time.perf_counter() - start
+                    row = {
+                        "kind": kind,
+                        "volumes": n,
+                        "phase": phase,
+                        "time": round(wall, 4),
+                        "count": len(data or [])
+                    }
+                    if trace:
+                        current, peak = tracemalloc.get_traced_memory()
+                        row["peak"] = max(peak - memory, 0)
+                        row["retained"] = current - memory
+                    else:
+                        row["rss"] = self.rss() - rss
+                        row["peak_rss"] = self.rss()
+                    rows.append(row)
+        finally:
+            if trace:
+                tracemalloc.stop()
+        return rows
+
+    def measure_kind(self, kind, n):
+        """
+        Measures the RSS and the allocations of a kind, each in a new
+        process if processes is True
+
+        :param kind: the kind of the provider
+        :param n: the number of volumes
+        :return: list of dicts, one for each phase
+        """
+        if self.processes:
+            results = []
+            for trace in [False, True]:
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=1) as executor:
+                    results.append(executor.submit(
+                        measure, self.parameters(), kind, n,
+                        trace).result())
+        else:
+            results = [self.measure(kind, n, trace=False),
+                       self.measure(kind, n, trace=True)]
+        rows = []
+        for rss, traced in zip(*results):
+            row = dict(rss)
+            row["time"] = min(rss["time"], traced["time"])
+            row["peak"] = traced["peak"]
+            row["retained"] = traced["retained"]
+            row["per_volume"] = round(traced["peak"] / n) if n else 0
+            rows.append(row)
+        return rows
+
+    def run(self, kinds=None):
+        """
+        Measures the kinds at all sizes
+
+        :param kinds: list of kinds, defaults to all kinds
+        :return: list of dicts, one for each kind, size and phase
+        """
+        rows = []
+        for kind in kinds or ProviderBenchmark.kinds:
+            for n in self.sizes:
+                rows.extend(self.measure_kind(kind, n))
+        return rows
+
+    def check(self, rows):
+        """
+        The phases whose allocations per volume are over the budget
+
+        :param rows: the rows of run
+        :return: list of dicts with kind, volumes, phase, per_volume and
+                 budget
+        """
+        return [{
+            "kind": row["kind"],
+            "volumes": row["volumes"],
+            "phase": row["phase"],
+            "per_volume": row["per_volume"],
+            "budget": self.budget[row["phase"]]
+        } for row in rows
+            if row["per_volume"] > self.budget.get(row["phase"],
+                                                   float("inf"))]
+
+    @staticmethod
+    def table(rows):
+        """
+        Formats the rows of a benchmark as table
+
+        :param rows: the rows of run
+        :return: string
+        """
+        lines = [f"{'kind':<10} {'volumes':>8} {'phase':<10} "
+                 f"{'time(s)':>8} {'rss(MB)':>8} {'peak(MB)':>9} "
+                 f"{'kept(MB)':>9} {'B/volume':>9} {'max rss(MB)':>11}"]
+        mb = 1024 * 1024
+        for row in rows:
+            lines.append(f"{row['kind']:<10} {row['volumes']:>8} "
+                         f"{row['phase']:<10} {row['time']:>8.3f} "
+                         f"{row['rss'] / mb:>8.1f} "
+                         f"{row['peak'] / mb:>9.1f} "
+                         f"{row['retained'] / mb:>9.1f} "
+                         f"{row['per_volume']:>9} "
+                         f"{row['peak_rss'] / mb:>11.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,488 @@
+import contextlib
+import functools
+import importlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cloudmesh.volume.SqliteVolumeRepository import SqliteVolumeRepository
+from cloudmesh.volume.benchmark.FakeAzure import FakeAzure
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.FakeEc2 import FakeEc2
+from cloudmesh.volume.benchmark.FakeGoogle import FakeGoogle
+from cloudmesh.volume.benchmark.FakeMultipass import FakeMultipass
+from cloudmesh.volume.benchmark.FakeOci import FakeOci
+from cloudmesh.volume.benchmark.FakeOpenstack import FakeOpenstack
+
+
+class OfflineConfig(object):
+    """
+    A stand-in for cloudmesh.configuration.Config that holds the volume
+    specifications of the benchmark instead of reading cloudmesh.yaml.
+    It is called like Config and answers dotted keys, e.g.
+
+        OfflineConfig(data)()["cloudmesh.volume.aws.default"]
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getitem__(self, key):
+        value = self.data
+        for part in key.split("."):
+            value = value[part]
+        return value
+
+
+class ProviderBenchmark(object):
+    """
+    Benchmarks the volume providers offline. The SDK of each provider is
+    replaced by a stand-in that keeps the volumes in a FakeCloud, e.g.
+    boto3 by FakeEc2, so the providers run their real code without a cloud
+    account. The provider of the kind fake keeps its volumes in the
+    FakeCloud itself. Every API call can be given a latency:
+
+        benchmark = ProviderBenchmark(n=10, latency=0.01)
+        rows = benchmark.run(kinds=["aws", "multipass"])
+        print(ProviderBenchmark.table(rows))
+
+    For each kind n volumes are created, listed, attached to a vm,
+    detached and deleted. The result of an operation is written to the
+    repository of the provider as the volume command does. Each operation
+    is reported as a dict
+
+        {
+            "kind": kind,
+            "operation": "create", "list", "attach", "detach" or "delete",
+            "count": number of provider calls,
+            "calls": number of API calls,
+            "time": wall time in seconds,
+            "waited": seconds the provider waited in polling loops,
+            "memory": peak of the allocated memory in bytes,
+            "api": dict of the API calls by name
+        }
+
+    The stand-ins are only put into sys.modules while a kind is run, the
+    provider module is imported again with them and the modules it had
+    before are restored afterwards. The repositories are SQLite files in a
+    temporary directory, which also holds the usage and manifest caches of
+    multipass, and the polling sleeps of the providers are not slept but
+    added to waited.
+    """
+
+    kinds = ["aws", "azure", "google", "multipass", "openstack", "oracle",
+             "fake"]
+
+    operations = ["create", "list", "attach", "detach", "delete"]
+
+    fakes = {
+        "aws": FakeEc2,
+        "azure": FakeAzure,
+        "google": FakeGoogle,
+        "openstack": FakeOpenstack,
+        "oracle": FakeOci,
+    }
+
+    specs = {
+        "aws": {
+            "default": {
+                "volume_type": "gp2",
+                "size": 2,
+                "encrypted": False,
+                "region": FakeCloud.zone,
+                "region_name": "benchmark",
+                "snapshot": "None"
+            },
+            "credentials": {
+                "EC2_ACCESS_ID": "benchmark",
+                "EC2_SECRET_KEY": "benchmark"
+            }
+        },
+        "azure": {
+            "default": {
+                "group": "benchmark"
+            },
+            "credentials": {
+                "AZURE_TENANT_ID": "benchmark",
+                "AZURE_SUBSCRIPTION_ID": "benchmark",
+                "AZURE_APPLICATION_ID": "benchmark",
+                "AZURE_SECRET_KEY": "benchmark",
+                "AZURE_REGION": FakeCloud.zone
+            }
+        },
+        "google": {
+            "default": {
+                "zone": FakeCloud.zone,
+                "type": "projects/benchmark/zones/zone-a/diskTypes/"
+                        "pd-standard",
+                "sizeGb": "10"
+            },
+            "credentials": {
+                "project_id": "benchmark",
+                "path_to_service_account_json": "benchmark.json"
+            }
+        },
+        "multipass": {
+            "default": {
+                "backend": "directory",
+                "size": 1,
+                "info_ttl": 0,
+                "database": "sqlite"
+            },
+            "credentials": {}
+        },
+        "openstack": {
+            "default": {
+                "size": 1,
+                "volume_type": "__DEFAULT__"
+            },
+            "credentials": {
+                "auth": {"auth_url": "benchmark"},
+                "region_name": "benchmark"
+            }
+        },
+        "oracle": {
+            "default": {},
+            "credentials": {
+                "compartment_id": "benchmark",
+                "availability_domain": FakeCloud.zone
+            }
+        },
+        "fake": {
+            "default": {
+                "region": FakeCloud.zone,
+                "size": 1
+            },
+            "credentials": {}
+        },
+    }
+
+    def __init__(self, n=10, latency=0.0, latencies=None, vm="vm-0"):
+        """
+        Initialize the benchmark
+
+        :param n: number of volumes of each kind
+        :param latency: seconds every API call takes
+        :param latencies: dict of API call names to the seconds they take
+        :param vm: the vm the volumes are attached to
+        """
+        self.n = int(n)
+        self.latency = latency
+        self.latencies = latencies
+        self.vm = vm
+
+    def config(self, kind, directory, database="sqlite"):
+        """
+        The configuration of the benchmark for a kind
+
+        :param kind: the kind of the provider
+        :param directory: the directory of the repository and the volumes
+        :param database: "sqlite" or "mongo"
+        :return: OfflineConfig
+        """
+        spec = {
+            "cm": {"active": True, "kind": kind, "heading": kind},
+            "default": dict(self.specs[kind]["default"]),
+            "credentials": dict(self.specs[kind]["credentials"])
+        }
+        if kind == "multipass":
+            os.makedirs(f"{directory}/volumes", exist_ok=True)
+            spec["default"]["path"] = f"{directory}/volumes"
+            spec["default"]["snapshot_path"] = f"{directory}/snapshots"
+        if kind in ["multipass", "fake"]:
+            spec["default"]["database_path"] = f"{directory}/{kind}.db"
+            spec["default"]["database"] = database
+        return OfflineConfig({"cloudmesh": {
+            "profile": {"user": "benchmark"},
+            "default": {"group": "benchmark", "experiment": "benchmark"},
+            "volume": {kind: spec},
+            "cloud": {kind: spec}}})
+
+    @contextlib.contextmanager
+    def offline(self, kind, cloud, directory, database="sqlite"):
+        """
+        Creates the provider of a kind with the stand-ins of its SDK. The
+        modules and attributes replaced are restored when the context is
+        left.
+
+        :param kind: the kind of the provider
+        :param cloud: the FakeCloud
+        :param directory: the directory of the repository and the volumes
+        :param database: "sqlite" keeps the volumes in SQLite, "mongo"
+                         uses the MongoDB of cloudmesh.yaml
+        :return: the provider
+        """
+        import cloudmesh.volume.VolumeABC as abc
+        import cloudmesh.volume.multipass.MultipassInfo as info
+        from cloudmesh.volume.multipass.VolumeSync import VolumeSync
+        from cloudmesh.volume.multipass.VolumeUsage import VolumeUsage
+
+        name = f"cloudmesh.volume.{kind}.Provider"
+        if kind == "multipass":
+            fake = FakeMultipass(cloud)
+            modules = {}
+        elif kind == "fake":
+            fake = None
+            modules = {}
+        else:
+            fake = None
+            modules = self.fakes[kind].modules(cloud)
+        modules[name] = None
+        saved = {key: sys.modules.get(key) for key in modules}
+        patched = []
+
+        def patch(target, attribute, value):
+            if hasattr(target, attribute):
+                patched.append((target, attribute,
+                                getattr(target, attribute)))
+                setattr(target, attribute, value)
+
+        try:
+            for key, module in modules.items():
+                if module is None:
+                    sys.modules.pop(key, None)
+                else:
+                    sys.modules[key] = module
+            module = importlib.import_module(name)
+            config = self.config(kind, directory, database=database)
+            patch(abc, "Config", config)
+            patch(module, "Config", config)
+            if database == "sqlite":
+                patch(module, "CmDatabase", lambda: None)
+                patch(module, "VolumeRepository",
+                      functools.partial(SqliteVolumeRepository,
+                                        path=f"{directory}/{kind}.db"))
+            patch(module, "sleep", cloud.sleep)
+            if kind == "fake":
+                patch(module.Provider, "clouds", {kind: cloud})
+            if fake is not None:
+                patch(info, "Shell", fake.shell)
+                patch(module, "MountPool", fake.pool)
+                patch(VolumeUsage, "directory", f"{directory}/usage")
+                patch(VolumeSync, "directory", f"{directory}/manifest")
+            with contextlib.redirect_stdout(io.StringIO()):
+                provider = module.Provider(kind)
+            try:
+                yield provider
+            finally:
+                repository = getattr(provider, "repository", None)
+                if hasattr(repository, "close"):
+                    repository.close()
+        finally:
+            for target, attribute, value in reversed(patched):
+                setattr(target, attribute, value)
+            for key, module in saved.items():
+                if module is None:
+                    sys.modules.pop(key, None)
+                else:
+                    sys.modules[key] = module
+
+    @contextlib.contextmanager
+    def facade(self, kind, cloud, directory, database="sqlite"):
+        """
+        Like offline, but returns a function that creates the volume
+        facade cloudmesh.volume.Provider of the kind, so the facade runs
+        as in the volume command. With database "sqlite" a provider that
+        has no repository, e.g. azure, is given one in SQLite, so the
+        facade does not need MongoDB. The variables the facade sets, e.g.
+        the last volume created, are kept in a dict and not written to
+        ~/.cloudmesh.
+
+        :param kind: the kind of the provider
+        :param cloud: the FakeCloud
+        :param directory: the directory of the repository and the volumes
+        :param database: "sqlite" or "mongo"
+        :return: function without parameters that returns a facade
+        """
+        import cloudmesh.volume.Provider as module
+
+        facades = []
+
+        with self.offline(kind, cloud, directory,
+                          database=database) as provider:
+            P = type(provider)
+
+            def get_provider(name):
+                def create(cloud):
+                    instance = P(cloud)
+                    if database == "sqlite" and \
+                            getattr(instance, "repository", None) is None:
+                        instance.repository = SqliteVolumeRepository(
+                            cloud=cloud, kind=kind,
+                            path=f"{directory}/{kind}.db")
+                    return instance
+
+                return create
+
+            def facade():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    instance = module.Provider(kind)
+                facades.append(instance)
+                return instance
+
+            config = self.config(kind, directory, database=database)
+            variables = {}
+            saved = (module.Config, module.Variables,
+                     module.Provider.get_provider)
+            module.Config = config
+            module.Variables = lambda: variables
+            module.Provider.get_provider = staticmethod(get_provider)
+            try:
+                yield facade
+            finally:
+                module.Config = saved[0]
+                module.Variables = saved[1]
+                module.Provider.get_provider = staticmethod(saved[2])
+                for instance in facades:
+                    repository = getattr(instance.provider, "repository",
+                                         None)
+                    if hasattr(repository, "close"):
+                        repository.close()
+
+    @staticmethod
+    def store(provider, result):
+        """
+        Writes the result of an operation to the repository of the
+        provider, as VolumeUpdate does for the volume command
+
+        :param provider: the provider
+        :param result: dict, list of dicts or None
+        """
+        repository = getattr(provider, "repository", None)
+        if result is None or repository is None:
+            return
+        if type(result) == dict:
+            result = [result]
+        repository.update(result)
+
+    @staticmethod
+    def reset_peak():
+        """
+        Resets the peak of the traced memory. tracemalloc.reset_peak only
+        exists since Python 3.9, on older versions the tracing is restarted,
+        which also forgets the memory traced so far.
+
+        :return: the traced memory the peak is measured from
+        """
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.stop()
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0]
+
+    def measure(self, kind, operation, cloud, function, arguments):
+        """
+        Runs an operation for all arguments and measures it
+
+        :param kind: the kind of the provider
+        :param operation: the name of the operation
+        :param cloud: the FakeCloud
+        :param function: the function called with each argument
+        :param arguments: list of arguments
+        :return: dict
+        """
+        cloud.reset()
+        memory = self.reset_peak()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for argument in arguments:
+                function(argument)
+        wall = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        return {
+            "kind": kind,
+            "operation": operation,
+            "count": len(arguments),
+            "calls": sum(cloud.calls.values()),
+            "time": round(wall, 4),
+            "waited": cloud.waited,
+            "memory": max(peak - memory, 0),
+            "api": dict(cloud.calls)
+        }
+
+    def benchmark(self, kind):
+        """
+        Creates, lists, attaches, detaches and deletes n volumes of a kind
+
+        :param kind: the kind of the provider
+        :return: list of dicts, one for each operation
+        """
+        cloud = FakeCloud(latency=self.latency, latencies=self.latencies)
+        names = [f"benchmark-{i}" for i in range(self.n)]
+        vm = self.vm
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        rows = []
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    self.offline(kind, cloud, directory) as provider:
+
+                def create(name):
+                    self.store(provider, provider.create(
+                        NAME=name, size=None, volume_type=None,
+                        description=None, region=None))
+
+                def _list(argument):
+                    provider.list(refresh=True, NAME=None, NAMES=None,
+                                  vm=None, region=None)
+
+                def attach(name):
+                    self.store(provider,
+                               provider.attach(names=[name], vm=vm))
+
+                def detach(name):
+                    self.store(provider, provider.detach(name))
+
+                def delete(name):
+                    self.store(provider, provider.delete(name))
+
+                functions = {"create": create, "list": _list,
+                             "attach": attach, "detach": detach,
+                             "delete": delete}
+                for operation in self.operations:
+                    arguments = [None] if operation == "list" else names
+                    rows.append(self.measure(kind, operation, cloud,
+                                             functions[operation],
+                                             arguments))
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        return rows
+
+    def run(self, kinds=None):
+        """
+        Benchmarks the providers of the kinds
+
+        :param kinds: list of kinds, defaults to all kinds
+        :return: list of dicts, one for each kind and operation
+        """
+        rows = []
+        for kind in kinds or self.kinds:
+            rows.extend(self.benchmark(kind))
+        return rows
+
+    @staticmethod
+    def table(rows):
+        """
+        Formats the rows of a benchmark as table
+
+        :param rows: list of dicts
+        :return: string
+        """
+        lines = [f"{'kind':<10} {'operation':<10} {'count':>6} "
+                 f"{'calls':>6} {'time(s)':>9} {'waited(s)':>10} "
+                 f"{'memory(KB)':>11}"]
+        for row in rows:
+            lines.append(f"{row['kind']:<10} {row['operation']:<10} "
+                         f"{row['count']:>6} {row['calls']:>6} "
+                         f"{row['time']:>9.4f} {row['waited']:>10.1f} "
+                         f"{row['memory'] / 1024:>11.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,265 @@
+import json
+import statistics
+
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+
+class RegressionGate(object):
+    """
+    Compares the offline benchmark of the providers with a baseline, so a
+    change that makes an operation slower or chattier is caught before it
+    reaches a cloud:
+
+        gate = RegressionGate.load("benchmarking/baseline.json")
+        results = gate.run()
+        failures = gate.compare(results)
+        print(RegressionGate.diff(failures))
+
+    The ProviderBenchmark is run repeat times with the number of volumes
+    and the latency of every API call stored in the baseline. For each kind
+    and operation three metrics are kept
+
+        calls: the API calls, which do not vary between runs
+        time: the wall time, which under the fake latency is mostly the
+              time of the API calls
+        memory: the peak of the allocated memory in bytes
+
+    as the median over the runs and, for time and memory, the median
+    absolute deviation (mad). A metric is worse than the baseline if
+
+        calls: it is higher at all
+        time, memory: its median is more than tolerance above the median
+                      of the baseline and more than the noise above it,
+                      the noise being three times the larger mad plus
+                      RegressionGate.floor of the metric
+
+    Only the operations of RegressionGate.operations fail the gate, the
+    others are reported.
+    """
+
+    operations = ["list", "attach", "delete"]
+
+    metrics = ["calls", "time", "memory"]
+
+    tolerance = {
+        "time": 0.25,
+        "memory": 0.2,
+    }
+
+    #
+    # differences below these are never a regression, e.g. a few
+    # milliseconds of a scheduler or an allocation of a few pages
+    #
+    floor = {
+        "time": 0.005,
+        "memory": 16 * 1024,
+    }
+
+    def __init__(self, n=10, latency=0.002, repeat=3, kinds=None,
+                 operations=None, tolerance=None, baseline=None):
+        """
+        Initialize the gate
+
+        :param n: number of volumes of each kind
+        :param latency: seconds every API call takes
+        :param repeat: the number of runs
+        :param kinds: list of kinds, defaults to all kinds
+        :param operations: the operations that fail the gate, defaults to
+                           RegressionGate.operations
+        :param tolerance: dict of metrics to the fraction by which they
+                          may grow, defaults to RegressionGate.tolerance
+        :param baseline: list of the results of a run
+        """
+        self.n = int(n)
+        self.latency = float(latency)
+        self.repeat = int(repeat)
+        self.kinds = kinds or ProviderBenchmark.kinds
+        self.operations = operations or RegressionGate.operations
+        self.tolerance = dict(RegressionGate.tolerance, **(tolerance or {}))
+        self.baseline = baseline or []
+
+    @staticmethod
+    def load(path, **kwargs):
+        """
+        Creates the gate of a baseline saved with save. The parameters
+        of the benchmark are those of the baseline.
+
+        :param path: path of the json file
+        :param kwargs: the other parameters of RegressionGate
+        :return: RegressionGate
+        """
+        with open(path) as f:
+            data = json.load(f)
+        return RegressionGate(n=data["n"], latency=data["latency"],
+                              repeat=data["repeat"],
+                              baseline=data["results"], **kwargs)
+
+    def save(self, path, results):
+        """
+        Saves the results of a run with the parameters of the benchmark
+        as baseline
+
+        :param path: path of the json file
+        :param results: the results of run
+        """
+        with open(path, "w") as f:
+            json.dump({"n": self.n, "latency": self.latency,
+                       "repeat": self.repeat, "results": results},
+                      f, indent=2)
+            f.write("\n")
+
+    @staticmethod
+    def summary(values):
+        """
+        The median and the median absolute deviation of values
+
+        :param values: list of numbers
+        :return: dict with p50 and mad
+        """
+        values = sorted(values)
+        p50 = BenchmarkLog.percentile(values, 50)
+        mad = statistics.median([abs(value - p50) for value in values])
+        return {"p50": round(p50, 6), "mad": round(mad, 6)}
+
+    def run(self):
+        """
+        Runs the offline benchmark repeat times
+
+        :return: list of dicts with kind, operation, calls, time and
+                 memory, sorted by kind and operation
+        """
+        samples = {}
+        benchmark = ProviderBenchmark(n=self.n, latency=self.latency)
+        for i in range(self.repeat):
+            for row in benchmark.run(kinds=self.kinds):
+                key = (row["kind"], row["operation"])
+                samples.setdefault(key, []).append(row)
+        results = []
+        for (kind, operation), rows in sorted(samples.items()):
+            results.append({
+                "kind": kind,
+                "operation": operation,
+                "calls": max(row["calls"] for row in rows),
+                "api": rows[-1]["api"],
+                "time": self.summary([row["time"] for row in rows]),
+                "memory": self.summary([row["memory"] for row in rows])
+            })
+        return results
+
+    def judge(self, metric, old, new):
+        """
+        Decides if a metric is worse than in the baseline
+
+        :param metric: "calls", "time" or "memory"
+        :param old: the value of the baseline
+        :param new: the value of the run
+        :return: True if it is worse
+        """
+        if metric == "calls":
+            return new > old
+        noise = 3 * max(old["mad"], new["mad"]) + \
+            RegressionGate.floor[metric]
+        growth = new["p50"] - old["p50"]
+        return growth > old["p50"] * self.tolerance[metric] and \
+            growth > noise
+
+    def compare(self, results, baseline=None):
+        """
+        Compares the results of a run with the baseline
+
+        :param results: the results of run
+        :param baseline: the results of the baseline, defaults to the
+                         baseline of the gate, only the kinds of the gate
+                         are compared
+        :return: list of dicts with kind, operation, metric, baseline,
+                 value, ratio, and status, which is "fail" for a worse
+                 metric of an operation of the gate, "worse" for a worse
+                 metric of another operation and "new" or "missing" for
+                 an operation only in the run or only in the baseline
+        """
+        before = {(e["kind"], e["operation"]): e
+                  for e in baseline or self.baseline
+                  if e["kind"] in self.kinds}
+        after = {(e["kind"], e["operation"]): e for e in results}
+        report = []
+        for key in sorted(set(before) | set(after)):
+            kind, operation = key
+            if key not in before or key not in after:
+                report.append({
+                    "kind": kind, "operation": operation, "metric": None,
+                    "baseline": None, "value": None, "ratio": None,
+                    "status": "new" if key not in before else "missing"
+                })
+                continue
+            for metric in RegressionGate.metrics:
+                old = before[key][metric]
+                new = after[key][metric]
+                if not self.judge(metric, old, new):
+                    continue
+                if metric != "calls":
+                    old, new = old["p50"], new["p50"]
+                report.append({
+                    "kind": kind,
+                    "operation": operation,
+                    "metric": metric,
+                    "baseline": old,
+                    "value": new,
+                    "ratio": round(new / old, 3) if old else None,
+                    "status": "fail" if operation in self.operations
+                    else "worse"
+                })
+        return report
+
+    @staticmethod
+    def failed(report):
+        """
+        True if a metric of an operation of the gate is worse
+
+        :param report: the result of compare
+        :return: bool
+        """
+        return any(entry["status"] == "fail" for entry in report)
+
+    @staticmethod
+    def diff(report, results=None, baseline=None):
+        """
+        Formats a comparison as readable text. For more API calls the
+        calls that changed are listed if the results and the baseline
+        are given.
+
+        :param report: the result of compare
+        :param results: the results of run
+        :param baseline: the results of the baseline
+        :return: string
+        """
+        units = {
+            "calls": lambda v: f"{v}",
+            "time": lambda v: f"{v:.4f}s",
+            "memory": lambda v: f"{v / 1024:.1f}KB",
+        }
+        before = {(e["kind"], e["operation"]): e for e in baseline or []}
+        after = {(e["kind"], e["operation"]): e for e in results or []}
+        lines = []
+        for entry in report:
+            name = f"{entry['kind']} {entry['operation']}"
+            if entry["metric"] is None:
+                lines.append(f"{entry['status']:<7} {name}")
+                continue
+            unit = units[entry["metric"]]
+            change = "" if entry["ratio"] is None else \
+                f" ({entry['ratio'] - 1:+.0%})"
+            lines.append(f"{entry['status']:<7} {name} {entry['metric']}: "
+                         f"{unit(entry['baseline'])} -> "
+                         f"{unit(entry['value'])}{change}")
+            key = (entry["kind"], entry["operation"])
+            if entry["metric"] == "calls" and key in before \
+                    and key in after:
+                old = before[key].get("api", {})
+                new = after[key].get("api", {})
+                for call in sorted(set(old) | set(new)):
+                    if old.get(call, 0) != new.get(call, 0):
+                        lines.append(f"{'':<8}  {call}: "
+                                     f"{old.get(call, 0)} -> "
+                                     f"{new.get(call, 0)}")
+        return "\n".join(lines)
@@ -0,0 +1,267 @@
+import os
+import subprocess
+import sys
+import time
+
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+
+
+class StartupBenchmark(object):
+    """
+    Measures the startup of cms volume. Each measurement is taken in a new
+    process, as a cron job would:
+
+        import: the time python -X importtime reports for importing a
+                module, e.g. cloudmesh.volume.Provider
+        first-output: the time from starting a command, e.g. cms volume
+                      list, to the first byte it writes
+        command: the time until the command exits
+
+    The times are aggregated as the records of BenchmarkLog, with the
+    measurement as provider and the module or command as operation, so
+    that they can be saved and compared with a baseline in the same way.
+
+    The output of -X importtime is also searched for modules of
+    cloudmesh.volume that import a heavy module at module level, i.e. a
+    module that is not part of cloudmesh.volume and takes longer than
+    StartupBenchmark.heavy seconds to import. As python imports a module
+    only once, the first module that imports it is reported.
+    """
+
+    package = "cloudmesh.volume"
+
+    modules = ["cloudmesh.volume.Provider",
+               "cloudmesh.volume.command.volume"]
+
+    commands = {
+        "volume list": ["cms", "volume", "list"],
+        "volume status": ["cms", "volume", "status"],
+        "volume --help": ["cms", "volume", "--help"],
+    }
+
+    heavy = 0.05
+
+    def __init__(self, repeat=5, modules=None, commands=None,
+                 python=None, heavy=None):
+        """
+        Initialize the benchmark
+
+        :param repeat: the number of times each measurement is taken
+        :param modules: the modules to import, defaults to
+                        StartupBenchmark.modules
+        :param commands: dict of names to commands as lists, defaults to
+                         StartupBenchmark.commands
+        :param python: the python executable, defaults to sys.executable
+        :param heavy: the seconds from which an import is heavy
+        """
+        self.repeat = repeat
+        self.modules = modules or StartupBenchmark.modules
+        self.commands = commands or StartupBenchmark.commands
+        self.python = python or sys.executable
+        self.heavy = heavy or StartupBenchmark.heavy
+        self.errors = {}
+        self.imports = []
+
+    @staticmethod
+    def parse(output):
+        """
+        Parses the output of python -X importtime. A module is listed after
+        the modules it imports, indented by two more spaces than them.
+
+        :param output: the stderr of python -X importtime
+        :return: list of dicts with module, depth, self and cumulative in
+                 seconds, in the order of the output
+        """
+        result = []
+        for line in output.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            fields = line[len("import time:"):].split("|")
+            if len(fields) != 3:
+                continue
+            try:
+                own = int(fields[0]) / 1e6
+                cumulative = int(fields[1]) / 1e6
+            except ValueError:
+                continue
+            name = fields[2].rstrip()
+            stripped = name.lstrip()
+            result.append({
+                "module": stripped,
+                "depth": (len(name) - len(stripped) - 1) // 2,
+                "self": own,
+                "cumulative": cumulative
+            })
+        return result
+
+    @staticmethod
+    def parents(entries):
+        """
+        The module that imported each module of the output of
+        python -X importtime
+
+        :param entries: the result of parse
+        :return: list of the index of the parent of each entry or None
+        """
+        result = [None] * len(entries)
+        waiting = []
+        for index, entry in enumerate(entries):
+            while waiting and entries[waiting[-1]]["depth"] > entry["depth"]:
+                result[waiting.pop()] = index
+            waiting.append(index)
+        return result
+
+    def heavy_imports(self, entries):
+        """
+        The heavy modules that a module of cloudmesh.volume imports at
+        module level
+
+        :param entries: the result of parse
+        :return: list of dicts with module, imports and seconds, the
+                 slowest first
+        """
+        result = []
+        for entry, parent in zip(entries, self.parents(entries)):
+            if parent is None:
+                continue
+            importer = entries[parent]["module"]
+            if not importer.startswith(StartupBenchmark.package):
+                continue
+            if entry["module"].startswith(StartupBenchmark.package):
+                continue
+            if entry["cumulative"] >= self.heavy:
+                result.append({
+                    "module": importer,
+                    "imports": entry["module"],
+                    "seconds": round(entry["cumulative"], 4)
+                })
+        return sorted(result, key=lambda e: e["seconds"], reverse=True)
+
+    @staticmethod
+    def seconds(entries, module):
+        """
+        The time of importing a module including the packages it is in,
+        e.g. cloudmesh and cloudmesh.volume for cloudmesh.volume.Provider
+
+        :param entries: the result of parse
+        :param module: the name of the module
+        :return: seconds
+        """
+        parts = module.split(".")
+        names = {".".join(parts[:i + 1]) for i in range(len(parts))}
+        return sum(entry["cumulative"] for entry in entries
+                   if entry["depth"] == 0 and entry["module"] in names)
+
+    def importtime(self, module):
+        """
+        Imports a module in a new python with -X importtime
+
+        :param module: the name of the module
+        :return: the result of parse
+        """
+        process = subprocess.run(
+            [self.python, "-X", "importtime", "-c", f"import {module}"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else
+                               f"exit code {process.returncode}")
+        return self.parse(process.stderr)
+
+    @staticmethod
+    def first_output(command):
+        """
+        Runs a command and measures the time to its first output and to
+        its exit
+
+        :param command: list of the program and its arguments
+        :return: dict with first, total in seconds and returncode
+        """
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL)
+        first = os.read(process.stdout.fileno(), 1)
+        first_time = time.perf_counter() - start
+        process.stdout.read()
+        process.wait()
+        total = time.perf_counter() - start
+        process.stdout.close()
+        return {
+            "first": first_time if first else total,
+            "total": total,
+            "returncode": process.returncode
+        }
+
+    def records(self):
+        """
+        Takes the measurements
+
+        :return: generator of the records of BenchmarkLog, with the
+                 measurement as tag and the module or command as timer
+        """
+        self.errors = {}
+        self.imports = []
+        for module in self.modules:
+            for i in range(self.repeat):
+                try:
+                    entries = self.importtime(module)
+                except RuntimeError as e:
+                    self.errors[module] = str(e)
+                    yield {"tag": "import", "timer": module,
+                           "status": "failed", "time": 0.0}
+                    continue
+                if i == 0:
+                    self.imports.extend(self.heavy_imports(entries))
+                yield {"tag": "import", "timer": module, "status": "ok",
+                       "time": self.seconds(entries, module)}
+        for name, command in self.commands.items():
+            for i in range(self.repeat):
+                try:
+                    result = self.first_output(command)
+                except OSError as e:
+                    self.errors[name] = str(e)
+                    result = {"first": 0.0, "total": 0.0, "returncode": -1}
+                status = "ok" if result["returncode"] == 0 else "failed"
+                if status == "failed" and name not in self.errors:
+                    self.errors[name] = \
+                        f"exit code {result['returncode']}"
+                yield {"tag": "first-output", "timer": name,
+                       "status": status, "time": result["first"]}
+                yield {"tag": "command", "timer": name, "status": status,
+                       "time": result["total"]}
+
+    def run(self):
+        """
+        Takes the measurements and aggregates them
+
+        :return: list of aggregates of BenchmarkLog
+        """
+        results = BenchmarkLog().aggregate(self.records())
+        unique = {}
+        for entry in self.imports:
+            key = (entry["module"], entry["imports"])
+            if key not in unique:
+                unique[key] = entry
+        self.imports = sorted(unique.values(),
+                              key=lambda e: e["seconds"], reverse=True)
+        return results
+
+    def report(self):
+        """
+        Formats the heavy imports and the errors as text
+
+        :return: string
+        """
+        lines = []
+        if self.imports:
+            lines.append(f"# module level imports slower than "
+                         f"{self.heavy}s")
+            for entry in self.imports:
+                lines.append(f"{entry['seconds']:>8.3f}s  "
+                             f"{entry['module']} imports "
+                             f"{entry['imports']}")
+        for name, error in self.errors.items():
+            lines.append(f"# {name} failed: {error}")
+        return "\n".join(lines)
@@ -8,6 +8,8 @@ from cloudmesh.management.configuration.name import Name as VolumeName
 from cloudmesh.shell.command import PluginCommand
 from cloudmesh.shell.command import command
 from cloudmesh.shell.command import map_parameters
+from cloudmesh.volume.ApiProfiler import ApiProfiler
+from cloudmesh.volume.VolumeProfiler import VolumeProfiler
 from cloudmesh.volume.Provider import Provider
 
 
@@ -15,6 +17,8 @@ class VolumeCommand(PluginCommand):
 
     # noinspection PyUnusedLocal
     @command
+    @VolumeProfiler.option
+    @ApiProfiler.option
     def do_volume(self, args, arguments):
         """
         ::
@@ -25,8 +29,10 @@ class VolumeCommand(PluginCommand):
                         [--region=REGION]
                         [--cloud=CLOUD]
                         [--refresh]
+                        [--max-age=SECONDS]
                         [--dryrun]
                         [--output=FORMAT]
+                        [--profile]
             volume create [NAME]
                         [--size=SIZE]
                         [--volume_type=TYPE]
@@ -34,19 +40,35 @@ class VolumeCommand(PluginCommand):
                         [--dryrun]
                         [--region=REGION]
                         [--path=PATH]
-            volume attach [NAMES] [--vm=VM]
-            volume detach [NAMES]
-            volume delete [NAMES]
+                        [--profile]
+            volume attach [NAMES] [--vm=VM] [--profile]
+            volume detach [NAMES] [--profile]
+            volume delete [NAMES] [--profile]
             volume add_tag [NAME]
                         [--key=KEY]
                         [--value=VALUE]
-            volume status [NAME]
+                        [--profile]
+            volume status [NAME] [--profile]
             volume migrate [NAME]
                         [--vm=VM]
                         [--cloud=CLOUD]
+                        [--profile]
             volume sync [NAMES]
                         [--cloud=CLOUD]
-            volume purge [--cloud=CLOUD]
+                        [--profile]
+            volume verify [NAMES]
+                        [--cloud=CLOUD]
+                        [--profile]
+            volume snapshot [NAME]
+                        [--snapshot=SNAPSHOT]
+                        [--cloud=CLOUD]
+                        [--profile]
+            volume restore [NAME]
+                        [--snapshot=SNAPSHOT]
+                        [--path=PATH]
+                        [--cloud=CLOUD]
+                        [--profile]
+            volume purge [--cloud=CLOUD] [--profile]
 
           This command manages volumes across different clouds
 
@@ -59,12 +81,15 @@ class VolumeCommand(PluginCommand):
               --region=REGION      The name of the region
               --cloud=CLOUD        The name of the cloud
               --refresh            If refresh the info is taken from the cloud
+              --max-age=SECONDS    The maximum age of the cached info before
+                                   it is taken from the cloud
               --volume_type=TYPE   The type of the volume
               --output=FORMAT      Output format [default: table]
               --key=KEY            The tag key
               --value=VALUE        The value of tag key
-              --snapshot           The snapshot of volume
+              --snapshot=SNAPSHOT  The name of the snapshot
               --path=PATH          The path of local volume
+              --profile            Print the API calls of the command
 
           Description:
 
@@ -73,9 +98,13 @@ class VolumeCommand(PluginCommand):
                         [--region=REGION]
                         [--cloud=CLOUD]
                         [--refresh]
+                        [--max-age=SECONDS]
                         [--dryrun]
                         [--output=FORMAT]
                 List all the volumes for certain vm, region, or cloud.
+                The volumes are read from the cache in the database. They
+                are taken from the cloud if --refresh is given or if the
+                cache is older than --max-age or the ttl of the cloud.
 
             volume create [NAME]
                           [--size=SIZE]
@@ -109,10 +138,47 @@ class VolumeCommand(PluginCommand):
                         [--cloud=CLOUD]
                 Volume sync allows for data to be shared between two volumes.
 
+            volume verify [NAMES]
+                          [--cloud=CLOUD]
+                Builds a content-hash manifest of the volume and stores it
+                with the volume. Files that did not change since the last
+                manifest are not read again. If two volumes are given, their
+                manifests are compared, e.g. after a sync.
+
+            volume snapshot [NAME]
+                            [--snapshot=SNAPSHOT]
+                            [--cloud=CLOUD]
+                Takes a snapshot of a local volume. Only the chunks of the
+                files that changed since the last snapshot are stored.
+
+            volume restore [NAME]
+                           [--snapshot=SNAPSHOT]
+                           [--path=PATH]
+                           [--cloud=CLOUD]
+                Restores the last or the named snapshot of a local volume,
+                or restores it into the directory PATH.
+
             volume purge [--cloud=CLOUD]
                 Volume purge delete all the "deleted" volumes in MongoDB
                 database
 
+            With --profile the API calls of the providers are counted and
+            timed. They are printed after the command in the text format of
+            Prometheus, or as json with --output=json.
+
+            If the environment variable CLOUDMESH_VOLUME_TRACE is set to a
+            file, the command, the steps of the provider and its API calls
+            are appended to the file as spans in json lines. With
+            CLOUDMESH_VOLUME_TRACE=otel the spans are sent to OpenTelemetry.
+
+            If the environment variable CLOUDMESH_VOLUME_CPROFILE is set to
+            a file, the command is profiled with cProfile. The stacks are
+            written to the file in the collapsed format of flamegraph.pl and
+            speedscope, the statistics of cProfile to the file with .prof
+            appended. The functions that took the most time and the time
+            spent in imports, configuration, database and network are
+            printed after the command.
+
         """
 
         VERBOSE(arguments)
@@ -154,6 +220,11 @@ class VolumeCommand(PluginCommand):
             n.incr()
             return n
 
+        #
+        # the snapshot command is overwritten by the --snapshot option
+        #
+        take_snapshot = arguments.snapshot
+
         map_parameters(arguments,
                        "cloud",
                        "vm",
@@ -170,6 +241,8 @@ class VolumeCommand(PluginCommand):
                        "path"
                        )
 
+        arguments.max_age = arguments["--max-age"]
+
         arguments.output = Parameter.find("output",
                                           arguments,
                                           variables,
@@ -384,6 +457,60 @@ class VolumeCommand(PluginCommand):
             # else:
             #     raise NotImplementedError
 
+        elif arguments.verify:
+            # "cms volume verify NAMES --cloud=CLOUD"
+            names = arguments.NAMES or variables["volume"]
+            if names is None:
+                Console.error("No volume specified or found")
+                return ""
+            names = Parameter.expand(names)
+            if len(names) > 2:
+                Console.error("At most two volumes can be verified")
+                return ""
+            arguments.cloud = arguments.cloud or cloud
+            provider = Provider(name=arguments.cloud)
+            result = provider.verify(NAMES=names)
+            print(provider.Print(result,
+                                 kind='volume',
+                                 output=arguments.output))
+            for volume in result:
+                verify = volume['verify']
+                Console.msg(f"{volume['cm']['name']}: {verify['digest']} "
+                            f"{verify['files']} files, "
+                            f"{verify['hashed']} hashed, "
+                            f"{verify['reused']} unchanged")
+                compared = verify.get('compare')
+                if compared is None:
+                    continue
+                if compared['equal']:
+                    Console.ok(f"{volume['cm']['name']} and "
+                               f"{compared['with']} are equal")
+                else:
+                    Console.error(f"{volume['cm']['name']} and "
+                                  f"{compared['with']} differ")
+                    for name in compared['missing']:
+                        Console.error(f"missing in {compared['with']}: {name}")
+                    for name in compared['extra']:
+                        Console.error(f"only in {compared['with']}: {name}")
+                    for entry in compared['different']:
+                        Console.error(f"different: {entry['file']} "
+                                      f"chunks {entry['chunks']}")
+
+        elif take_snapshot or arguments.restore:
+            # "cms volume snapshot NAME --snapshot=SNAPSHOT --cloud=CLOUD"
+            # "cms volume restore NAME --snapshot=SNAPSHOT --path=PATH"
+            arguments.NAME = arguments.NAME or variables["volume"] \
+                or get_last_volume()
+            arguments.cloud = arguments.cloud or cloud
+            provider = Provider(name=arguments.cloud)
+            if take_snapshot:
+                result = provider.snapshot(**arguments)
+            else:
+                result = provider.restore(**arguments)
+            print(provider.Print(result,
+                                 kind='volume',
+                                 output=arguments.output))
+
         elif arguments.purge:
             arguments.cloud = arguments.cloud or cloud
             provider = Provider(name=arguments.cloud)
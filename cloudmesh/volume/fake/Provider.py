@@ -0,0 +1,457 @@
+import random
+import threading
+import time
+from time import sleep
+
+from cloudmesh.common.console import Console
+from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.SqliteVolumeRepository import SqliteVolumeRepository
+from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeRepository import VolumeRepository
+from cloudmesh.volume.VolumeTracer import VolumeTracer
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+
+
+class Provider(VolumeABC):
+    """
+    A volume provider that keeps its volumes in memory, for benchmarks and
+    for testing the facade, the volume command and the polling code
+    without a cloud.
+
+    The volumes of a cloud are kept in a FakeCloud that is shared by all
+    providers of the cloud in the process. Every API call, e.g.
+    "fake.create_volume", is counted and takes the latency of the default
+    dict. A call fails with a RuntimeError with the probability
+    failure_rate, or the probability given for the call in failures, e.g.
+    {"attach_volume": 0.1}. The
+    failures are drawn from a random generator with the seed of the
+    default dict, so a run can be repeated.
+
+    A volume goes through the states of a cloud volume
+
+        creating -> available -> attaching -> in-use -> detaching
+        -> available -> deleting -> deleted
+
+    where each transition takes the seconds given in the default dict,
+    e.g. create_time. The cloud is eventually consistent: a read returns
+    the state of the volume lag seconds ago, so a new volume is not listed
+    before lag seconds passed. The operations poll the cloud every poll
+    seconds until the volume reached its state, or fail after timeout
+    seconds.
+    """
+
+    kind = "volume"
+
+    sample = """
+    cloudmesh:
+      volume:
+        {name}:
+          cm:
+            active: true
+            heading: fake
+            host: localhost
+            kind: fake
+            version: TBD
+            service: volume
+          default:
+            region: zone-a
+            size: 1
+            vms: 10
+            latency: 0.0
+            failure_rate: 0.0
+            failures: {}
+            seed: 0
+            lag: 0.0
+            create_time: 0.0
+            attach_time: 0.0
+            detach_time: 0.0
+            delete_time: 0.0
+            poll: 0.1
+            timeout: 60
+            database: sqlite
+            database_path: ~/.cloudmesh/volume/{name}.db
+    """
+
+    output = VolumeRecord.output
+
+    #
+    # the in-memory clouds by name, shared by the providers of a process
+    #
+    clouds = {}
+
+    _lock = threading.Lock()
+
+    def __init__(self, name=None):
+        """
+        Initialize provider, get the default dict and the cloud of the
+        name, which is created on first use.
+
+        :param name: name of cloud
+        """
+        self.cloud = name
+        config = Config()
+        self.default = config[f"cloudmesh.volume.{self.cloud}.default"]
+        _get = self.default.get
+        self.region = _get("region") or FakeCloud.zone
+        self.lag = float(_get("lag") or 0)
+        self.times = {
+            "create": float(_get("create_time") or 0),
+            "attach": float(_get("attach_time") or 0),
+            "detach": float(_get("detach_time") or 0),
+            "delete": float(_get("delete_time") or 0),
+        }
+        self.poll = float(_get("poll") or 0.1)
+        self.timeout = float(_get("timeout") or 60)
+        self.failure_rate = float(_get("failure_rate") or 0)
+        self.failures = dict(_get("failures") or {})
+        with Provider._lock:
+            if self.cloud not in Provider.clouds:
+                Provider.clouds[self.cloud] = FakeCloud(
+                    latency=float(_get("latency") or 0),
+                    vms=int(_get("vms") or 10))
+            self.fake = Provider.clouds[self.cloud]
+            if not hasattr(self.fake, "random"):
+                self.fake.random = random.Random(_get("seed") or 0)
+        if _get("database", "sqlite") == "sqlite":
+            self.repository = SqliteVolumeRepository(
+                cloud=self.cloud,
+                kind="fake",
+                path=_get("database_path"))
+        else:
+            self.repository = VolumeRepository(cloud=self.cloud, kind="fake")
+
+    @staticmethod
+    def reset(name=None):
+        """
+        Removes the volumes of a cloud, or of all clouds
+
+        :param name: name of cloud
+        """
+        with Provider._lock:
+            if name is None:
+                Provider.clouds.clear()
+            else:
+                Provider.clouds.pop(name, None)
+
+    def update_dict(self, elements, kind=None):
+        """
+        This function adds a cloudmesh cm dict to each dict in the list
+        elements.
+
+        :param elements: the list of volume dicts of the cloud
+        :param kind: "fake"
+        :return: The list with the modified dicts
+        """
+        if elements is None:
+            return None
+        d = []
+        for element in elements:
+            if "cm" not in element:
+                element["cm"] = {}
+            element["cm"].update({
+                "kind": "volume",
+                "cloud": self.cloud,
+                "name": element["name"],
+                "region": element["zone"]
+            })
+            element["cm"].update(
+                VolumeRecord.from_entry("fake", element, self.cloud).cm())
+            d.append(element)
+        return d
+
+    def _call(self, name):
+        """
+        Makes an API call of the cloud. The call fails with the
+        probability of its failure rate.
+
+        :param name: the name of the call, e.g. "fake.create_volume"
+        """
+        rate = self.failures.get(name.split(".", 1)[1], self.failure_rate)
+        with self.fake._lock:
+            failed = rate and self.fake.random.random() < rate
+        self.fake.call(name)
+        if failed:
+            raise RuntimeError(f"{name} failed")
+
+    def _change(self, volume, state, vms, final, seconds):
+        """
+        Starts the transition of a volume to its final state
+
+        :param volume: the volume of the cloud
+        :param state: the state during the transition, e.g. "attaching"
+        :param vms: the vms the volume is attached to afterwards
+        :param final: the state after the transition
+        :param seconds: the time the transition takes
+        """
+        now = time.time()
+        with self.fake._lock:
+            volume["events"].append((now, state, list(volume["vms"])))
+            volume["events"].append((now + seconds, final, list(vms)))
+
+    def _view(self, volume, at):
+        """
+        The volume as it is seen by a read of the cloud
+
+        :param volume: the volume of the cloud
+        :param at: the time the read sees
+        :return: dict or None if the volume is not visible
+        """
+        with self.fake._lock:
+            events = [event for event in volume["events"] if event[0] <= at]
+            if not events:
+                return None
+            _, state, vms = events[-1]
+            return {
+                "name": volume["name"],
+                "id": volume["id"],
+                "size": volume["size"],
+                "zone": volume["zone"],
+                "state": state,
+                "vms": list(vms),
+                "tags": dict(volume["tags"]),
+                "created": volume["created"]
+            }
+
+    def _describe(self, name=None):
+        """
+        Reads the volumes of the cloud, lag seconds late
+
+        :param name: only the volume of the name
+        :return: list of dicts
+        """
+        self._call("fake.describe_volumes")
+        at = time.time() - self.lag
+        with self.fake._lock:
+            volumes = [volume for volume in self.fake.volumes.values()
+                       if name is None or volume["name"] == name]
+        result = []
+        for volume in volumes:
+            view = self._view(volume, at)
+            if view is not None and view["state"] != "deleted":
+                result.append(view)
+        return result
+
+    def _find(self, name):
+        """
+        Finds the volume of a name that is not deleted, without lag
+
+        :param name: the volume name
+        :return: the volume of the cloud
+        """
+        volume = self.fake.find(name=name)
+        if volume is None:
+            raise ValueError(f"volume {name} not found")
+        return volume
+
+    def _wait(self, name, state):
+        """
+        Polls the cloud until a volume is seen in a state
+
+        :param name: the volume name
+        :param state: the state, "deleted" waits until it is not listed
+        :return: dict of the volume, None for "deleted"
+        """
+        timeout = time.time() + self.timeout
+        with VolumeTracer.span("fake.wait", state=state):
+            while True:
+                views = self._describe(name=name)
+                if state == "deleted" and not views:
+                    return None
+                if views and views[0]["state"] == state:
+                    return views[0]
+                if time.time() > timeout:
+                    raise RuntimeError(
+                        f"volume {name} did not become {state}")
+                sleep(self.poll)
+
+    @VolumeTracer.traced("fake.list")
+    def list(self, **kwargs):
+        """
+        This function list all volumes as following:
+        If NAME (volume_name) is specified, it will print out info of NAME
+        If NAMES are specified, it will print out info of the volumes
+        If vm is specified, it will print out the volumes attached to vm
+        If region is specified, it will print out the volumes in the region
+        Without refresh the volumes are read from the repository.
+
+        :param kwargs: contains name of volume, vm name, region, refresh
+        :return: list of dicts
+        """
+        if kwargs and kwargs.get('refresh') is False:
+            if kwargs.get('NAME'):
+                return self.repository.find_name(name=kwargs['NAME'])
+            if kwargs.get('NAMES'):
+                return self.repository.find_names(names=kwargs['NAMES'])
+            query = {"cm.state": {"$ne": "deleted"}}
+            if kwargs.get('vm'):
+                query["cm.attached_vms"] = kwargs['vm']
+            if kwargs.get('region'):
+                query["cm.region"] = kwargs['region']
+            return self.repository.find(query)
+        volumes = self._describe()
+        names = kwargs.get('NAMES') or []
+        if kwargs.get('NAME'):
+            names = [kwargs['NAME']]
+        if names:
+            volumes = [v for v in volumes if v["name"] in names]
+        if kwargs.get('vm'):
+            volumes = [v for v in volumes if kwargs['vm'] in v["vms"]]
+        if kwargs.get('region'):
+            volumes = [v for v in volumes if v["zone"] == kwargs['region']]
+        return self.update_dict(volumes)
+
+    @VolumeTracer.traced("fake.create")
+    def create(self, **kwargs):
+        """
+        This function creates a new volume and waits until it is available.
+        Default parameters are read from self.default.
+
+        :param NAME (string): name of volume
+        :param size (int): size of volume in GB
+        :param region (string): zone of the volume
+        :return: list of dict
+        """
+        name = kwargs['NAME']
+        if self.fake.find(name=name) is not None:
+            raise ValueError(f"volume {name} already exists")
+        self._call("fake.create_volume")
+        with self.fake._lock:
+            volume = self.fake.create(name,
+                                      size=kwargs.get('size') or
+                                      self.default.get('size'),
+                                      zone=kwargs.get('region') or
+                                      self.region)
+            now = time.time()
+            volume["state"] = "creating"
+            volume["events"] = [
+                (now, "creating", []),
+                (now + self.times["create"], "available", [])]
+        return self.update_dict([self._wait(name, "available")])
+
+    @VolumeTracer.traced("fake.delete")
+    def delete(self, name=None):
+        """
+        This function deletes a volume that is not attached and waits
+        until it is gone
+
+        :param name: volume name
+        :return: list of dict of the deleted volume
+        """
+        volume = self._find(name)
+        if volume["vms"]:
+            raise ValueError(f"volume {name} is attached to "
+                             f"{', '.join(volume['vms'])}")
+        self._call("fake.delete_volume")
+        self._change(volume, "deleting", [], "deleted",
+                     self.times["delete"])
+        self._wait(name, "deleted")
+        result = self._view(volume, time.time())
+        self.fake.delete(volume)
+        return self.update_dict([result])
+
+    @VolumeTracer.traced("fake.attach")
+    def attach(self, names=None, vm=None):
+        """
+        This function attaches volumes to a vm and waits until they are
+        in use
+
+        :param names: names of volumes
+        :param vm: name of the vm
+        :return: list of dicts
+        """
+        if self.fake.vm(name=vm) is None:
+            raise ValueError(f"vm {vm} not found")
+        result = []
+        for name in names:
+            volume = self._find(name)
+            if vm in volume["vms"]:
+                Console.error(f"volume {name} is already attached to {vm}")
+                continue
+            self._call("fake.attach_volume")
+            self.fake.attach(volume, vm)
+            self._change(volume, "attaching", volume["vms"], "in-use",
+                         self.times["attach"])
+            result.append(self._wait(name, "in-use"))
+        return self.update_dict(result)
+
+    @VolumeTracer.traced("fake.detach")
+    def detach(self, name=None):
+        """
+        This function detaches a volume from all vms and waits until it is
+        available
+
+        :param name: volume name
+        :return: dict
+        """
+        volume = self._find(name)
+        if not volume["vms"]:
+            raise ValueError(f"volume {name} is not attached")
+        self._call("fake.detach_volume")
+        self._change(volume, "detaching", [], "available",
+                     self.times["detach"])
+        self.fake.detach(volume)
+        return self.update_dict([self._wait(name, "available")])[0]
+
+    @VolumeTracer.traced("fake.add_tag")
+    def add_tag(self, **kwargs):
+        """
+        This function adds a tag to a volume
+
+        :param NAME: name of volume
+        :param key: name of tag
+        :param value: value of tag
+        :return: dict
+        """
+        volume = self._find(kwargs['NAME'])
+        self._call("fake.create_tags")
+        with self.fake._lock:
+            volume["tags"][kwargs['key']] = kwargs['value']
+        return self.update_dict([self._view(volume, time.time())])[0]
+
+    def status(self, name=None):
+        """
+        This function returns the status of a volume as seen by the cloud
+
+        :param name: volume name
+        :return: list of dict
+        """
+        return self.update_dict(self._describe(name=name))
+
+    @VolumeTracer.traced("fake.migrate")
+    def migrate(self, **kwargs):
+        """
+        This function migrates a volume to another vm, it is detached from
+        its vms first
+
+        :param NAME (string): the volume name
+        :param vm (string): the vm name
+        :return: list of dict
+        """
+        name = kwargs['NAME']
+        if self._find(name)["vms"]:
+            self.detach(name=name)
+        return self.attach(names=[name], vm=kwargs['vm'])
+
+    @VolumeTracer.traced("fake.sync")
+    def sync(self, **kwargs):
+        """
+        This function synchronizes the second volume with the first one.
+        The volumes have no content, so only the call is made.
+
+        :param NAMES (list): the names of two volumes
+        :return: list of dicts
+        """
+        names = kwargs['NAMES']
+        volumes = [self._find(name) for name in names]
+        self._call("fake.copy_volume")
+        return self.update_dict([self._view(volume, time.time())
+                                 for volume in volumes])
+
+    def purge(self, **kwargs):
+        """
+        Remove the records of deleted volumes from the database
+
+        :return: number of removed records
+        """
+        return self.repository.delete_many({"cm.state": "deleted"})
@@ -1,11 +1,15 @@
 from cloudmesh.common.util import banner
 from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.ApiProfiler import ApiProfiler
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from time import sleep
 from googleapiclient.errors import HttpError
 from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeRepository import VolumeRepository
 
 
 class Provider(VolumeABC):
@@ -32,33 +36,7 @@ class Provider(VolumeABC):
             path_to_service_account_json: ~/.cloudmesh/service_account.json
     """
 
-    output = {
-        "volume": {
-            "sort_keys": ["cm.name"],
-            "order": ["cm.name",
-                      "cm.kind",
-                      "cm.cloud",
-                      "status",
-                      "sizeGb",
-                      "type",
-                      "creationTimestamp",
-                      "zone",
-                      "users",
-                      "description",
-                      "labels"],
-            "header": ["Name",
-                       "Kind",
-                       "Cloud",
-                       "Status",
-                       "Size",
-                       "Type",
-                       "Created",
-                       "Zone",
-                       "Attached to VMs",
-                       "Description",
-                       "Tags"]
-        }
-    }
+    output = VolumeRecord.output
 
     def __init__(self, name):
         """
@@ -71,6 +49,7 @@ class Provider(VolumeABC):
         self.cloud = name
         config = Config()
         self.cm = CmDatabase()
+        self.repository = VolumeRepository(cloud=self.cloud, kind="google")
         self.default = config[f"cloudmesh.volume.{name}.default"]
         self.credentials = config[f"cloudmesh.volume.{name}.credentials"]
         self.compute_scopes = [
@@ -103,6 +82,8 @@ class Provider(VolumeABC):
             _elements = [elements]
         d = []
         for entry in _elements:
+            # the labels are reduced to their keys below
+            record = VolumeRecord.from_entry("google", entry, self.cloud)
             if '/' in entry['type']:
                 entry['type'] = entry['type'].rsplit('/', 1)[1]
             if '/' in entry['zone']:
@@ -134,6 +115,7 @@ class Provider(VolumeABC):
                 "name": name,
                 "status": entry['status']
             })
+            entry["cm"].update(record.cm())
             d.append(entry)
         return d
 
@@ -167,7 +149,7 @@ class Provider(VolumeABC):
             compute_service = build('compute', 'v1',
                                     credentials=service_account_credentials)
 
-        return compute_service
+        return ApiProfiler.wrap(compute_service, "google", execute=True)
 
     def _get_disk(self, zone, disk):
         """
@@ -209,6 +191,7 @@ class Provider(VolumeABC):
                         found_instances.append(vm)
         return found_instances
 
+    @VolumeTracer.traced("google.list")
     def list(self, **kwargs):
         """
         Retrieves an aggregated list of persistent disks with most recently
@@ -218,12 +201,12 @@ class Provider(VolumeABC):
         """
         compute_service = self._get_compute_service()
         if kwargs and kwargs['refresh'] is False:
-            result = self.cm.find(cloud=self.cloud, kind='volume')
+            result = self.repository.find()
             for key in kwargs:
                 if key == 'NAME' and kwargs['NAME']:
-                    result = self.cm.find_name(name=kwargs['NAME'])
+                    result = self.repository.find_name(name=kwargs['NAME'])
                 elif key == 'NAMES' and kwargs['NAMES']:
-                    result = self.cm.find_names(names=kwargs['NAMES'])
+                    result = self.repository.find_names(names=kwargs['NAMES'])
 
             found = []
             if kwargs['region'] is not None:
@@ -347,6 +330,7 @@ class Provider(VolumeABC):
             result = self.update_dict(found)
             return result
 
+    @VolumeTracer.traced("google.create")
     def create(self, **kwargs):
         """
         Creates a persistent disk in the specified project using the data in
@@ -375,13 +359,15 @@ class Provider(VolumeABC):
         new_disk = self._get_disk(self.default['zone'], kwargs['NAME'])
 
         # wait for disk to finish being created
-        while new_disk['status'] != 'READY':
-            self._wait(1)
-            new_disk = self._get_disk(zone, kwargs['NAME'])
+        with VolumeTracer.span("google.wait_disk"):
+            while new_disk['status'] != 'READY':
+                self._wait(1)
+                new_disk = self._get_disk(zone, kwargs['NAME'])
 
         update_new_disk = self.update_dict(new_disk)
         return update_new_disk
 
+    @VolumeTracer.traced("google.delete")
     def delete(self, name=None):
         """
         Deletes the specified persistent disk.
@@ -408,12 +394,13 @@ class Provider(VolumeABC):
             deleted_disk = self._get_disk(zone, name)
             # wait for disk to be deleted if found in cloud
             if deleted_disk['status'] == 'DELETING':
-                while deleted_disk['status'] == 'DELETING':
-                    self._wait(1)
-                    try:
-                        deleted_disk = self._get_disk(zone, name)
-                    except HttpError:
-                        pass
+                with VolumeTracer.span("google.wait_disk"):
+                    while deleted_disk['status'] == 'DELETING':
+                        self._wait(1)
+                        try:
+                            deleted_disk = self._get_disk(zone, name)
+                        except HttpError:
+                            pass
         except HttpError:
             pass
 
@@ -432,6 +419,7 @@ class Provider(VolumeABC):
             instance=instance).execute()
         return vm
 
+    @VolumeTracer.traced("google.stop_instance")
     def _stop_instance(self, name=None, zone=None):
         """
         stops the instance with the given name
@@ -447,10 +435,12 @@ class Provider(VolumeABC):
 
         vm = self._get_instance(zone, name)
         # Wait for the instance to stop
-        while vm['status'] != 'TERMINATED':
-            self._wait(1)
-            vm = self._get_instance(zone, name)
+        with VolumeTracer.span("google.wait_instance"):
+            while vm['status'] != 'TERMINATED':
+                self._wait(1)
+                vm = self._get_instance(zone, name)
 
+    @VolumeTracer.traced("google.start_instance")
     def _start_instance(self, name=None, zone=None):
         """
         starts the instance with the given name
@@ -466,10 +456,12 @@ class Provider(VolumeABC):
 
         vm = self._get_instance(zone, name)
         # Wait for the instance to start
-        while vm['status'] != 'RUNNING':
-            self._wait(1)
-            vm = self._get_instance(zone, name)
+        with VolumeTracer.span("google.wait_instance"):
+            while vm['status'] != 'RUNNING':
+                self._wait(1)
+                vm = self._get_instance(zone, name)
 
+    @VolumeTracer.traced("google.attach")
     def attach(self, names, vm=None):
         """
         Attach one or more disks to an instance.  GCP requires that the
@@ -514,9 +506,10 @@ class Provider(VolumeABC):
         for name in names:
             get_disk = self._get_disk(zone, name)
             # wait for disk to finish attaching
-            while 'users' not in get_disk:
-                self._wait(1)
-                get_disk = self._get_disk(zone, name)
+            with VolumeTracer.span("google.wait_disk"):
+                while 'users' not in get_disk:
+                    self._wait(1)
+                    get_disk = self._get_disk(zone, name)
             new_attached_disks.append(get_disk)
         # update newly attached disks
         result = self.update_dict(new_attached_disks)
@@ -528,6 +521,7 @@ class Provider(VolumeABC):
 
         return result
 
+    @VolumeTracer.traced("google.detach")
     def detach(self, name=None):
         """
         Detach a disk from all instances.  GCP requires that the
@@ -569,9 +563,10 @@ class Provider(VolumeABC):
             # Wait for disk to detach
             detached_disk = self._get_disk(zone, name)
             if 'users' in detached_disk:
-                while instance in detached_disk['users']:
-                    self._wait(1)
-                    detached_disk = self._get_disk(zone, name)
+                with VolumeTracer.span("google.wait_disk"):
+                    while instance in detached_disk['users']:
+                        self._wait(1)
+                        detached_disk = self._get_disk(zone, name)
 
             # Restart the instance if necessary
             if instance_status == 'RUNNING':
@@ -583,6 +578,7 @@ class Provider(VolumeABC):
 
         return result[0]
 
+    @VolumeTracer.traced("google.add_tag")
     def add_tag(self, **kwargs):
         """
         Add a key:value label to the disk
@@ -610,9 +606,11 @@ class Provider(VolumeABC):
         tagged_disk = self._get_disk(self.default['zone'], kwargs['NAME'])
 
         # wait for tag to be applied
-        while 'labels' not in tagged_disk:
-            self._wait(1)
-            tagged_disk = self._get_disk(self.default['zone'], kwargs['NAME'])
+        with VolumeTracer.span("google.wait_disk"):
+            while 'labels' not in tagged_disk:
+                self._wait(1)
+                tagged_disk = self._get_disk(self.default['zone'],
+                                             kwargs['NAME'])
 
         updated_disk = self.update_dict(tagged_disk)
         return updated_disk[0]
@@ -633,6 +631,7 @@ class Provider(VolumeABC):
         result = self.update_dict(vol)
         return result
 
+    @VolumeTracer.traced("google.migrate")
     def migrate(self,
                 name=None,
                 from_vm=None,
@@ -653,6 +652,7 @@ class Provider(VolumeABC):
         # include how to migrate disks between zones and regions
         raise NotImplementedError
 
+    @VolumeTracer.traced("google.sync")
     def sync(self,
              from_volume=None,
              to_volume=None):
@@ -0,0 +1,440 @@
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import time
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.volume.multipass.VolumeWalker import VolumeWalker
+
+
+def _gear():
+    """
+    The random values of the gear hash. They are fixed, so that the chunks
+    of all stores are the same.
+
+    :return: list of 256 64 bit integers
+    """
+    r = random.Random(0x636d)
+    return [r.getrandbits(64) for _ in range(256)]
+
+
+class ChunkStore(object):
+    """
+    A content-addressed store of chunks for snapshots of local volume
+    directories.
+
+    The files of a volume are cut into chunks with content-defined
+    chunking. A rolling gear hash is computed over the bytes and a chunk
+    ends where the low bits of the hash are zero. The low bits only depend
+    on the last bytes, so an insert or delete in a file only changes the
+    chunks around it, the later chunks are found again. Every chunk is
+    stored once under the hash of its content
+
+        <directory>/chunks/<hash[:2]>/<hash>
+
+    and a snapshot is a json file that lists the chunks of each file
+
+        <directory>/snapshots/<volume>/<snapshot>.json
+
+    Files whose size and mtime did not change since the last snapshot of
+    the volume are not read again, their chunks are taken from that
+    snapshot. A repeated snapshot of a mostly unchanged volume so only
+    reads and stores the changed files.
+
+    On restore, files of the volume that still match the snapshot are kept
+    in place, or are cloned or hardlinked if the snapshot is restored into
+    another directory. All other files are assembled from the chunks.
+    """
+
+    directory = "~/.cloudmesh/volume/snapshots"
+
+    min_size = 16 << 10
+    avg_size = 64 << 10
+    max_size = 256 << 10
+    block = 4 << 20
+    segment = 1 << 20
+
+    gear = _gear()
+
+    def __init__(self, cloud=None, directory=None):
+        """
+        Initialize the chunk store of a cloud
+
+        :param cloud: name of the cloud
+        :param directory: the directory of the store, defaults to
+                          ~/.cloudmesh/volume/snapshots/<cloud>
+        """
+        self.cloud = cloud
+        self.directory = path_expand(
+            directory or f"{ChunkStore.directory}/{cloud}")
+        self.bits = ChunkStore.avg_size.bit_length() - 1
+        self.mask = (1 << self.bits) - 1
+        #
+        # the hash at an offset is the sum of gear[data[offset - k]] << k,
+        # the terms with k >= bits are cut off by the mask
+        #
+        self.window = 1 << (self.bits - 1).bit_length()
+        self.lane = (2 * self.bits + self.window.bit_length() + 7) // 8
+        self.tables = [bytes((g & self.mask) >> (8 * j) & 0xff
+                             for g in ChunkStore.gear)
+                       for j in range((self.bits + 7) // 8)]
+        self._lanes = None
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+    def _candidates(self, data):
+        """
+        The offsets of a short buffer at which the hash is zero
+
+        Every byte gets a lane of its own in one large integer that holds
+        the low bits of its gear value. The shifts and additions of the
+        hash are then done for all offsets at once, and the lanes are wide
+        enough that no sum carries into the next lane.
+
+        :param data: bytes
+        :return: list of offsets
+        """
+        lane = self.lane
+        n = len(data)
+        if self._lanes is None:
+            pattern = self.mask.to_bytes(lane, "little")
+            self._lanes = int.from_bytes(
+                pattern * (ChunkStore.segment + self.window), "little")
+        buffer = bytearray(lane * n)
+        for j, table in enumerate(self.tables):
+            buffer[j::lane] = data.translate(table)
+        x = int.from_bytes(buffer, "little")
+        width = 1
+        while width < self.window:
+            x += x << ((8 * lane + 1) * width)
+            width *= 2
+        x &= self._lanes
+        values = x.to_bytes(lane * (n + self.window), "little")
+        found = []
+        low = values[0:lane * n:lane]
+        high = [values[j:lane * n:lane] for j in range(1, len(self.tables))]
+        for match in re.finditer(b"\x00", low):
+            i = match.start()
+            if i >= self.window - 1 and not any(h[i] for h in high):
+                found.append(i)
+        return found
+
+    def candidates(self, data):
+        """
+        The offsets at which a chunk may end, that is the offsets at which
+        the low bits of the hash are zero. The buffer is scanned in
+        segments to bound the memory of the large integers.
+
+        :param data: bytes
+        :return: sorted list of offsets
+        """
+        found = []
+        overlap = self.window - 1
+        for start in range(0, len(data), ChunkStore.segment):
+            offset = max(start - overlap, 0)
+            found.extend(
+                offset + i for i in self._candidates(
+                    data[offset:start + ChunkStore.segment])
+                if offset + i >= start)
+        return found
+
+    def cut(self, data):
+        """
+        Finds the chunk boundaries of a buffer
+
+        :param data: bytes
+        :return: list of the end offsets of the chunks
+        """
+        candidates = self.candidates(data)
+        n = len(data)
+        ends = []
+        start = 0
+        while start < n:
+            end = min(start + ChunkStore.max_size, n)
+            i = bisect.bisect_left(candidates, start + ChunkStore.min_size)
+            if i < len(candidates) and candidates[i] < end:
+                end = candidates[i] + 1
+            ends.append(end)
+            start = end
+        return ends
+
+    def chunks(self, f):
+        """
+        Reads a file in blocks and cuts it into chunks
+
+        :param f: the file opened in binary mode
+        :return: generator of the chunks as bytes
+        """
+        data = b""
+        eof = False
+        while not eof:
+            block = f.read(ChunkStore.block)
+            eof = len(block) == 0
+            data += block
+            if not data:
+                break
+            ends = self.cut(data)
+            if not eof:
+                #
+                # the last chunk may continue in the next block
+                #
+                ends = ends[:-1]
+            start = 0
+            for end in ends:
+                yield data[start:end]
+                start = end
+            data = data[start:]
+
+    def _chunk_file(self, path):
+        return os.path.join(self.directory, "chunks", path[:2], path)
+
+    def has(self, digest):
+        return os.path.exists(self._chunk_file(digest))
+
+    def put(self, data):
+        """
+        Stores a chunk if it is not yet in the store
+
+        :param data: the content of the chunk
+        :return: the hash of the chunk and True if it was new
+        """
+        digest = self._digest(data)
+        filename = self._chunk_file(digest)
+        if os.path.exists(filename):
+            return digest, False
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, filename)
+        return digest, True
+
+    def get(self, digest):
+        """
+        Reads a chunk
+
+        :param digest: the hash of the chunk
+        :return: bytes
+        """
+        with open(self._chunk_file(digest), "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def check_name(name):
+        """
+        Checks that a snapshot name can be used as file name in the
+        directory of the snapshots of a volume
+
+        :param name: snapshot name
+        :raises ValueError: if the name is empty or contains a path
+        """
+        separators = [os.sep] + ([os.altsep] if os.altsep else [])
+        if not name or ".." in name or \
+                any(separator in name for separator in separators):
+            raise ValueError(f"invalid snapshot name {name!r}")
+
+    def _snapshot_file(self, volume, name):
+        self.check_name(name)
+        return os.path.join(self.directory, "snapshots", volume,
+                            f"{name}.json")
+
+    def snapshots(self, volume):
+        """
+        The snapshots of a volume, the oldest first. They are sorted by the
+        time stored in each snapshot, so names given by the user do not
+        change the order.
+
+        :param volume: volume name
+        :return: list of snapshot names
+        """
+        directory = os.path.join(self.directory, "snapshots", volume)
+        try:
+            files = [f for f in os.listdir(directory) if f.endswith(".json")]
+        except OSError:
+            return []
+        created = {}
+        for f in files:
+            name = f[:-len(".json")]
+            snapshot = self.load(volume, name) or {}
+            created[name] = snapshot.get("created", 0)
+        return sorted(created, key=lambda name: (created[name], name))
+
+    def load(self, volume, name):
+        """
+        Reads a snapshot
+
+        :param volume: volume name
+        :param name: snapshot name
+        :return: dict or None if the snapshot does not exist
+        """
+        try:
+            with open(self._snapshot_file(volume, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def snapshot(self, volume, path, name=None):
+        """
+        Takes a snapshot of a volume directory
+
+        :param volume: volume name
+        :param path: the volume directory
+        :param name: snapshot name, defaults to the time of the snapshot
+                     in microseconds
+        :return: dict with the snapshot name and the counts of files,
+                 bytes, new chunks, new bytes and reused files
+        :raises ValueError: if the name is invalid or a snapshot of the
+                            volume with the name exists
+        """
+        start = time.time()
+        name = name or datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        filename = self._snapshot_file(volume, name)
+        if os.path.exists(filename):
+            raise ValueError(f"snapshot {name} of {volume} already exists")
+        previous = {}
+        names = self.snapshots(volume)
+        if names:
+            last = self.load(volume, names[-1]) or {}
+            previous = {entry["path"]: entry
+                        for entry in last.get("files", [])}
+        stats, directories = VolumeWalker.walk(path, strict=True)
+        counts = {"files": len(stats), "bytes": 0, "chunks": 0,
+                  "new_chunks": 0, "new_bytes": 0, "reused": 0}
+        files = []
+        for relative in sorted(stats):
+            st = stats[relative]
+            counts["bytes"] += st.st_size
+            old = previous.get(relative)
+            if old and old["size"] == st.st_size \
+                    and old["mtime"] == st.st_mtime_ns \
+                    and all(self.has(c) for c in old["chunks"]):
+                chunks = old["chunks"]
+                counts["reused"] += 1
+            else:
+                chunks = []
+                with open(os.path.join(path, relative), "rb") as f:
+                    for data in self.chunks(f):
+                        digest, new = self.put(data)
+                        if new:
+                            counts["new_chunks"] += 1
+                            counts["new_bytes"] += len(data)
+                        chunks.append(digest)
+            counts["chunks"] += len(chunks)
+            files.append({
+                "path": relative,
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "mode": st.st_mode & 0o7777,
+                "chunks": chunks
+            })
+        snapshot = {
+            "volume": volume,
+            "name": name,
+            "created": time.time(),
+            "directories": directories,
+            "files": files
+        }
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, filename)
+        counts["name"] = name
+        counts["seconds"] = round(time.time() - start, 3)
+        return counts
+
+    @staticmethod
+    def clone(source, destination, link="reflink"):
+        """
+        Creates destination as a copy of source that shares its data if
+        the file system allows it
+
+        :param source: the source file
+        :param destination: the destination file
+        :param link: "reflink" clones the file on file systems with copy on
+                     write and copies it otherwise, "hardlink" links it,
+                     "copy" copies it
+        """
+        if link == "hardlink":
+            os.link(source, destination)
+            return
+        if link == "reflink":
+            try:
+                import fcntl
+                with open(source, "rb") as fsrc, \
+                        open(destination, "wb") as fdst:
+                    # FICLONE of linux/fs.h
+                    fcntl.ioctl(fdst.fileno(), 0x40049409, fsrc.fileno())
+                shutil.copystat(source, destination)
+                return
+            except (ImportError, OSError):
+                pass
+        shutil.copy2(source, destination)
+
+    def restore(self, volume, name, path, source=None, link="reflink"):
+        """
+        Restores a snapshot into a directory
+
+        :param volume: volume name
+        :param name: snapshot name
+        :param path: the directory the snapshot is restored into
+        :param source: the volume directory. Its files that still match the
+                       snapshot are reused. If source is path, they are kept
+                       in place.
+        :param link: how files of source are reused in another directory,
+                     "reflink", "hardlink" or "copy"
+        :return: dict with the counts of files that were kept, linked and
+                 written, and the bytes written
+        """
+        start = time.time()
+        snapshot = self.load(volume, name)
+        if snapshot is None:
+            raise ValueError(f"snapshot {name} of {volume} does not exist")
+        in_place = source is not None and \
+            os.path.abspath(source) == os.path.abspath(path)
+        current = {}
+        if source is not None and os.path.isdir(source):
+            current, _ = VolumeWalker.walk(source, strict=True)
+        counts = {"kept": 0, "linked": 0, "written": 0, "bytes": 0,
+                  "removed": 0}
+        os.makedirs(path, exist_ok=True)
+        for directory in snapshot["directories"]:
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+        wanted = set()
+        for entry in snapshot["files"]:
+            relative = entry["path"]
+            wanted.add(relative)
+            target = os.path.join(path, relative)
+            st = current.get(relative)
+            unchanged = st is not None and st.st_size == entry["size"] \
+                and st.st_mtime_ns == entry["mtime"]
+            if unchanged and in_place:
+                counts["kept"] += 1
+                continue
+            tmp = f"{target}.{os.getpid()}.restore"
+            if unchanged:
+                self.clone(os.path.join(source, relative), tmp, link=link)
+                counts["linked"] += 1
+            else:
+                with open(tmp, "wb") as f:
+                    for digest in entry["chunks"]:
+                        f.write(self.get(digest))
+                os.chmod(tmp, entry["mode"])
+                os.utime(tmp, ns=(entry["mtime"], entry["mtime"]))
+                counts["written"] += 1
+                counts["bytes"] += entry["size"]
+            os.replace(tmp, target)
+        if in_place:
+            for relative in current:
+                if relative not in wanted:
+                    os.remove(os.path.join(path, relative))
+                    counts["removed"] += 1
+        counts["seconds"] = round(time.time() - start, 3)
+        return counts
@@ -0,0 +1,112 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MountPool(object):
+    """
+    Runs multipass mount and unmount for many (path, vm) pairs
+    concurrently.
+
+    Each mount is a multipass subprocess that mostly waits for the
+    multipass daemon, so the pairs are run by a pool of threads. At most
+    workers subprocesses run at the same time. The result of each pair is
+    returned as dict
+
+        {
+            "path": path,
+            "vm": vm,
+            "command": the command as list,
+            "returncode": exit code of the command,
+            "output": stdout and stderr of the command
+        }
+
+    in the order of the pairs.
+    """
+
+    workers = 8
+
+    def __init__(self, workers=None):
+        """
+        Initialize the pool
+
+        :param workers: the maximum number of concurrent subprocesses
+        """
+        self.workers = int(workers or MountPool.workers)
+
+    @staticmethod
+    def command(action, path, vm):
+        """
+        The multipass command for a pair
+
+        :param action: "mount" or "unmount"
+        :param path: path of the volume
+        :param vm: name of the vm
+        :return: list
+        """
+        if action == "mount":
+            return ["multipass", "mount", path, vm]
+        elif action == "unmount":
+            return ["multipass", "unmount", f"{vm}:{path}"]
+        raise ValueError(f"action {action} not supported")
+
+    @staticmethod
+    def _run(action, path, vm):
+        """
+        Runs the command of a pair
+
+        :param action: "mount" or "unmount"
+        :param path: path of the volume
+        :param vm: name of the vm
+        :return: dict
+        """
+        command = MountPool.command(action, path, vm)
+        try:
+            r = subprocess.run(command,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               universal_newlines=True)
+            returncode, output = r.returncode, r.stdout
+        except OSError as e:
+            returncode, output = 127, str(e)
+        return {
+            "path": path,
+            "vm": vm,
+            "command": command,
+            "returncode": returncode,
+            "output": output
+        }
+
+    def run(self, action, pairs):
+        """
+        Runs the command for all pairs
+
+        :param action: "mount" or "unmount"
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts, one for each pair
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        workers = max(1, min(self.workers, len(pairs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(MountPool._run, action, path, vm)
+                       for path, vm in pairs]
+            return [future.result() for future in futures]
+
+    def mount(self, pairs):
+        """
+        Mounts the paths to the vms
+
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts, one for each pair
+        """
+        return self.run("mount", pairs)
+
+    def unmount(self, pairs):
+        """
+        Unmounts the paths from the vms
+
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts, one for each pair
+        """
+        return self.run("unmount", pairs)
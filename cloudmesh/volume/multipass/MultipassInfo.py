@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from cloudmesh.common.Shell import Shell
+from cloudmesh.common.console import Console
+
+
+class MultipassInfo(object):
+    """
+    A snapshot of the state and the mounts of all multipass vms.
+
+    The snapshot is taken with a single
+
+        multipass info --all --format=json
+
+    and parsed once. All questions about vms, e.g. their state or their
+    mounts, are answered from the snapshot. Within an operation, which is
+    opened with
+
+        with info.operation():
+            ...
+
+    the snapshot is taken at most once, unless it is invalidated because a
+    mount or unmount changed the vms. Outside of an operation, and when an
+    operation starts, a snapshot older than ttl seconds is taken again. With
+    the default ttl of 0 every operation takes its own snapshot.
+
+    The number of multipass info commands run is counted in calls.
+    """
+
+    command = "multipass info --all --format=json"
+
+    def __init__(self, ttl=0):
+        """
+        Initialize the snapshot service
+
+        :param ttl: seconds a snapshot is reused between operations
+        """
+        self.ttl = ttl or 0
+        self.calls = 0
+        self._data = None
+        self._taken = None
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    def age(self):
+        """
+        The age of the snapshot
+
+        :return: seconds since the snapshot was taken, None if there is none
+        """
+        if self._taken is None:
+            return None
+        return time.time() - self._taken
+
+    def invalidate(self):
+        """
+        Drops the snapshot, so that the next question takes a new one
+        """
+        with self._lock:
+            self._data = None
+            self._taken = None
+
+    @contextmanager
+    def operation(self):
+        """
+        Opens an operation in which the snapshot is reused. Operations can
+        be nested, only the outermost one checks the ttl.
+        """
+        with self._lock:
+            if self._depth == 0 and self._data is not None \
+                    and self.age() > self.ttl:
+                self.invalidate()
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+
+    def snapshot(self):
+        """
+        The info of all vms, taken if there is no valid snapshot
+
+        :return: dict of vm names to the info of the vm
+        """
+        with self._lock:
+            stale = self._data is None or \
+                (self._depth == 0 and self.age() > self.ttl)
+            if stale:
+                self.calls += 1
+                try:
+                    result = json.loads(Shell.run(MultipassInfo.command))
+                    self._data = result.get("info", {})
+                except Exception as e:
+                    Console.error(f"multipass info failed: {e}")
+                    self._data = {}
+                self._taken = time.time()
+            return self._data
+
+    def vm(self, name):
+        """
+        The info of a vm
+
+        :param name: vm name
+        :return: dict or None if the vm does not exist
+        """
+        return self.snapshot().get(name)
+
+    def state(self, name):
+        """
+        The state of a vm, e.g. "Running"
+
+        :param name: vm name
+        :return: string or None if the vm does not exist
+        """
+        info = self.vm(name)
+        if info is None:
+            return None
+        return info.get("state")
+
+    def mounts(self, name):
+        """
+        The mounts of a vm
+
+        :param name: vm name
+        :return: dict of the mount targets in the vm to their source
+        """
+        info = self.vm(name) or {}
+        return info.get("mounts") or {}
+
+    def status(self, name):
+        """
+        The status of a vm in the form the provider returns it
+
+        :param name: vm name
+        :return: dict with name, status and mounts
+        """
+        info = self.vm(name)
+        if info is None:
+            return {
+                'name': name,
+                'status': "instance does not exist",
+                'mounts': {}
+            }
+        return {
+            'name': name,
+            'status': info.get("state"),
+            'mounts': info.get("mounts") or {}
+        }
@@ -1,13 +1,21 @@
-import json
 import os
 from pathlib import Path
 
-from cloudmesh.common.Shell import Shell
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 from cloudmesh.configuration.Config import Config
 from cloudmesh.common.console import Console
 import datetime
-from cloudmesh.mongo.CmDatabase import CmDatabase
+import time
+from cloudmesh.volume.SqliteVolumeRepository import SqliteVolumeRepository
+from cloudmesh.volume.VolumeRepository import VolumeRepository
+from cloudmesh.volume.multipass.ChunkStore import ChunkStore
+from cloudmesh.volume.multipass.MountPool import MountPool
+from cloudmesh.volume.multipass.MultipassInfo import MultipassInfo
+from cloudmesh.volume.multipass.VolumeManifest import VolumeManifest
+from cloudmesh.volume.multipass.VolumeSync import VolumeSync
+from cloudmesh.volume.multipass.VolumeUsage import VolumeUsage
 
 
 class Provider(VolumeABC):
@@ -26,6 +34,16 @@ class Provider(VolumeABC):
             service: volume
           default:
             path: /Volumes/multipass
+            backend: directory
+            size: 1
+            preallocate: False
+            info_ttl: 0
+            mount_workers: 8
+            scan_workers: 8
+            sync_workers: 8
+            verify_workers: 8
+            restore_link: reflink
+            database: mongo
     """
 
     output = {
@@ -38,6 +56,8 @@ class Provider(VolumeABC):
                       "path",
                       'machine_path',
                       "AttachedToVm",
+                      "usage.bytes",
+                      "usage.files",
                       "tags",
                       "time"
                       ],
@@ -48,27 +68,63 @@ class Provider(VolumeABC):
                        "Path",
                        'Machine Path',
                        "AttachedToVm",
+                       "Used(B)",
+                       "Files",
                        "Tags",
                        "Update Time"
                        ]
         }
     }
 
-    def generate_volume_info(self, NAME, path):
+    #
+    # the fields of a volume record read by the operations
+    #
+    fields = ["cm",
+              "name",
+              "path",
+              "AttachedToVm",
+              "State",
+              "machine_path",
+              "usage",
+              "size_gb",
+              "backend",
+              "tags",
+              "time"]
+
+    #
+    # the backends of a volume. A directory volume is a directory that is
+    # mounted into the vm. An image volume is a directory that holds a
+    # sparse image file of the size of the volume, image_name, which the vm
+    # can use as a block device, e.g. with losetup.
+    #
+    backends = ["directory", "image"]
+
+    image_name = "disk.img"
+
+    def generate_volume_info(self, NAME, path, backend="directory",
+                             size=None):
         """
         generate volume info dict.
         info['AttachedToVm'] is a list of vm names where the volume is attached
         to. (volume can attach to multiple vm and vm can have multiple
         attachments) info['machine_path'] is the volume path in vm
         info['time"] is the created time, will be updated as updated time
+        info['usage'] is the bytes and number of files in the volume
+        info['backend'] is "directory" or "image", image volumes have a
+        size in GB
 
         :param NAME: volume name
         :param path: volume path
+        :param backend: the backend of the volume
+        :param size: the size of an image volume in GB
         :return: dict
         """
         info = {'tags': [], 'name': NAME, 'path': path, 'AttachedToVm': [],
                 'State': 'available', 'machine_path': None,
-                'time': datetime.datetime.now()}
+                'usage': {'bytes': 0, 'files': 0}, 'size_gb': 0,
+                'backend': backend, 'time': datetime.datetime.now()}
+        if backend == "image":
+            info['size_gb'] = size
         return info
 
     def update_volume_after_attached_to_vm(self, info, vms):
@@ -90,7 +146,7 @@ class Provider(VolumeABC):
         info[0]['AttachedToVm'] = vms
         info[0]['State'] = 'in-use'
         info[0]['time'] = datetime.datetime.now()
-        return info
+        return self.update_dict(info)
 
     def update_volume_after_detach(self, info, vms):
         """
@@ -107,7 +163,7 @@ class Provider(VolumeABC):
             info[0]['machine_path'] = None
             info[0]['State'] = 'available'
         info[0]['time'] = datetime.datetime.now()
-        return info
+        return self.update_dict(info)
 
     def update_volume_tag(self, info, key, value):
         """
@@ -135,13 +191,15 @@ class Provider(VolumeABC):
             tag = {key: value}
             info[0]['tags'].append(tag)
         info[0]['time'] = datetime.datetime.now()
-        return info
+        return self.update_dict(info)
 
     def __init__(self, name):
         """
         Initialize provider.
-        set cloudtype to "multipass", get the default dict, create a cloudmesh
-        database object.
+        set cloudtype to "multipass", get the default dict, create the
+        repository of the volumes. With database: sqlite in the default dict
+        the volumes are kept in an SQLite file, database_path, instead of
+        MongoDB.
 
         :param name: name of cloud
         """
@@ -149,7 +207,24 @@ class Provider(VolumeABC):
         self.cloudtype = "multipass"
         config = Config()
         self.default = config[f"cloudmesh.volume.{self.cloud}.default"]
-        self.cm = CmDatabase()
+        if self.default.get("database") == "sqlite":
+            self.repository = SqliteVolumeRepository(
+                cloud=self.cloud,
+                kind="multipass",
+                path=self.default.get("database_path"))
+        else:
+            self.repository = VolumeRepository(cloud=self.cloud,
+                                               kind="multipass")
+        self.info = MultipassInfo(ttl=self.default.get("info_ttl"))
+        self.pool = MountPool(workers=self.default.get("mount_workers"))
+        self.usage = VolumeUsage(cloud=self.cloud,
+                                 workers=self.default.get("scan_workers"))
+        self.syncer = VolumeSync(cloud=self.cloud,
+                                 workers=self.default.get("sync_workers"))
+        self.manifest = VolumeManifest(
+            workers=self.default.get("verify_workers"))
+        self.chunks = ChunkStore(cloud=self.cloud,
+                                 directory=self.default.get("snapshot_path"))
 
     def update_dict(self, elements, kind=None):
         """
@@ -172,9 +247,12 @@ class Provider(VolumeABC):
                 "cloud": self.cloud,
                 "name": element['name'],
             })
+            record = VolumeRecord.from_entry("multipass", element, self.cloud)
+            element["cm"].update(record.cm())
             d.append(element)
         return d
 
+    @VolumeTracer.traced("multipass.create")
     def create(self, **kwargs):
         """
         This function create a new volume.
@@ -184,6 +262,7 @@ class Provider(VolumeABC):
 
         :param NAME (string): the name of volume
         :param path (string): path of volume
+        :param size (int): size of an image volume in GB
         :return: dict
         """
         for key in self.default.keys():
@@ -192,14 +271,73 @@ class Provider(VolumeABC):
             elif kwargs[key] is None:
                 kwargs[key] = self.default[key]
         name = kwargs['NAME']
-        path = Path(kwargs['path'])
-        new_path = Path(f'{path}/{name}')
-        result = os.system(f"mkdir {new_path}")
-        if result == 0:
-            result = self.generate_volume_info(NAME=name, path=kwargs['path'])
-        result = self.update_dict([result])
+        result = self.create_many(names=[name], path=kwargs['path'],
+                                  size=kwargs.get('size'))
+        if result[0]['State'] == 'error':
+            return None
         return result
 
+    def create_many(self, names=None, path=None, size=None, backend=None):
+        """
+        Creates the directories of many volumes in one call.
+        The directories are created in process, so no shell is started for
+        a volume. A volume that can not be created is reported with the
+        State "error" and the reason in "error".
+        With the image backend each directory gets a sparse image file of
+        size GB. If preallocate is set in the default dict the blocks of
+        the image are allocated, so the space is reserved on the host.
+
+        :param names: list of volume names
+        :param path: path of the volumes, defaults to the path of the cloud
+        :param size: size of image volumes in GB
+        :param backend: "directory" or "image", defaults to the backend of
+                        the cloud
+        :return: list of dicts, one for each name in the order of names
+        """
+        path = path or self.default['path']
+        backend = backend or self.default.get('backend') or "directory"
+        if backend not in Provider.backends:
+            raise ValueError(f"backend {backend} not supported")
+        size = int(size or self.default.get('size') or 1)
+        result = []
+        for name in names or []:
+            try:
+                Path(f'{path}/{name}').mkdir()
+                if backend == "image":
+                    self._create_image(f'{path}/{name}', size)
+            except OSError as e:
+                Console.error(f"volume {name} could not be created: {e}")
+                result.append({'name': name, 'path': path,
+                               'State': 'error', 'error': str(e)})
+                continue
+            result.append(self.update_dict(
+                [self.generate_volume_info(NAME=name, path=path,
+                                           backend=backend,
+                                           size=size)])[0])
+        return result
+
+    def _create_image(self, directory, size):
+        """
+        Creates the image file of an image volume. If the image can not be
+        created the directory is removed again.
+
+        :param directory: the directory of the volume
+        :param size: size in GB
+        """
+        image = f"{directory}/{Provider.image_name}"
+        try:
+            with open(image, "xb") as f:
+                f.truncate(size * 2 ** 30)
+                if self.default.get('preallocate') and \
+                        hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, size * 2 ** 30)
+        except OSError:
+            if os.path.exists(image):
+                os.remove(image)
+            os.rmdir(directory)
+            raise
+
+    @VolumeTracer.traced("multipass.delete")
     def delete(self, name):
         """
         Delete volumes.
@@ -208,17 +346,35 @@ class Provider(VolumeABC):
         :param name: volume name
         :return:
         """
-        result = self.cm.find_name(name)
-        path = result[0]['path']
-        delete_path = Path(f'{path}/{name}')
-        try:
-            os.system(f"rmdir {delete_path}")
-            result[0]['State'] = 'deleted'
-            result = self.update_dict(result)
-        except:
-            Console.error("volume is either not empty or not exist")
-        return result
-
+        return self.delete_many(names=[name])
+
+    def delete_many(self, names=None):
+        """
+        Deletes the directories of many volumes in one call.
+        A volume is only marked as deleted if its directory was removed. If
+        the directory is not empty or does not exist the record is returned
+        unchanged.
+
+        :param names: list of volume names
+        :return: list of dicts of the volumes found in the database
+        """
+        result = self.repository.find_names(names, fields=self.fields)
+        for entry in result:
+            name = entry['name']
+            directory = f"{entry['path']}/{name}"
+            try:
+                if entry.get('backend') == "image":
+                    image = f"{directory}/{Provider.image_name}"
+                    if os.path.exists(image):
+                        os.remove(image)
+                Path(directory).rmdir()
+                entry['State'] = 'deleted'
+            except OSError as e:
+                Console.error(f"volume {name} could not be deleted, it is "
+                              f"either not empty or does not exist: {e}")
+        return self.update_dict(result)
+
+    @VolumeTracer.traced("multipass.list")
     def list(self, **kwargs):
         """
         This function list all volumes as following:
@@ -234,23 +390,78 @@ class Provider(VolumeABC):
         :param region: for multipass, it is the same with "path"
         :return: dict
         """
-        if kwargs:
-            result = self.cm.find(cloud='multipass', kind='volume')
-            for key in kwargs:
-                if key == 'NAME' and kwargs['NAME']:
-                    result = self.cm.find_name(name=kwargs['NAME'])
-                elif key == 'NAMES' and kwargs['NAMES']:
-                    result = self.cm.find_names(names=kwargs['NAMES'])
-                elif key == 'vm' and kwargs['vm']:
-                    result = self.cm.find(collection=f"{self.cloud}-volume",
-                                          query={'AttachedToVm': kwargs['vm']})
-                elif key == 'region' and kwargs['region']:
-                    result = self.cm.find(collection=f"{self.cloud}-volume",
-                                          query={'path': kwargs['region']})
-        else:
-            result = self.cm.find(cloud='multipass', kind='volume')
+        result = self.repository.find(fields=self.fields)
+        for key in kwargs:
+            if key == 'NAME' and kwargs['NAME']:
+                result = self.repository.find_name(name=kwargs['NAME'],
+                                                   fields=self.fields)
+            elif key == 'NAMES' and kwargs['NAMES']:
+                result = self.repository.find_names(names=kwargs['NAMES'],
+                                                    fields=self.fields)
+            elif key == 'vm' and kwargs['vm']:
+                result = self.repository.find({'AttachedToVm': kwargs['vm']},
+                                              fields=self.fields)
+            elif key == 'region' and kwargs['region']:
+                result = self.repository.find({'path': kwargs['region']},
+                                              fields=self.fields)
         return result
 
+    def scan(self, volumes=None, force=False):
+        """
+        Updates the used space of volumes. The volume directories are
+        scanned in parallel, directories that did not change since the last
+        scan are not read again. For image volumes the allocated blocks of
+        the image are used. The used space is kept in usage, size_gb stays
+        the size of the volume. Records whose usage changed are written to
+        the database. Deleted volumes are not scanned but returned as well.
+
+        :param volumes: list of volume dicts, defaults to all volumes
+        :param force: list all directories even if they did not change
+        :return: list of volume dicts with the usage
+        """
+        if volumes is None:
+            volumes = self.repository.find(fields=self.fields)
+        paths = {}
+        changed = []
+        for volume in volumes:
+            if volume.get('State') == 'deleted':
+                continue
+            path = f"{volume['path']}/{volume['name']}"
+            if volume.get('backend') != "image":
+                paths[path] = volume
+                continue
+            #
+            # the usage of an image is the space of its allocated blocks
+            #
+            try:
+                st = os.stat(f"{path}/{Provider.image_name}")
+                usage = {'bytes': st.st_blocks * 512, 'files': 1}
+            except OSError:
+                usage = {'bytes': 0, 'files': 0}
+            if volume.get('usage') != usage:
+                volume['usage'] = usage
+                changed.append(volume)
+        for path, usage in self.usage.scan(paths.keys(), force=force).items():
+            volume = paths[path]
+            usage = {'bytes': usage['bytes'], 'files': usage['files']}
+            if volume.get('usage') != usage:
+                volume['usage'] = usage
+                changed.append(volume)
+        if changed:
+            self.repository.update(self.update_dict(changed))
+        return volumes
+
+    @VolumeTracer.traced("multipass.purge")
+    def purge(self, **kwargs):
+        """
+        Remove the records of deleted volumes from the database. A deleted
+        multipass volume keeps its record with State "deleted" until it is
+        purged.
+
+        :return: number of removed records
+        """
+        return self.repository.delete_many({"State": "deleted"})
+
     def _get_vm_status(self, name=None) -> dict:
         """
         Get vm status.
@@ -258,21 +469,11 @@ class Provider(VolumeABC):
         :param name (string): vm name
         :return: dict
         """
-        dict_result = {}
-        result = Shell.run(f"multipass info {name} --format=json")
-        if f'instance "{name}" does not exist' in result:
-            dict_result = {
-                'name': name,
-                'status': "instance does not exist"
-            }
-        else:
-            result = json.loads(result)
-            dict_result = {
-                'name': name,
-                'status': result["info"][name]['State']
-            }
+        dict_result = self.info.status(name)
+        del dict_result['mounts']
         return dict_result
 
+    @VolumeTracer.traced("multipass.attach")
     def attach(self,
                names,
                vm):
@@ -280,33 +481,114 @@ class Provider(VolumeABC):
         This function attach one or more volumes to vm. It returns info of
         updated volume. The updated dict with "AttachedToVm" showing
         the name of vm where the volume attached to.
+        If vm is a list of vms, the volumes are attached to all of them.
+        The mounts are run concurrently. The vms are added to the record
+        atomically, so concurrent attaches of a volume to other vms are
+        kept.
 
         :param names (string): names of volumes
-        :param vm (string): name of vm
+        :param vm (string): name of vm or list of vm names
         :return: dict
         """
+        vms = [vm] if isinstance(vm, str) else list(vm)
         results = []
-        for name in names:
-            volume_info = self.cm.find_name(name)
-            if volume_info and volume_info[0]['State'] != "deleted":
-                vms = volume_info[0]['AttachedToVm']
-                path = volume_info[0]['path']
-                if vm in vms:
-                    Console.error(f"{name} already attached to {vm}")
+        with self.info.operation():
+            volumes = []
+            pairs = []
+            for name in names:
+                volume_info = self.repository.find_name(name,
+                                                        fields=self.fields)
+                if volume_info and volume_info[0]['State'] != "deleted":
+                    attached = volume_info[0]['AttachedToVm']
+                    path = volume_info[0]['path']
+                    for _vm in vms:
+                        if _vm in attached:
+                            Console.error(f"{name} already attached to {_vm}")
+                        else:
+                            pairs.append((f"{path}/{name}", _vm))
+                    volumes.append(volume_info)
                 else:
-                    result = self.mount(path=f"{path}/{name}", vm=vm)
-                    mounts = result['mounts']
-                    if f"{path}/{name}" in mounts.keys():
-                        vms.append(vm)
-
-                result = self.update_volume_after_attached_to_vm(
-                    info=volume_info, vms=vms)
-                results.append(result)
-            else:
-                Console.error(
-                    "volume is not existed or volume had been deleted")
+                    Console.error(
+                        "volume is not existed or volume had been deleted")
+            self.mount_many(pairs)
+            for volume_info in volumes:
+                name = volume_info[0]['name']
+                path = volume_info[0]['path']
+                mounted = [_vm for _vm in vms
+                           if f"{path}/{name}" in self.info.mounts(_vm).keys()]
+                if mounted:
+                    self.repository.add_to_set(
+                        name, {'AttachedToVm': mounted,
+                               'cm.attached_vms': mounted})
+                result = self.repository.modify(
+                    name,
+                    lambda volume: self.update_volume_after_attached_to_vm(
+                        info=[volume], vms=volume['AttachedToVm'])[0],
+                    fields=self.fields)
+                results.append([result])
         return results[0]
 
+    def mount_many(self, pairs):
+        """
+        Mounts many volumes to many vms concurrently. At most mount_workers
+        mounts of the default dict run at the same time. A failed mount is
+        reported with its exit code.
+
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts with path, vm, command, returncode and output
+        """
+        return self._run_many("mount", pairs)
+
+    def unmount_many(self, pairs):
+        """
+        Unmounts many volumes from many vms concurrently
+
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts with path, vm, command, returncode and output
+        """
+        return self._run_many("unmount", pairs)
+
+    def _run_many(self, action, pairs):
+        """
+        Runs mount or unmount for many pairs and invalidates the vm snapshot
+
+        :param action: "mount" or "unmount"
+        :param pairs: list of (path, vm) tuples
+        :return: list of dicts
+        """
+        if not pairs:
+            return []
+        with VolumeTracer.span(f"multipass.{action}", pairs=len(pairs)):
+            results = self.pool.run(action, pairs)
+        self.info.invalidate()
+        for result in results:
+            if result['returncode'] != 0:
+                Console.error(f"{action} of {result['path']} on "
+                              f"{result['vm']} failed with exit code "
+                              f"{result['returncode']}: "
+                              f"{result['output'].strip()}")
+        return results
+
+    def _mount(self, path=None, vm=None):
+        """
+        Runs multipass mount and invalidates the vm snapshot
+
+        :param path (string): path of volume
+        :param vm (string): name of vm
+        :return: exit code of multipass mount
+        """
+        return self.mount_many([(path, vm)])[0]['returncode']
+
+    def _unmount(self, path=None, vm=None):
+        """
+        Runs multipass unmount and invalidates the vm snapshot
+
+        :param path (string): path of volume
+        :param vm (string): name of vm
+        :return: exit code of multipass unmount
+        """
+        return self.unmount_many([(path, vm)])[0]['returncode']
+
     def mount(self, path=None, vm=None):
         """
         mount volume to vm
@@ -315,9 +597,8 @@ class Provider(VolumeABC):
         :param vm (string): name of vm
         :return: dict
         """
-        os.system(f"multipass mount {path} {vm}")
-        dict_result = self._get_mount_status(vm=vm)
-        return dict_result
+        self._mount(path=path, vm=vm)
+        return self._get_mount_status(vm=vm)
 
     def _get_mount_status(self, vm=None):
         """
@@ -326,21 +607,7 @@ class Provider(VolumeABC):
         :param vm (string): name of vm
         :return:
         """
-        result = Shell.run(f"multipass info {vm} --format=json")
-
-        if f'instance "{vm}" does not exist' in result:
-            dict_result = {
-                'name': vm,
-                'status': "instance does not exist"
-            }
-        else:
-            result = json.loads(result)
-            dict_result = {
-                'name': vm,
-                'status': result["info"][vm]['state'],
-                'mounts': result["info"][vm]['mounts']
-            }
-        return dict_result
+        return self.info.status(vm)
 
     def unmount(self, path=None, vm=None):
         """
@@ -350,41 +617,46 @@ class Provider(VolumeABC):
         :param vm (string): name of vm
         :return:
         """
-        os.system(f"multipass unmount {vm}:{path}")
-        dict_result = self._get_mount_status(vm=vm)
-        return dict_result
+        self._unmount(path=path, vm=vm)
+        return self._get_mount_status(vm=vm)
 
+    @VolumeTracer.traced("multipass.detach")
     def detach(self, name):
         """
         This function detach a volume from vm. It returns the info of
         the updated volume.
         The vm under "AttachedToVm" will be removed if
         volume is successfully detached.
-        Will detach volume from all vms.
+        Will detach volume from all vms. The unmounts run concurrently and
+        the mounts of the vms are checked with one snapshot afterwards. The
+        vms are removed from the record atomically.
 
         :param name: name of volume to be detached
         :return: dict
         """
-        volume_info = self.cm.find_name(name)
+        volume_info = self.repository.find_name(name, fields=self.fields)
         if volume_info and volume_info[0]['State'] != "deleted":
             vms = volume_info[0]['AttachedToVm']
             path = volume_info[0]['path']
             if len(vms) == 0:
                 Console.error(f"{name} is not attached to any vm")
             else:
-                removed = []
-                for vm in vms:
-                    result = self.unmount(path=f"{path}/{name}", vm=vm)
-                    mounts = result['mounts']
-                    if f"{path}/{name}" not in mounts.keys():
-                        removed.append(vm)
-                for vm in removed:
-                    vms.remove(vm)
-                result = self.update_volume_after_detach(volume_info, vms)
-                return result[0]
+                with self.info.operation():
+                    self.unmount_many([(f"{path}/{name}", vm) for vm in vms])
+                    removed = [vm for vm in vms
+                               if f"{path}/{name}" not in
+                               self.info.mounts(vm).keys()]
+                self.repository.pull(name, {'AttachedToVm': removed,
+                                            'cm.attached_vms': removed})
+                return self.repository.modify(
+                    name,
+                    lambda volume: self.update_volume_after_detach(
+                        [volume], volume['AttachedToVm'])[0],
+                    fields=self.fields)
         else:
             Console.error("volume does not exist or volume had been deleted")
 
+    @VolumeTracer.traced("multipass.add_tag")
     def add_tag(self, **kwargs):
         """
         This function add tag to a volume.
@@ -395,13 +667,18 @@ class Provider(VolumeABC):
         :param key: name of tag
         :param value: value of tag
         :return: dict
+
+        The tag is written with compare and swap, so a concurrent change of
+        the volume is not lost. As a tag replaces the value of its key it
+        can not be added with $addToSet.
         """
         key = kwargs['key']
         value = kwargs['value']
-        volume_info = self.cm.find_name(name=kwargs['NAME'])
-        volume_info = self.update_volume_tag(info=volume_info, key=key,
-                                             value=value)
-        return volume_info[0]
+        return self.repository.modify(
+            kwargs['NAME'],
+            lambda volume: self.update_volume_tag(info=[volume], key=key,
+                                                  value=value)[0],
+            fields=self.fields)
 
     def status(self, name=None):
         """
@@ -411,13 +688,14 @@ class Provider(VolumeABC):
         :param name: volume name
         :return: dict
         """
-        volume_info = self.cm.find_name(name)
+        volume_info = self.repository.find_name(name, fields=self.fields)
         if volume_info:
             status = volume_info[0]['State']
         else:
             Console.error("volume is not existed")
         return volume_info
 
+    @VolumeTracer.traced("multipass.migrate")
     def migrate(self, **kwargs):
         """
         Migrate volume from one vm to another vm. "region" is volume path.
@@ -431,36 +709,159 @@ class Provider(VolumeABC):
         """
         volume_name = kwargs['NAME']
         vm = kwargs['vm']
-        volume_info = self.cm.find_name(name=volume_name)
+        volume_info = self.repository.find_name(name=volume_name,
+                                                fields=self.fields)
         volume_attached_vm = volume_info[0]['AttachedToVm']
-        vm_info = Shell.run(f"multipass info {vm} --format=json")
-        vm_info = json.loads(vm_info)
-        vm_status = vm_info["info"][vm]['state']
-        if vm_status == 'running':
-            param = {'NAME': volume_name}
-            self.detach(**param)
-            self.attach(**param, vm=vm)
-        try:
-            for old_vm in volume_attached_vm:
-                volume_info[0]['AttachedToVm'].remove(old_vm)
-        except:
-            pass
-        volume_info[0]['AttachedToVm'].append(vm)
-        return volume_info
-
+        with self.info.operation():
+            vm_status = self.info.state(vm) or ""
+            if vm_status.lower() == 'running':
+                self.detach(name=volume_name)
+                self.attach(names=[volume_name], vm=vm)
+        old = [old_vm for old_vm in volume_attached_vm if old_vm != vm]
+        self.repository.pull(volume_name, {'AttachedToVm': old,
+                                           'cm.attached_vms': old})
+        volume_info = self.repository.add_to_set(
+            volume_name, {'AttachedToVm': [vm], 'cm.attached_vms': [vm]},
+            fields=self.fields)
+        return self.update_dict([volume_info])
+
+    @VolumeTracer.traced("multipass.sync")
     def sync(self, **kwargs):
         """
-        sync contents of one volume to another volume
+        sync contents of one volume to another volume. The changed files of
+        the second volume are copied into the first one. The metrics of the
+        sync are stored in the record of the first volume under "sync".
 
         :param names (list): list of volume names
         :return: list of dict
         """
         volume_1 = kwargs['NAMES'][0]
         volume_2 = kwargs['NAMES'][1]
-        path1 = f"{self.cm.find_name(name=volume_1)[0]['path']}/{volume_1}/"
-        path2 = f"{self.cm.find_name(name=volume_2)[0]['path']}/{volume_2}/"
-        os.system(f"rsync -avzh {path2} {path1}")
+        path1 = self.repository.find_one(volume_1, fields=["path"])['path']
+        path2 = self.repository.find_one(volume_2, fields=["path"])['path']
+        path1 = f"{path1}/{volume_1}"
+        path2 = f"{path2}/{volume_2}"
+        metrics = self.syncer.sync(path2, path1,
+                                   source_name=volume_2,
+                                   destination_name=volume_1)
         kwargs1 = {'NAME': volume_1, 'key': "sync_with", 'value': volume_2}
         volume_info1 = self.add_tag(**kwargs1)
+        volume_info1['sync'] = metrics
         result = [volume_info1]
         return result
+
+    @VolumeTracer.traced("multipass.verify")
+    def verify(self, **kwargs):
+        """
+        Builds the content-hash manifest of one or two volumes. The
+        manifest is kept in the manifest file of the volume that sync uses
+        as well, the volume record only gets its digest, the number of
+        files and the time under "verify". Files that did not change since
+        the last manifest or sync are not read again. If two volumes are
+        given, their manifests are compared and the result is stored in the
+        first record under "verify".
+
+        :param NAMES (list): list of one or two volume names
+        :return: list of dict
+        """
+        names = kwargs['NAMES']
+        if type(names) == str:
+            names = [names]
+        result = []
+        manifests = []
+        for name in names[:2]:
+            start = time.time()
+            volume_info = self.repository.find_name(name, fields=self.fields)
+            if not volume_info or volume_info[0]['State'] == 'deleted':
+                Console.error(f"volume {name} does not exist")
+                return None
+            volume = volume_info[0]
+            manifest, counts = self.manifest.build(
+                f"{volume['path']}/{name}", previous=self.syncer.load(name))
+            self.syncer.save(name, manifest)
+            volume['verify'] = {
+                'digest': manifest['digest'],
+                'files': len(manifest['files']),
+                'time': manifest['created'],
+                'hashed': counts['hashed'],
+                'reused': counts['reused'],
+                'seconds': round(time.time() - start, 3)
+            }
+            manifests.append(manifest)
+            result.append(volume)
+        if len(manifests) == 2:
+            compared = VolumeManifest.compare(manifests[0], manifests[1])
+            compared['with'] = names[1]
+            result[0]['verify']['compare'] = compared
+        return self.update_dict(result)
+
+    @VolumeTracer.traced("multipass.snapshot")
+    def snapshot(self, **kwargs):
+        """
+        Takes a snapshot of a volume in the chunk store of the cloud. Only
+        files that changed since the last snapshot are read, and only
+        chunks that are not yet in the store are written. The snapshot is
+        added to the list "snapshots" of the volume record.
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name, defaults to the time.
+                                  An existing snapshot is not replaced.
+        :return: list of dict
+        """
+        name = kwargs['NAME']
+        volume_info = self.repository.find_name(
+            name, fields=self.fields + ["snapshots"])
+        if not volume_info or volume_info[0]['State'] == 'deleted':
+            Console.error(f"volume {name} does not exist")
+            return None
+        volume = volume_info[0]
+        try:
+            counts = self.chunks.snapshot(name, f"{volume['path']}/{name}",
+                                          name=kwargs.get('snapshot'))
+        except ValueError as e:
+            Console.error(str(e))
+            return None
+        volume['snapshots'] = (volume.get('snapshots') or []) + [counts]
+        volume['time'] = datetime.datetime.now()
+        return self.update_dict([volume])
+
+    @VolumeTracer.traced("multipass.restore")
+    def restore(self, **kwargs):
+        """
+        Restores a snapshot of a volume. Without path the volume itself is
+        restored, files that still match the snapshot are kept. With path
+        the snapshot is restored into that directory and the unchanged
+        files of the volume are cloned, or hardlinked if restore_link of
+        the default dict is "hardlink".
+
+        :param NAME (string): the volume name
+        :param snapshot (string): the snapshot name, defaults to the last
+                                  one taken
+        :param path (string): the directory to restore into
+        :return: list of dict
+        """
+        name = kwargs['NAME']
+        volume_info = self.repository.find_name(name, fields=self.fields)
+        if not volume_info or volume_info[0]['State'] == 'deleted':
+            Console.error(f"volume {name} does not exist")
+            return None
+        volume = volume_info[0]
+        snapshot = kwargs.get('snapshot')
+        if snapshot is None:
+            snapshots = self.chunks.snapshots(name)
+            if not snapshots:
+                Console.error(f"volume {name} has no snapshot")
+                return None
+            snapshot = snapshots[-1]
+        source = f"{volume['path']}/{name}"
+        try:
+            counts = self.chunks.restore(
+                name, snapshot, kwargs.get('path') or source, source=source,
+                link=self.default.get("restore_link") or "reflink")
+        except ValueError as e:
+            Console.error(str(e))
+            return None
+        counts['snapshot'] = snapshot
+        volume['restore'] = counts
+        volume['time'] = datetime.datetime.now()
+        return self.update_dict([volume])
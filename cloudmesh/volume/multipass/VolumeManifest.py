@@ -0,0 +1,244 @@
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudmesh.volume.multipass.VolumeWalker import VolumeWalker
+
+
+class VolumeManifest(object):
+    """
+    Builds and compares content-hash manifests of local volume directories.
+
+    A manifest describes every file of a volume by its size, its mtime and
+    the hashes of its chunks of chunk_size bytes:
+
+        {
+            "chunk_size": 4194304,
+            "files": [
+                {
+                    "path": relative path,
+                    "size": bytes,
+                    "mtime": mtime in ns,
+                    "chunks": [hash of each chunk],
+                    "digest": hash of the chunk hashes
+                }
+            ],
+            "digest": hash of all paths and file digests,
+            "created": seconds since epoch
+        }
+
+    The files are listed with VolumeWalker. Symbolic links are included
+    and hashed by their target. Files are read with mmap and hashed in
+    parallel. When a previous manifest is given, files whose size and mtime
+    did not change are not read again, so the manifest of an unchanged
+    volume only costs a stat per file. Two manifests are compared chunk by
+    chunk, so a difference is reported with the chunks that differ.
+
+    VolumeSync keeps manifests of the same format, but only hashes the
+    files it has to compare. The chunks and digest of the other files are
+    None, and so is the digest of the manifest.
+
+    The files are a list sorted by path, as paths may contain dots, which
+    can not be used in the keys of a MongoDB document.
+    """
+
+    chunk_size = 4 << 20
+    workers = 8
+
+    def __init__(self, workers=None, chunk_size=None):
+        """
+        Initialize the manifest builder
+
+        :param workers: number of files hashed at the same time
+        :param chunk_size: the size of a chunk in bytes
+        """
+        self.workers = int(workers or VolumeManifest.workers)
+        self.chunk_size = int(chunk_size or VolumeManifest.chunk_size)
+
+    @staticmethod
+    def _hash():
+        return hashlib.blake2b(digest_size=16)
+
+    def hash_file(self, filename, size):
+        """
+        Hashes the chunks of a file
+
+        :param filename: the file
+        :param size: the size of the file
+        :return: list of the hex digests of the chunks
+        """
+        chunks = []
+        if os.path.islink(filename):
+            h = self._hash()
+            h.update(os.readlink(filename).encode())
+            return [h.hexdigest()]
+        if size == 0:
+            return chunks
+        with open(filename, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                try:
+                    for offset in range(0, len(m), self.chunk_size):
+                        h = self._hash()
+                        h.update(view[offset:offset + self.chunk_size])
+                        chunks.append(h.hexdigest())
+                finally:
+                    view.release()
+        return chunks
+
+    @staticmethod
+    def index(manifest):
+        """
+        The files of a manifest by path
+
+        :param manifest: the manifest
+        :return: dict of relative paths to the file entries
+        """
+        return {entry["path"]: entry
+                for entry in (manifest or {}).get("files", [])}
+
+    def previous(self, manifest):
+        """
+        The files of a previous manifest that can be reused, which are
+        none if it was built with another chunk size
+
+        :param manifest: the manifest
+        :return: dict of relative paths to the file entries
+        """
+        if (manifest or {}).get("chunk_size") != self.chunk_size:
+            return {}
+        return self.index(manifest)
+
+    @staticmethod
+    def entry(relative, st, old=None):
+        """
+        The entry of a file. The entry of the previous manifest is reused
+        if the size and mtime of the file did not change. Otherwise the
+        file is not yet hashed, see hash_entry.
+
+        :param relative: the relative path of the file
+        :param st: the os.stat_result of the file
+        :param old: the entry of the file in the previous manifest
+        :return: dict
+        """
+        if old and old["size"] == st.st_size \
+                and old["mtime"] == st.st_mtime_ns:
+            return old
+        return {
+            "path": relative,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "chunks": None,
+            "digest": None
+        }
+
+    def hash_entry(self, path, entry):
+        """
+        Hashes the file of an entry and stores its chunks and digest in
+        the entry
+
+        :param path: the volume directory
+        :param entry: the entry of the file
+        :return: the digest of the file
+        """
+        chunks = self.hash_file(os.path.join(path, entry["path"]),
+                                entry["size"])
+        h = self._hash()
+        for chunk in chunks:
+            h.update(chunk.encode())
+        entry["chunks"] = chunks
+        entry["digest"] = h.hexdigest()
+        return entry["digest"]
+
+    def scan(self, path, previous=None):
+        """
+        The entries of the files of a volume directory. The files are not
+        read, the entries of unchanged files are taken from the previous
+        manifest.
+
+        :param path: the volume directory
+        :param previous: the last manifest of the volume
+        :return: dict of relative paths to the entries, dict of relative
+                 paths to os.stat_result and the list of directories
+        """
+        old = self.previous(previous)
+        stats, directories = VolumeWalker.walk(path, symlinks=True)
+        files = {relative: self.entry(relative, st, old.get(relative))
+                 for relative, st in stats.items()}
+        return files, stats, directories
+
+    def create(self, files):
+        """
+        The manifest of file entries. Its digest is None if not all files
+        are hashed.
+
+        :param files: dict of relative paths to the entries
+        :return: the manifest
+        """
+        digest = None
+        if all(entry["digest"] is not None for entry in files.values()):
+            h = self._hash()
+            for relative in sorted(files):
+                h.update(relative.encode())
+                h.update(files[relative]["digest"].encode())
+            digest = h.hexdigest()
+        return {
+            "chunk_size": self.chunk_size,
+            "files": [files[relative] for relative in sorted(files)],
+            "digest": digest,
+            "created": time.time()
+        }
+
+    def build(self, path, previous=None):
+        """
+        Builds the manifest of a volume directory
+
+        :param path: the volume directory
+        :param previous: the last manifest of the volume
+        :return: the manifest and the counts of hashed and reused files
+        """
+        files, _, _ = self.scan(path, previous=previous)
+        todo = [entry for entry in files.values() if entry["digest"] is None]
+        if todo:
+            workers = max(1, min(self.workers, len(todo)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda entry: self.hash_entry(path, entry),
+                                  todo))
+        counts = {"hashed": len(todo), "reused": len(files) - len(todo)}
+        return self.create(files), counts
+
+    @staticmethod
+    def compare(a, b):
+        """
+        Compares two manifests
+
+        :param a: the first manifest
+        :param b: the second manifest
+        :return: dict with equal, missing (files only in a), extra (files
+                 only in b) and different (files with the indexes of the
+                 chunks that differ)
+        """
+        files_a = VolumeManifest.index(a)
+        files_b = VolumeManifest.index(b)
+        result = {
+            "equal": a.get("digest") == b.get("digest"),
+            "missing": sorted(set(files_a) - set(files_b)),
+            "extra": sorted(set(files_b) - set(files_a)),
+            "different": []
+        }
+        if result["equal"]:
+            return result
+        for relative in sorted(set(files_a) & set(files_b)):
+            entry_a = files_a[relative]
+            entry_b = files_b[relative]
+            if entry_a["digest"] == entry_b["digest"]:
+                continue
+            chunks_a = entry_a["chunks"]
+            chunks_b = entry_b["chunks"]
+            chunks = [i for i in range(max(len(chunks_a), len(chunks_b)))
+                      if i >= len(chunks_a) or i >= len(chunks_b) or
+                      chunks_a[i] != chunks_b[i]]
+            result["different"].append({"file": relative, "chunks": chunks})
+        return result
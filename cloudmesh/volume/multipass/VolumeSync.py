@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.volume.multipass.VolumeManifest import VolumeManifest
+
+
+class VolumeSync(object):
+    """
+    Copies the changed files of one local volume directory into another.
+
+    The files of a volume are described by a manifest of VolumeManifest
+    that is kept between syncs in
+
+        ~/.cloudmesh/volume/manifest/<cloud>/<volume>.json
+
+    A file is copied if it is missing in the destination or if its size
+    differs. If only the mtime differs, the digests are compared. A digest
+    is only computed for such files and is reused from the manifest as
+    long as size and mtime do not change. Copied files get the mode and
+    mtime of the source, so an unchanged volume is recognized by a stat of
+    each file on the next sync.
+
+    Files are copied in the kernel with os.copy_file_range or os.sendfile
+    by a pool of threads. Files that are only in the destination are kept,
+    like rsync without --delete does.
+
+    sync returns the metrics of the run as dict
+
+        {
+            "files": number of files in the source,
+            "changed": number of files copied,
+            "bytes": number of bytes copied,
+            "hashed": number of files whose content was hashed,
+            "seconds": duration of the sync
+        }
+    """
+
+    directory = "~/.cloudmesh/volume/manifest"
+    workers = 8
+    chunk = 1 << 20
+
+    def __init__(self, cloud=None, workers=None):
+        """
+        Initialize the sync engine
+
+        :param cloud: name of the cloud
+        :param workers: number of files copied at the same time
+        """
+        self.cloud = cloud
+        self.workers = int(workers or VolumeSync.workers)
+        self.directory = path_expand(f"{VolumeSync.directory}/{cloud}")
+        self.builder = VolumeManifest(workers=self.workers)
+
+    def _manifest_file(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, name):
+        """
+        Loads the manifest of a volume
+
+        :param name: volume name
+        :return: dict
+        """
+        try:
+            with open(self._manifest_file(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, name, manifest):
+        """
+        Writes the manifest of a volume. The file is replaced atomically.
+
+        :param name: volume name
+        :param manifest: dict
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self._manifest_file(name)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, filename)
+
+    def manifest(self, path, previous=None):
+        """
+        The entries of the files of a volume directory. The digests of
+        files whose size and mtime did not change are taken from the
+        previous manifest.
+
+        :param path: the volume directory
+        :param previous: the previous manifest of the volume
+        :return: dict of relative paths to the entries, the stat results
+                 of the files and the directories
+        """
+        return self.builder.scan(path, previous=previous)
+
+    def _digest(self, files, path, relative):
+        """
+        The digest of a file, computed if it is not known
+
+        :return: hex digest
+        """
+        entry = files[relative]
+        if entry["digest"] is None:
+            self.builder.hash_entry(path, entry)
+        return entry["digest"]
+
+    @staticmethod
+    def copy(source, destination, st):
+        """
+        Copies a file in the kernel. The file is written next to the
+        destination and renamed, so readers never see a partial file.
+
+        :param source: the source file
+        :param destination: the destination file
+        :param st: the stat result of the source
+        :return: number of bytes copied
+        """
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp = f"{destination}.{os.getpid()}.sync"
+        if os.path.islink(source):
+            os.symlink(os.readlink(source), tmp)
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns),
+                     follow_symlinks=False)
+            os.replace(tmp, destination)
+            return 0
+        size = st.st_size
+        with open(source, "rb") as fsrc, open(tmp, "wb") as fdst:
+            copied = 0
+            while copied < size:
+                n = VolumeSync._copy_range(fsrc.fileno(), fdst.fileno(),
+                                           copied, size - copied)
+                if n == 0:
+                    break
+                copied += n
+        os.chmod(tmp, st.st_mode & 0o7777)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, destination)
+        return copied
+
+    @staticmethod
+    def _copy_range(fsrc, fdst, offset, count):
+        """
+        Copies count bytes at offset with the fastest available system call
+
+        :return: number of bytes copied
+        """
+        count = min(count, 1 << 30)
+        if hasattr(os, "copy_file_range"):
+            try:
+                return os.copy_file_range(fsrc, fdst, count,
+                                          offset, offset)
+            except OSError:
+                pass
+        if hasattr(os, "sendfile"):
+            try:
+                os.lseek(fdst, offset, os.SEEK_SET)
+                return os.sendfile(fdst, fsrc, offset, count)
+            except OSError:
+                pass
+        data = os.pread(fsrc, min(count, VolumeSync.chunk), offset)
+        return os.pwrite(fdst, data, offset)
+
+    def sync(self, source, destination, source_name=None,
+             destination_name=None):
+        """
+        Copies the changed files of the source volume into the destination
+        volume and updates the manifests of both
+
+        :param source: the source volume directory
+        :param destination: the destination volume directory
+        :param source_name: name of the source volume
+        :param destination_name: name of the destination volume
+        :return: dict with the metrics of the sync
+        """
+        start = time.time()
+        source_name = source_name or os.path.basename(source)
+        destination_name = destination_name or os.path.basename(destination)
+        src, stats, directories = self.manifest(source,
+                                                self.load(source_name))
+        dst, _, _ = self.manifest(destination, self.load(destination_name))
+        for relative in directories:
+            os.makedirs(os.path.join(destination, relative), exist_ok=True)
+
+        hashed = 0
+        changed = []
+        touched = []
+        for relative, entry in src.items():
+            other = dst.get(relative)
+            if other is None or other["size"] != entry["size"]:
+                changed.append(relative)
+            elif other["mtime"] != entry["mtime"]:
+                hashed += (entry["digest"] is None) + \
+                    (other["digest"] is None)
+                if self._digest(src, source, relative) != \
+                        self._digest(dst, destination, relative):
+                    changed.append(relative)
+                else:
+                    st = stats[relative]
+                    os.utime(os.path.join(destination, relative),
+                             ns=(st.st_atime_ns, st.st_mtime_ns),
+                             follow_symlinks=False)
+                    touched.append(relative)
+
+        def _copy(relative):
+            return self.copy(os.path.join(source, relative),
+                             os.path.join(destination, relative),
+                             stats[relative])
+
+        copied = 0
+        if changed:
+            workers = max(1, min(self.workers, len(changed)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                copied = sum(executor.map(_copy, changed))
+
+        for relative in changed + touched:
+            dst[relative] = dict(src[relative])
+        self.save(source_name, self.builder.create(src))
+        self.save(destination_name, self.builder.create(dst))
+        return {
+            "files": len(src),
+            "changed": len(changed),
+            "bytes": copied,
+            "hashed": hashed,
+            "seconds": round(time.time() - start, 3)
+        }
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.volume.multipass.VolumeWalker import VolumeWalker
+
+
+class VolumeUsage(object):
+    """
+    Computes the bytes and the number of files stored in local volume
+    directories.
+
+    The directories are read with VolumeWalker. The names of the files
+    and subdirectories of every directory are kept in a cache together
+    with the mtime of the directory. The mtime of a directory changes when
+    a file or directory is added, removed or renamed in it. On the next
+    scan a directory with an unchanged mtime is not listed again, only its
+    cached files are stat'ed and its subdirectories are checked. Writing
+    to an existing file in place does not change the mtime of its
+    directory, but it changes the size the stat returns, so such a change
+    is seen without a scan with force=True.
+
+    The volumes are scanned in parallel. The cache is stored per cloud in
+
+        ~/.cloudmesh/volume/usage/<cloud>.json
+    """
+
+    directory = "~/.cloudmesh/volume/usage"
+    workers = 8
+
+    def __init__(self, cloud=None, workers=None):
+        """
+        Initialize the scanner
+
+        :param cloud: name of the cloud
+        :param workers: number of volumes scanned at the same time
+        """
+        self.cloud = cloud
+        self.workers = int(workers or VolumeUsage.workers)
+        self.filename = path_expand(f"{VolumeUsage.directory}/{cloud}.json")
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Loads the cache of the cloud
+
+        :return: dict of volume paths to the cache of their directories
+        """
+        with self._lock:
+            if self._cache is None:
+                try:
+                    with open(self.filename) as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError):
+                    self._cache = {}
+            return self._cache
+
+    def save(self):
+        """
+        Writes the cache of the cloud. The file is replaced atomically.
+        The temporary file is unique for the thread, as the cache can be
+        saved by several threads of a process at the same time. A copy of
+        the cache is written, so scans in other threads can change it
+        meanwhile.
+        """
+        cache = self.load()
+        with self._lock:
+            cache = dict(cache)
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, self.filename)
+
+    @staticmethod
+    def walk(path, cache=None, force=False):
+        """
+        Computes the usage of a directory tree
+
+        :param path: the root of the tree
+        :param cache: the cache of the tree from the last scan, a dict of
+                      directories to [mtime, files, subdirectories], the
+                      names of the files and the paths of the
+                      subdirectories
+        :param force: list all directories even if they did not change
+        :return: the usage as dict with bytes, files, scanned and reused,
+                 and the new cache of the tree
+        """
+        cache = cache or {}
+        new = {}
+        usage = {"bytes": 0, "files": 0, "scanned": 0, "reused": 0}
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = cache.get(directory)
+            if not force and cached and len(cached) == 3 and \
+                    cached[0] == mtime:
+                _, names, subdirectories = cached
+                sizes = []
+                for name in names:
+                    try:
+                        sizes.append(os.lstat(
+                            os.path.join(directory, name)).st_size)
+                    except OSError:
+                        pass
+                usage["reused"] += 1
+            else:
+                try:
+                    subdirectories, found = VolumeWalker.entries(directory)
+                except OSError:
+                    continue
+                names = [os.path.basename(f) for f in found]
+                sizes = [st.st_size for st in found.values()]
+                usage["scanned"] += 1
+            new[directory] = [mtime, names, subdirectories]
+            usage["bytes"] += sum(sizes)
+            usage["files"] += len(sizes)
+            stack.extend(subdirectories)
+        return usage, new
+
+    def scan(self, paths, force=False):
+        """
+        Computes the usage of many volumes in parallel and updates the
+        cache
+
+        :param paths: list of volume directories
+        :param force: list all directories even if they did not change
+        :return: dict of the paths to their usage
+        """
+        cache = self.load()
+        paths = list(paths)
+
+        def _walk(path):
+            return path, self.walk(path, cache=cache.get(path), force=force)
+
+        result = {}
+        if paths:
+            workers = max(1, min(self.workers, len(paths)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for path, (usage, tree) in executor.map(_walk, paths):
+                    result[path] = usage
+                    with self._lock:
+                        cache[path] = tree
+            self.save()
+        return result
@@ -0,0 +1,67 @@
+import os
+
+
+class VolumeWalker(object):
+    """
+    Walks the directory tree of a local volume with os.scandir. The stat
+    results of the entries of a directory come with the directory listing,
+    so a file only costs a stat call if the platform does not return them.
+
+    The walker is shared by the scans of the volumes: the used space in
+    VolumeUsage, the manifests of VolumeManifest and VolumeSync, and the
+    snapshots of ChunkStore. Symbolic links are not followed.
+    """
+
+    @staticmethod
+    def entries(directory, symlinks=False):
+        """
+        Reads one directory
+
+        :param directory: the directory
+        :param symlinks: if True symbolic links are listed as files
+        :return: list of the paths of the subdirectories and dict of the
+                 paths of the files to their os.stat_result
+        """
+        subdirectories = []
+        files = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) or \
+                        (symlinks and entry.is_symlink()):
+                    files[entry.path] = entry.stat(follow_symlinks=False)
+        return subdirectories, files
+
+    @staticmethod
+    def walk(path, symlinks=False, strict=False):
+        """
+        The files and directories of a tree
+
+        :param path: the root of the tree
+        :param symlinks: if True symbolic links are listed as files
+        :param strict: if True a directory that can not be read raises
+                       OSError, otherwise it is skipped
+        :return: dict of the relative paths of the files to their
+                 os.stat_result and the sorted list of the relative paths
+                 of the directories
+        """
+        root = os.path.join(path, "")
+        files = {}
+        directories = []
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                subdirectories, found = VolumeWalker.entries(
+                    directory, symlinks=symlinks)
+            except OSError:
+                if strict:
+                    raise
+                continue
+            for subdirectory in subdirectories:
+                directories.append(subdirectory[len(root):])
+            stack.extend(subdirectories)
+            for filename, st in found.items():
+                files[filename[len(root):]] = st
+        return files, sorted(directories)
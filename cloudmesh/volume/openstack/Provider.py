@@ -2,9 +2,13 @@ import openstack
 from cloudmesh.common.console import Console
 from cloudmesh.common.dotdict import dotdict
 from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.ApiProfiler import ApiProfiler
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 
 from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeRepository import VolumeRepository
 
 
 class Provider(VolumeABC):
@@ -60,32 +64,7 @@ class Provider(VolumeABC):
         'VERIFY_RESIZE'
     ]
 
-    output = {
-
-        "volume": {
-            "sort_keys": ["cm.name"],
-            "order": ["cm.name",
-                      "cm.cloud",
-                      "cm.kind",
-                      "availability_zone",
-                      "created_at",
-                      "size",
-                      "status",
-                      "id",
-                      "volume_type"
-                      ],
-            "header": ["Name",
-                       "Cloud",
-                       "Kind",
-                       "Availability Zone",
-                       "Created At",
-                       "Size",
-                       "Status",
-                       "Id",
-                       "Volume Type"
-                       ],
-        }
-    }
+    output = VolumeRecord.output
 
     def __init__(self, name):
         """
@@ -98,6 +77,33 @@ class Provider(VolumeABC):
         self.config = Config()["cloudmesh.volume.openstack.credentials"]
         self.defaults = Config()["cloudmesh.volume.openstack.default"]
         self.cm = CmDatabase()
+        self.repository = VolumeRepository(cloud=self.cloud, kind="openstack")
+        self.servers = {}
+
+    def _connect(self):
+        """
+        Connects to the cloud
+
+        :return: openstack connection
+        """
+        return ApiProfiler.wrap(openstack.connect(**self.config), "openstack")
+
+    def _server_names(self, results):
+        """
+        The names of the servers the volumes are attached to. The
+        attachments of a volume only hold the ids of the servers, so the
+        servers are listed when an id is not yet known.
+
+        :param results: the volume dicts
+        :return: dict of server ids to names
+        """
+        ids = {attachment.get("server_id") for entry in results
+               for attachment in entry.get("attachments") or []}
+        if not ids <= set(self.servers):
+            con = self._connect()
+            self.servers.update({server["id"]: server["name"]
+                                 for server in con.list_servers()})
+        return self.servers
 
     def update_dict(self, results):
         """
@@ -113,6 +119,7 @@ class Provider(VolumeABC):
             return None
 
         d = []
+        names = self._server_names(results)
 
         for entry in results:
             volume_name = entry['name']
@@ -124,6 +131,10 @@ class Provider(VolumeABC):
                 "kind": "volume",
                 "name": volume_name,
             })
+            record = VolumeRecord.from_entry("openstack", entry, self.cloud)
+            record.attached_vms = [names.get(server_id, server_id)
+                                   for server_id in record.attached_vms]
+            entry["cm"].update(record.cm())
             d.append(entry)
         return d
 
@@ -134,32 +145,38 @@ class Provider(VolumeABC):
         :param volume_name: Volume name
         :return: Volume_status
         """
-        con = openstack.connect(**self.config)
+        con = self._connect()
         result = con.get_volume(name_or_id=volume_name)
         result = [result]
         result = self.update_dict(result)
         return result
 
+    @VolumeTracer.traced("openstack.list")
     def list(self, **kwargs):
         """
         This function list all volumes as following:
         If NAME (volume_name) is specified, it will print out info of NAME
         If NAME (volume_name) is not specified, it will print out info of all
           volumes
+        If vm is specified, it will print out the volumes attached to vm
 
-        :param kwargs: contains name of volume
+        :param kwargs: contains name of volume, vm name, refresh
         :return: Dictionary of volumes
         """
         try:
             if kwargs and kwargs['refresh'] is False:
-                result = self.cm.find(cloud=self.cloud, kind='volume')
+                result = self.repository.find()
                 for key in kwargs:
                     if key == 'NAME' and kwargs['NAME']:
-                        result = self.cm.find_name(name=kwargs['NAME'])
+                        result = self.repository.find_name(name=kwargs['NAME'])
                     elif key == 'NAMES' and kwargs['NAMES']:
-                        result = self.cm.find_names(names=kwargs['NAMES'])
+                        result = self.repository.find_names(
+                            names=kwargs['NAMES'])
+                    elif key == 'vm' and kwargs['vm']:
+                        result = self.repository.find(
+                            {'cm.attached_vms': kwargs['vm']})
             else:
-                con = openstack.connect(**self.config)
+                con = self._connect()
                 results = con.list_volumes()
                 if kwargs and kwargs['NAME']:
                     result = con.get_volume(name_or_id=kwargs["NAME"])
@@ -167,6 +184,9 @@ class Provider(VolumeABC):
                     result = self.update_dict(result)
                 else:
                     result = self.update_dict(results)
+                if kwargs and kwargs.get('vm'):
+                    result = [entry for entry in result
+                              if kwargs['vm'] in entry['cm']['attached_vms']]
 
         except Exception as e:
             Console.error("Problem listing volumes", traceflag=True)
@@ -174,6 +194,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("openstack.create")
     def create(self, **kwargs):
         """
         This function creates a new volume with default volume type __DEFAULT__.
@@ -183,7 +204,7 @@ class Provider(VolumeABC):
         :return: Volume dictionary
         """
         try:
-            con = openstack.connect(**self.config)
+            con = self._connect()
             arguments = dotdict(kwargs)
             if arguments.volume_type is None:
                 arguments.volume_type = self.defaults["volume_type"]
@@ -201,6 +222,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("openstack.attach")
     def attach(self, names=None, vm=None):
         """
         This function attaches a given volume to a given instance
@@ -210,7 +232,7 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            con = openstack.connect(**self.config)
+            con = self._connect()
             server = con.get_server(vm)
             volume = con.get_volume(name_or_id=names[0])
             con.attach_volume(server, volume, device=None, wait=True,
@@ -221,6 +243,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return self.list(NAME=names[0], refresh=True)
 
+    @VolumeTracer.traced("openstack.detach")
     def detach(self, name=None):
         """
         This function detaches a given volume from an instance
@@ -229,7 +252,7 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            con = openstack.connect(**self.config)
+            con = self._connect()
             volume = con.get_volume(name_or_id=name)
             attachments = volume['attachments']
             server = con.get_server(attachments[0]['server_id'])
@@ -253,6 +276,7 @@ class Provider(VolumeABC):
         )
         return result
 
+    @VolumeTracer.traced("openstack.delete")
     def delete(self, name=None):
         """
         This function delete one volume.
@@ -261,7 +285,7 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            con = openstack.connect(**self.config)
+            con = self._connect()
             con.delete_volume(name_or_id=name)
             results = con.list_volumes()
             result = self.update_dict(results)
@@ -271,6 +295,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("openstack.add_tag")
     def add_tag(self, **kwargs):
         """
         This function add tag to a volume.
@@ -281,7 +306,7 @@ class Provider(VolumeABC):
         :return: Dictionary of volume
         """
         try:
-            con = openstack.connect(**self.config)
+            con = self._connect()
             name = kwargs['NAME']
             key = kwargs['key']
             value = kwargs['value']
@@ -306,6 +331,7 @@ class Provider(VolumeABC):
         )
         return result
 
+    @VolumeTracer.traced("openstack.migrate")
     def migrate(self,
                 name=None,
                 fvm=None,
@@ -338,6 +364,7 @@ class Provider(VolumeABC):
         """
         raise NotImplementedError
 
+    @VolumeTracer.traced("openstack.sync")
     def sync(self,
              volume_id=None,
              zone=None,
@@ -2,9 +2,13 @@ import oci
 from cloudmesh.common.console import Console
 from cloudmesh.common.dotdict import dotdict
 from cloudmesh.configuration.Config import Config
+from cloudmesh.volume.ApiProfiler import ApiProfiler
 from cloudmesh.volume.VolumeABC import VolumeABC
+from cloudmesh.volume.VolumeRecord import VolumeRecord
+from cloudmesh.volume.VolumeTracer import VolumeTracer
 
 from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeRepository import VolumeRepository
 
 
 class Provider(VolumeABC):
@@ -35,30 +39,7 @@ class Provider(VolumeABC):
           default:
     """
 
-    output = {
-
-        "volume": {
-            "sort_keys": ["cm.name"],
-            "order": ["cm.name",
-                      "cm.cloud",
-                      "cm.kind",
-                      "availability_domain",
-                      "time_created",
-                      "size_in_gbs",
-                      "lifecycle_state",
-                      "id"
-                      ],
-            "header": ["Name",
-                       "Cloud",
-                       "Kind",
-                       "Availability Zone",
-                       "Created At",
-                       "Size(Gb)",
-                       "Status",
-                       "Id"
-                       ],
-        }
-    }
+    output = VolumeRecord.output
 
     def update_dict(self, results):
         """
@@ -85,13 +66,15 @@ class Provider(VolumeABC):
             size_in_gbs = entry.__getattribute__("size_in_gbs")
             lifecycle_state = entry.__getattribute__("lifecycle_state")
             attribute_id = entry.__getattribute__("id")
+            freeform_tags = entry.__getattribute__("freeform_tags")
 
             entry = {
                 "availability_domain": availability_domain,
                 "time_created": time_created,
                 "size_in_gbs": size_in_gbs,
                 "id": attribute_id,
-                "lifecycle_state": lifecycle_state
+                "lifecycle_state": lifecycle_state,
+                "freeform_tags": freeform_tags
             }
 
             if "cm" not in entry:
@@ -102,6 +85,8 @@ class Provider(VolumeABC):
                 "kind": "volume",
                 "name": display_name,
             })
+            entry["cm"].update(
+                VolumeRecord.from_entry("oracle", entry, self.cloud).cm())
             d.append(entry)
 
         return d
@@ -117,6 +102,38 @@ class Provider(VolumeABC):
         self.config = Config()["cloudmesh.volume.oracle.credentials"]
         self.defaults = Config()["cloudmesh.volume.oracle.default"]
         self.cm = CmDatabase()
+        self.repository = VolumeRepository(cloud=self.cloud, kind="oracle")
+
+    def _block_storage(self):
+        """
+        Creates the block storage client
+
+        :return: oci.core.BlockstorageClient
+        """
+        return ApiProfiler.wrap(oci.core.BlockstorageClient(self.config),
+                                "oracle")
+
+    def _compute_client(self):
+        """
+        Creates the compute client
+
+        :return: oci.core.ComputeClient
+        """
+        return ApiProfiler.wrap(oci.core.ComputeClient(self.config), "oracle")
+
+    def _wait_until(self, client, response, attribute, state):
+        """
+        Waits with oci.wait_until until the attribute of the resource of
+        the response has the state
+
+        :param client: the client of the resource
+        :param response: the response with the resource
+        :param attribute: the attribute, e.g. "lifecycle_state"
+        :param state: the state, e.g. "AVAILABLE"
+        :return: the response of the last poll
+        """
+        with VolumeTracer.span("oracle.wait_until", state=state):
+            return oci.wait_until(client, response, attribute, state)
 
     def get_volume_id_from_name(self, block_storage, name):
         """
@@ -163,7 +180,7 @@ class Provider(VolumeABC):
         :return: Volume_status
         """
         try:
-            block_storage = oci.core.BlockstorageClient(self.config)
+            block_storage = self._block_storage()
             v = block_storage.list_volumes(self.config['compartment_id'])
             volumes = v.data
             result = []
@@ -180,6 +197,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("oracle.list")
     def list(self, **kwargs):
         """
         This function list all volumes as following:
@@ -192,14 +210,15 @@ class Provider(VolumeABC):
         """
         try:
             if kwargs and kwargs['refresh'] is False:
-                result = self.cm.find(cloud=self.cloud, kind='volume')
+                result = self.repository.find()
                 for key in kwargs:
                     if key == 'NAME' and kwargs['NAME']:
-                        result = self.cm.find_name(name=kwargs['NAME'])
+                        result = self.repository.find_name(name=kwargs['NAME'])
                     elif key == 'NAMES' and kwargs['NAMES']:
-                        result = self.cm.find_names(names=kwargs['NAMES'])
+                        result = self.repository.find_names(
+                            names=kwargs['NAMES'])
             else:
-                block_storage = oci.core.BlockstorageClient(self.config)
+                block_storage = self._block_storage()
                 if kwargs and kwargs['NAME']:
                     v = block_storage.list_volumes(
                         self.config['compartment_id'])
@@ -222,6 +241,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("oracle.create")
     def create(self, **kwargs):
         """
         This function creates a new volume with default size of 50gb.
@@ -232,7 +252,7 @@ class Provider(VolumeABC):
         """
         try:
             arguments = dotdict(kwargs)
-            block_storage = oci.core.BlockstorageClient(self.config)
+            block_storage = self._block_storage()
             result = block_storage.create_volume(
                 oci.core.models.CreateVolumeDetails(
                     compartment_id=self.config['compartment_id'],
@@ -240,7 +260,7 @@ class Provider(VolumeABC):
                     display_name=arguments.NAME
                 ))
             # wait for availability of volume
-            oci.wait_until(
+            self._wait_until(
                 block_storage,
                 block_storage.get_volume(result.data.id),
                 'lifecycle_state',
@@ -256,6 +276,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("oracle.attach")
     def attach(self, names=None, vm=None):
         """
         This function attaches a given volume to a given instance
@@ -265,7 +286,7 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            compute_client = oci.core.ComputeClient(self.config)
+            compute_client = self._compute_client()
             # get instance id from VM name
             i = compute_client.list_instances(self.config['compartment_id'])
             instances = i.data
@@ -277,7 +298,7 @@ class Provider(VolumeABC):
                     break
 
             # get volumeId from Volume name
-            block_storage = oci.core.BlockstorageClient(self.config)
+            block_storage = self._block_storage()
             volume_id = self.get_volume_id_from_name(block_storage, names[0])
             # attach volume to vm
             a = compute_client.attach_volume(
@@ -296,7 +317,7 @@ class Provider(VolumeABC):
                 ))
 
             # wait until attached
-            oci.wait_until(
+            self._wait_until(
                 compute_client,
                 compute_client.get_volume_attachment(
                     a.data.id),
@@ -313,6 +334,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return results
 
+    @VolumeTracer.traced("oracle.detach")
     def detach(self, name=None):
         """
         This function detaches a given volume from an instance
@@ -321,13 +343,13 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            compute_client = oci.core.ComputeClient(self.config)
-            block_storage = oci.core.BlockstorageClient(self.config)
+            compute_client = self._compute_client()
+            block_storage = self._block_storage()
             attachment_id = self.get_attachment_id_from_name(block_storage,
                                                              name)
             compute_client.detach_volume(attachment_id)
             # wait for detachment
-            oci.wait_until(
+            self._wait_until(
                 compute_client,
                 compute_client.get_volume_attachment(attachment_id),
                 'lifecycle_state',
@@ -343,6 +365,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return results[0]
 
+    @VolumeTracer.traced("oracle.delete")
     def delete(self, name=None):
         """
         This function delete one volume.
@@ -351,12 +374,12 @@ class Provider(VolumeABC):
         :return: Dictionary of volumes
         """
         try:
-            block_storage = oci.core.BlockstorageClient(self.config)
+            block_storage = self._block_storage()
             volume_id = self.get_volume_id_from_name(block_storage, name)
             if volume_id is not None:
                 block_storage.delete_volume(volume_id=volume_id)
                 # wait for termination
-                oci.wait_until(
+                self._wait_until(
                     block_storage,
                     block_storage.get_volume(volume_id),
                     'lifecycle_state',
@@ -371,6 +394,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("oracle.add_tag")
     def add_tag(self, **kwargs):
         """
         This function add tag to a volume.
@@ -385,7 +409,7 @@ class Provider(VolumeABC):
             name = kwargs['NAME']
             key = kwargs['key']
             value = kwargs['value']
-            block_storage = oci.core.BlockstorageClient(self.config)
+            block_storage = self._block_storage()
             volume_id = self.get_volume_id_from_name(block_storage, name)
             block_storage.update_volume(
                 volume_id,
@@ -400,6 +424,7 @@ class Provider(VolumeABC):
             raise RuntimeError
         return result
 
+    @VolumeTracer.traced("oracle.migrate")
     def migrate(self,
                 name=None,
                 fvm=None,
@@ -434,6 +459,7 @@ class Provider(VolumeABC):
 
         raise NotImplementedError
 
+    @VolumeTracer.traced("oracle.sync")
     def sync(self,
              volume_id=None,
              zone=None,
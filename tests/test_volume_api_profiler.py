@@ -0,0 +1,112 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_api_profiler.py
+###############################################################
+
+# The test profiles the providers against the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import json
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.ApiProfiler import ApiProfiler
+from cloudmesh.volume.ApiProfiler import InstrumentedClient
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+n = 2
+
+rows = []
+
+fakes = {
+    "aws": "ec2",
+    "azure": "azure",
+    "google": "google",
+    "openstack": "openstack",
+    "oracle": "oci",
+}
+
+
+class Client(object):
+
+    def __init__(self):
+        self.failures = 1
+
+    def describe(self):
+        return {"Volumes": [{"VolumeId": "vol-1"}]}
+
+    def attach(self):
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("busy")
+        return {}
+
+
+@pytest.mark.incremental
+class Test_volume_api_profiler:
+
+    def test_disabled(self):
+        HEADING()
+        client = Client()
+        assert ApiProfiler.wrap(client, "test") is client
+
+    def test_wrap(self):
+        HEADING()
+        ApiProfiler.clear()
+        ApiProfiler.start()
+        client = ApiProfiler.wrap(Client(), "test")
+        ApiProfiler.stop()
+        assert isinstance(client, InstrumentedClient)
+        client.describe()
+        with pytest.raises(ValueError):
+            client.attach()
+        client.attach()
+        stats = {e["method"]: e for e in ApiProfiler.stats()}
+        assert stats["describe"]["calls"] == 1
+        assert stats["describe"]["bytes"] == len(
+            json.dumps(Client().describe()))
+        assert stats["attach"]["calls"] == 2
+        assert stats["attach"]["errors"] == 1
+        assert stats["attach"]["retries"] == 1
+        assert stats["attach"]["buckets"]["+Inf"] == 2
+
+    def test_providers(self):
+        HEADING()
+        ApiProfiler.clear()
+        ApiProfiler.start()
+        Benchmark.Start()
+        rows.extend(ProviderBenchmark(n=n).run(kinds=list(fakes)))
+        Benchmark.Stop()
+        ApiProfiler.stop()
+        stats = ApiProfiler.stats()
+        for kind, prefix in fakes.items():
+            recorded = sum(e["calls"] for e in stats
+                           if e["provider"] == kind)
+            counted = sum(count for row in rows
+                          for name, count in row["api"].items()
+                          if name.startswith(f"{prefix}.") and
+                          name.split(".", 1)[1] in
+                          {e["method"] for e in stats
+                           if e["provider"] == kind})
+            assert recorded > 0
+            assert recorded == counted
+
+    def test_prometheus(self):
+        HEADING()
+        text = ApiProfiler.prometheus()
+        assert "# TYPE cloudmesh_volume_api_calls_total counter" in text
+        assert 'cloudmesh_volume_api_calls_total{provider="aws",' \
+               'method="describe_volumes"}' in text
+        assert 'le="+Inf"' in text
+
+    def test_json(self):
+        HEADING()
+        stats = json.loads(ApiProfiler.json())
+        assert {e["provider"] for e in stats} == set(fakes)
+
+    def test_benchmark(self):
+        HEADING()
+        ApiProfiler.clear()
+        Benchmark.print(sysinfo=False, csv=True, tag="profiler")
@@ -0,0 +1,103 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_benchmark_log.py
+###############################################################
+
+# The test reads the logs in benchmarking/ and scratch logs in a temporary
+# directory, it does not need MongoDB or a cloud.
+
+import glob
+import os
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+
+Benchmark.debug()
+
+benchmarking = os.path.join(os.path.dirname(__file__), "..", "benchmarking")
+logs = sorted(glob.glob(f"{benchmarking}/*.log"))
+
+directory = tempfile.TemporaryDirectory()
+
+header = "# csv,timer,status,time,start,tag,uname.node,user," \
+         "uname.system,platform.version"
+
+
+def write_log(name, times, status="ok"):
+    path = f"{directory.name}/{name}.log"
+    with open(path, "w") as f:
+        f.write("============ test session starts ============\n")
+        f.write(f"{header}\n")
+        for time in times:
+            f.write(f"# csv,test/test_list,{status},{time},"
+                    f"2020-04-30 20:47:24,aws,node,user,Windows,"
+                    f"('10', '10.0.18362', 'SP0', '')\n")
+            f.write("PASSED\n")
+    return path
+
+
+log = BenchmarkLog(tolerance=0.2)
+
+
+@pytest.mark.incremental
+class Test_volume_benchmark_log:
+
+    def test_records(self):
+        HEADING()
+        path = write_log("run-1", [1.0, 2.0])
+        records = list(log.records([path]))
+        assert len(records) == 2
+        assert records[0]["time"] == 1.0
+        assert records[0]["tag"] == "aws"
+        assert records[0]["platform.version"] == \
+            "('10', '10.0.18362', 'SP0', '')"
+
+    def test_aggregate(self):
+        HEADING()
+        paths = [write_log("run-1", [1.0, 2.0]),
+                 write_log("run-2", [3.0, 4.0, 5.0]),
+                 write_log("run-3", [9.0], status="failed")]
+        results = log.aggregate(log.records(paths))
+        assert len(results) == 1
+        entry = results[0]
+        assert entry["provider"] == "aws"
+        assert entry["count"] == 5
+        assert entry["failed"] == 1
+        assert entry["p50"] == 3.0
+        assert entry["p95"] == 4.8
+        assert entry["max"] == 5.0
+
+    def test_logs(self):
+        HEADING()
+        Benchmark.Start()
+        results = log.aggregate(log.records(logs))
+        Benchmark.Stop()
+        providers = {entry["provider"] for entry in results}
+        assert {"aws", "multipass"} <= providers
+
+    def test_compare(self):
+        HEADING()
+        baseline = f"{directory.name}/baseline.json"
+        BenchmarkLog.save(baseline, log.aggregate(
+            log.records([write_log("run-1", [1.0, 2.0])])))
+        results = log.aggregate(
+            log.records([write_log("run-4", [3.0, 3.0])]))
+        comparison = log.compare(results, BenchmarkLog.load(baseline))
+        assert comparison[0]["status"] == "slower"
+        assert comparison[0]["ratio"] == 2.0
+        comparison = log.compare([], BenchmarkLog.load(baseline))
+        assert comparison[0]["status"] == "missing"
+
+    def test_csv(self):
+        HEADING()
+        results = log.aggregate(
+            log.records([write_log("run-1", [1.0, 2.0])]))
+        lines = BenchmarkLog.csv(results).splitlines()
+        assert lines[0].startswith("provider,operation,count")
+        assert len(lines) == 2
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="log")
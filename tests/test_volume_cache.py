@@ -0,0 +1,76 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_cache.py
+###############################################################
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.variables import Variables
+from cloudmesh.volume.Provider import Provider
+
+Benchmark.debug()
+
+variables = Variables()
+
+#
+# cms set cloud=aws
+#
+cloud = variables.parameter('cloud')
+
+print(f"Test run for {cloud}")
+
+if cloud is None:
+    raise ValueError("cloud is not set")
+
+provider = Provider(name=cloud)
+
+
+@pytest.mark.incremental
+class Test_volume_cache:
+
+    def test_list_refresh(self):
+        HEADING()
+        Benchmark.Start()
+        data = provider.list(refresh=True)
+        Benchmark.Stop()
+        if provider.kind != "multipass":
+            for entry in data:
+                assert "fetched_at" in entry["cm"]
+
+    def test_list_cached(self):
+        HEADING()
+        fetched_at = provider.cache.fetched_at()
+        Benchmark.Start()
+        data = provider.list(max_age=3600)
+        Benchmark.Stop()
+        assert provider.cache.fetched_at() == fetched_at
+        if provider.kind != "multipass":
+            for entry in data:
+                assert entry["cm"]["fetched_at"] == fetched_at
+
+    def test_list_max_age(self):
+        HEADING()
+        fetched_at = provider.cache.fetched_at()
+        Benchmark.Start()
+        provider.list(max_age=0)
+        Benchmark.Stop()
+        assert provider.cache.fetched_at() > fetched_at
+
+    def test_changes(self):
+        HEADING()
+        provider.list(refresh=True)
+        changes = provider.cache.changes
+        if provider.kind != "multipass":
+            assert changes["inserted"] == 0
+            assert changes["deleted"] == 0
+
+    def test_purge(self):
+        HEADING()
+        Benchmark.Start()
+        provider.purge()
+        Benchmark.Stop()
+        collection = provider.cache.cm.collection(f"{cloud}-volume")
+        assert collection.count_documents({"cm.deleted": True}) == 0
+
+    def test_benchmark(self):
+        Benchmark.print(sysinfo=False, csv=True, tag=cloud)
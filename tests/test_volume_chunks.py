@@ -0,0 +1,114 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_chunks.py
+###############################################################
+
+# The test uses a chunk store in a temporary directory, it does not need
+# MongoDB or a cloud.
+
+import os
+import random
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.multipass.ChunkStore import ChunkStore
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+store = ChunkStore(cloud="test-chunks",
+                   directory=f"{directory.name}/store")
+
+volume = f"{directory.name}/volume"
+
+n = 4 << 20
+data = random.Random(0).getrandbits(8 * n).to_bytes(n, "little")
+
+
+def reference(data):
+    """
+    The chunk boundaries computed byte by byte
+    """
+    ends = []
+    start = 0
+    while start < len(data):
+        end = min(start + ChunkStore.max_size, len(data))
+        h = 0
+        for i in range(start + ChunkStore.min_size - store.bits, end):
+            h = ((h << 1) + ChunkStore.gear[data[i]]) & store.mask
+            if not h and i >= start + ChunkStore.min_size:
+                end = i + 1
+                break
+        ends.append(end)
+        start = end
+    return ends
+
+
+@pytest.mark.incremental
+class Test_volume_chunks:
+
+    def test_setup(self):
+        HEADING()
+        os.makedirs(f"{volume}/data")
+        with open(f"{volume}/data/file", "wb") as f:
+            f.write(data)
+
+    def test_cut(self):
+        HEADING()
+        Benchmark.Start()
+        ends = store.cut(data)
+        Benchmark.Stop()
+        assert ends[-1] == len(data)
+        assert ends[:5] == reference(data[:ends[4]])[:5]
+        assert store.cut(bytes(1 << 20)) == reference(bytes(1 << 20))
+        assert store.cut(b"") == []
+
+    def test_shift(self):
+        HEADING()
+        ends = store.cut(data)
+        shifted = store.cut(b"inserted" + data)
+        assert [end - 8 for end in shifted[1:]] == ends[1:]
+
+    def test_snapshot(self):
+        HEADING()
+        Benchmark.Start()
+        first = store.snapshot("volume", volume, name="first")
+        Benchmark.Stop()
+        assert first["new_bytes"] == len(data)
+        with open(f"{volume}/data/file", "wb") as f:
+            f.write(b"inserted" + data)
+        second = store.snapshot("volume", volume, name="second")
+        assert second["new_chunks"] == 1
+        assert store.snapshots("volume") == ["first", "second"]
+
+    def test_snapshot_names(self):
+        HEADING()
+        names = [store.snapshot("default", volume)["name"]
+                 for i in range(3)]
+        assert len(set(names)) == 3
+        assert store.snapshots("default") == names
+        store.snapshot("default", volume, name="base")
+        newest = store.snapshot("default", volume)["name"]
+        assert store.snapshots("default") == names + ["base", newest]
+        with pytest.raises(ValueError):
+            store.snapshot("default", volume, name="base")
+        for name in ["../escape", "a/b", ".."]:
+            with pytest.raises(ValueError):
+                store.snapshot("default", volume, name=name)
+
+    def test_restore(self):
+        HEADING()
+        restored = f"{directory.name}/restored"
+        store.restore("volume", "first", restored)
+        with open(f"{restored}/data/file", "rb") as f:
+            assert f.read() == data
+
+    def test_cleanup(self):
+        HEADING()
+        directory.cleanup()
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="chunks")
@@ -0,0 +1,159 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_fake.py
+###############################################################
+
+# The test runs the in-memory provider of the kind fake, it does not need
+# MongoDB or a cloud.
+
+import tempfile
+import time
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.ProviderBenchmark import OfflineConfig
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+import cloudmesh.volume.fake.Provider as fake
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+cloud = "fake-test"
+
+default = {
+    "lag": 0.2,
+    "create_time": 0.3,
+    "attach_time": 0.1,
+    "detach_time": 0.1,
+    "delete_time": 0.1,
+    "poll": 0.02,
+    "failures": {"attach_volume": 1.0},
+    "seed": 0,
+    "database_path": f"{directory.name}/{cloud}.db"
+}
+
+
+def provider(**kwargs):
+    saved = fake.Config
+    fake.Config = OfflineConfig({"cloudmesh": {"volume": {cloud: {
+        "cm": {"kind": "fake"}, "default": dict(default, **kwargs)}}}})
+    try:
+        return fake.Provider(cloud)
+    finally:
+        fake.Config = saved
+
+
+@pytest.mark.incremental
+class Test_volume_fake:
+
+    def test_create(self):
+        HEADING()
+        fake.Provider.reset()
+        p = provider()
+        Benchmark.Start()
+        start = time.time()
+        result = p.create(NAME="volume-1")
+        Benchmark.Stop()
+        assert time.time() - start >= 0.5
+        assert result[0]["cm"]["state"] == "available"
+        assert result[0]["cm"]["cloud"] == cloud
+        assert p.fake.calls["fake.describe_volumes"] > 1
+
+    def test_lag(self):
+        HEADING()
+        p = provider(create_time=0.0)
+        with pytest.raises(ValueError):
+            p.create(NAME="volume-1")
+        p.lag = 0
+        p.create(NAME="volume-2")
+        p.lag = 10
+        names = [v["name"] for v in p.list(refresh=True)]
+        assert names == []
+
+    def test_failures(self):
+        HEADING()
+        p = provider()
+        with pytest.raises(RuntimeError):
+            p.attach(names=["volume-1"], vm="vm-1")
+        with pytest.raises(ValueError):
+            p.attach(names=["volume-1"], vm="vm-unknown")
+
+    def test_attach(self):
+        HEADING()
+        p = provider(failures={})
+        result = p.attach(names=["volume-1"], vm="vm-1")
+        assert result[0]["state"] == "in-use"
+        assert result[0]["cm"]["attached_vms"] == ["vm-1"]
+        with pytest.raises(ValueError):
+            p.delete(name="volume-1")
+        result = p.migrate(NAME="volume-1", vm="vm-2")
+        assert result[0]["cm"]["attached_vms"] == ["vm-2"]
+
+    def test_detach(self):
+        HEADING()
+        p = provider()
+        result = p.detach(name="volume-1")
+        assert result["cm"]["state"] == "available"
+        assert result["cm"]["attached_vms"] == []
+
+    def test_add_tag(self):
+        HEADING()
+        p = provider()
+        result = p.add_tag(NAME="volume-1", key="project", value="test")
+        assert result["cm"]["tags"] == {"project": "test"}
+
+    def test_facade_add_tag(self):
+        HEADING()
+        cloud = FakeCloud()
+        with tempfile.TemporaryDirectory() as path, \
+                ProviderBenchmark().facade("fake", cloud, path) as facade:
+            volume = facade()
+            volume.create(NAME="volume-tagged")
+            result = volume.add_tag(NAME="volume-tagged", key="owner",
+                                    value="test")
+        assert result[0]["cm"]["name"] == "volume-tagged"
+        assert result[0]["cm"]["tags"] == {"owner": "test"}
+        assert "vms" not in result[0]
+
+    def test_delete(self):
+        HEADING()
+        p = provider()
+        result = p.delete(name="volume-1")
+        assert result[0]["cm"]["state"] == "deleted"
+        p.repository.update(result)
+        assert p.purge() == 1
+        names = [v["name"] for v in p.list(refresh=True)]
+        assert names == ["volume-2"]
+
+    def test_seed(self):
+        HEADING()
+        results = []
+        for i in range(2):
+            fake.Provider.reset()
+            p = provider(failures={}, failure_rate=0.5, seed=1)
+            outcome = []
+            for j in range(20):
+                try:
+                    p._call("fake.describe_volumes")
+                    outcome.append(True)
+                except RuntimeError:
+                    outcome.append(False)
+            results.append(outcome)
+        assert results[0] == results[1]
+        assert True in results[0] and False in results[0]
+        fake.Provider.reset()
+
+    def test_offline(self):
+        HEADING()
+        Benchmark.Start()
+        rows = ProviderBenchmark(n=2).run(kinds=["fake"])
+        Benchmark.Stop()
+        calls = {row["operation"]: row["api"] for row in rows}
+        assert calls["create"]["fake.create_volume"] == 2
+        assert calls["delete"]["fake.delete_volume"] == 2
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="fake")
@@ -0,0 +1,97 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_gate.py
+###############################################################
+
+# The test runs the regression gate with the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import copy
+import os
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.RegressionGate import RegressionGate
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+filename = f"{directory.name}/baseline.json"
+
+gate = RegressionGate(n=3, latency=0.001, repeat=2, kinds=["fake"])
+
+results = []
+
+
+def entry(report, operation, metric):
+    for e in report:
+        if e["operation"] == operation and e["metric"] == metric:
+            return e
+    return None
+
+
+@pytest.mark.incremental
+class Test_volume_gate:
+
+    def test_summary(self):
+        HEADING()
+        assert RegressionGate.summary([3, 1, 2, 10]) == \
+            {"p50": 2.5, "mad": 1.0}
+
+    def test_judge(self):
+        HEADING()
+        assert gate.judge("calls", 2, 3)
+        assert not gate.judge("calls", 3, 3)
+        old = {"p50": 0.1, "mad": 0.001}
+        assert gate.judge("time", old, {"p50": 0.2, "mad": 0.001})
+        assert not gate.judge("time", old, {"p50": 0.11, "mad": 0.001})
+        assert not gate.judge("time", old, {"p50": 0.2, "mad": 0.05})
+        assert not gate.judge("memory", {"p50": 1000, "mad": 0},
+                              {"p50": 5000, "mad": 0})
+
+    def test_run(self):
+        HEADING()
+        Benchmark.Start()
+        results.extend(gate.run())
+        Benchmark.Stop()
+        assert [e["operation"] for e in results] == \
+            ["attach", "create", "delete", "detach", "list"]
+        gate.save(filename, results)
+        assert os.path.exists(filename)
+
+    def test_pass(self):
+        HEADING()
+        loaded = RegressionGate.load(filename, kinds=["fake"])
+        assert loaded.n == 3
+        assert loaded.baseline == results
+        report = loaded.compare(results)
+        assert report == []
+        assert not RegressionGate.failed(report)
+
+    def test_fail(self):
+        HEADING()
+        baseline = copy.deepcopy(results)
+        for e in baseline:
+            e["calls"] -= 1
+            e["api"]["fake.describe_volumes"] -= 1
+            e["time"]["p50"] /= 4
+        report = gate.compare(results, baseline=baseline)
+        assert RegressionGate.failed(report)
+        assert entry(report, "list", "calls")["status"] == "fail"
+        assert entry(report, "create", "calls")["status"] == "worse"
+        diff = RegressionGate.diff(report, results, baseline)
+        print(diff)
+        assert "fail    fake delete calls" in diff
+        assert "fake.describe_volumes" in diff
+
+    def test_missing(self):
+        HEADING()
+        report = gate.compare(results[1:], baseline=results)
+        assert report[0]["status"] == "missing"
+        assert not RegressionGate.failed(report)
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="gate")
@@ -0,0 +1,75 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_index.py
+###############################################################
+
+# The test uses a scratch collection test-index-volume in the
+# cloudmesh database and removes it at the end.
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeIndex import VolumeIndex
+
+Benchmark.debug()
+
+cloud = "test-index"
+kind = "aws"
+n = 10000
+
+cm = CmDatabase()
+collection = cm.collection(f"{cloud}-volume")
+
+queries = {
+    "name": {"cm.name": "volume-4711", "cm.deleted": {"$ne": True}},
+    "names": {"cm.name": {"$in": ["volume-1", "volume-2"]}},
+    "id": {"cm.id": "vol-4711"},
+    "attached_vms": {"cm.attached_vms": "vm-11"},
+    "region": {"cm.region": "us-east-2b"},
+    "state": {"cm.state": "in-use", "cm.region": "us-east-2b"},
+}
+
+
+@pytest.mark.incremental
+class Test_volume_index:
+
+    def test_setup(self):
+        HEADING()
+        collection.drop()
+        zones = ["us-east-2a", "us-east-2b", "us-east-2c"]
+        collection.insert_many([
+            {
+                "cm": {"name": f"volume-{i}", "cloud": cloud,
+                       "kind": "volume", "id": f"vol-{i}",
+                       "region": zones[i % 3], "state": "in-use",
+                       "attached_vms": [f"vm-{i % 100}", f"vm-{i % 7}"]}
+            } for i in range(n)])
+        assert collection.count_documents({}) == n
+
+    def test_ensure(self):
+        HEADING()
+        Benchmark.Start()
+        created = VolumeIndex(cloud=cloud, kind=kind).ensure(force=True)
+        Benchmark.Stop()
+        assert created
+        assert not VolumeIndex(cloud=cloud, kind=kind).ensure()
+
+    @pytest.mark.parametrize("query", list(queries.keys()))
+    def test_explain(self, query):
+        HEADING()
+        plan = collection.find(queries[query], {"_id": 0}).explain()
+        assert VolumeIndex.uses_index(plan)
+
+    def test_lookup(self):
+        HEADING()
+        Benchmark.Start()
+        for i in range(1000):
+            collection.find_one(queries["name"], {"_id": 0})
+        Benchmark.Stop()
+
+    def test_cleanup(self):
+        HEADING()
+        collection.drop()
+
+    def test_benchmark(self):
+        Benchmark.print(sysinfo=False, csv=True, tag=cloud)
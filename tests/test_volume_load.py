@@ -0,0 +1,77 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_load.py
+###############################################################
+
+# The test drives the volume facade with concurrent workers against the
+# SDK stand-ins of cloudmesh.volume.benchmark, it does not need MongoDB or
+# a cloud.
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.LoadTest import LoadTest
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+workers = 4
+operations = 80
+
+
+def check(report):
+    assert report["count"] == operations
+    assert sum(entry["count"]
+               for entry in report["operations"].values()) == operations
+    assert report["error_rate"] == 0
+    for entry in report["operations"].values():
+        assert entry["p50"] <= entry["p95"] <= entry["p99"] <= entry["max"]
+    assert report["throughput"] > 0
+    assert sum(report["api"].values()) > 0
+
+
+@pytest.mark.incremental
+class Test_volume_load:
+
+    def test_parse(self):
+        HEADING()
+        assert LoadTest.parse("create=1, list=8") == \
+            {"create": 1.0, "list": 8.0}
+        with pytest.raises(ValueError):
+            LoadTest.parse("resize=1")
+
+    def test_shares(self):
+        HEADING()
+        test = LoadTest(workers=3, operations=10)
+        assert test.shares() == [4, 3, 3]
+
+    def test_threads(self):
+        HEADING()
+        for kind in ProviderBenchmark.kinds:
+            Benchmark.Start()
+            report = LoadTest(kind=kind, workers=workers,
+                              operations=operations).run()
+            Benchmark.Stop()
+            print(LoadTest.table(report))
+            check(report)
+            assert report["cache"]["refreshes"] == 0
+
+    def test_processes(self):
+        HEADING()
+        Benchmark.Start()
+        report = LoadTest(kind="aws", workers=2, operations=operations,
+                          processes=True).run()
+        Benchmark.Stop()
+        print(LoadTest.table(report))
+        check(report)
+        assert report["mode"] == "processes"
+
+    def test_mix(self):
+        HEADING()
+        report = LoadTest(kind="aws", workers=workers,
+                          operations=operations,
+                          mix={"list": 1}).run()
+        assert set(report["operations"]) == {"list"}
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="load")
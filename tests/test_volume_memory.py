@@ -0,0 +1,70 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_memory.py
+###############################################################
+
+# The test lists synthetic volumes with the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.MemoryBenchmark import MemoryBenchmark
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+n = 200
+
+
+@pytest.mark.incremental
+class Test_volume_memory:
+
+    def test_populate(self):
+        HEADING()
+        cloud = FakeCloud()
+        MemoryBenchmark.populate(cloud, "aws", 30)
+        volumes = cloud.list()
+        assert len(volumes) == 30
+        assert len([v for v in volumes if v["state"] == "in-use"]) == 10
+        assert volumes[0]["tags"]["Name"] == "volume-0"
+
+    def test_measure(self):
+        HEADING()
+        benchmark = MemoryBenchmark(processes=False)
+        for kind in ProviderBenchmark.kinds:
+            Benchmark.Start()
+            rows = benchmark.measure(kind, n, trace=True)
+            Benchmark.Stop()
+            assert [row["phase"] for row in rows] == MemoryBenchmark.phases
+            for row in rows:
+                assert row["count"] == n, (kind, row["phase"])
+                assert row["peak"] > 0
+
+    def test_run(self):
+        HEADING()
+        benchmark = MemoryBenchmark(sizes=[n])
+        Benchmark.Start()
+        rows = benchmark.run(kinds=["aws"])
+        Benchmark.Stop()
+        print(MemoryBenchmark.table(rows))
+        assert len(rows) == len(MemoryBenchmark.phases)
+        for row in rows:
+            assert row["peak_rss"] > 0
+            assert row["per_volume"] == round(row["peak"] / n)
+        assert benchmark.check(rows) == []
+
+    def test_check(self):
+        HEADING()
+        benchmark = MemoryBenchmark(budget={"print": 1})
+        rows = [{"kind": "aws", "volumes": n, "phase": "print",
+                 "per_volume": 2},
+                {"kind": "aws", "volumes": n, "phase": "cache",
+                 "per_volume": 2}]
+        assert benchmark.check(rows) == [{
+            "kind": "aws", "volumes": n, "phase": "print",
+            "per_volume": 2, "budget": 1}]
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="memory")
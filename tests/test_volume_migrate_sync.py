@@ -90,11 +90,28 @@ class Test_provider_volume:
         elif cloud == 'multipass':
             volume2_path = provider.list(NAME=volume_name2)[0]['path']
             os.system(f"mkdir {volume2_path}/{volume_name2}/test")
+            with open(f"{volume2_path}/{volume_name2}/test/data", "w") as f:
+                f.write("x" * 1000)
             params = {"NAMES": [volume_name1, volume_name2], "cloud": cloud}
             Benchmark.Start()
             data = provider.sync(**params)
             Benchmark.Stop()
             assert data[0]['tags'][0]["sync_with"] == volume_name2
+            assert data[0]['sync']['changed'] == 1
+            assert data[0]['sync']['bytes'] == 1000
+
+    def test_provider_volume_verify(self):
+        HEADING()
+        if cloud == 'multipass':
+            params = {"NAMES": [volume_name1, volume_name2]}
+            Benchmark.Start()
+            data = provider.verify(**params)
+            Benchmark.Stop()
+            compared = data[0]['verify']['compare']
+            assert compared['extra'] == []
+            assert compared['different'] == []
+            data = provider.verify(**params)
+            assert data[0]['verify']['hashed'] == 0
 
     # clean up
     def test_provider_volume_cleanup(self):
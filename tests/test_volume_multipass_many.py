@@ -0,0 +1,139 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_multipass_many.py
+###############################################################
+
+# The test only runs for multipass clouds.
+#
+# cms set cloud=multipass
+
+import os
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.variables import Variables
+from cloudmesh.volume.Provider import Provider
+
+Benchmark.debug()
+
+variables = Variables()
+cloud = variables.parameter('cloud')
+
+if cloud is None:
+    raise ValueError("cloud is not set")
+
+provider = Provider(name=cloud)
+
+if provider.kind != "multipass":
+    pytest.skip("multipass only", allow_module_level=True)
+
+repository = provider.provider.repository
+
+n = 100
+names = [f"test-many-{i}" for i in range(n)]
+
+
+@pytest.mark.incremental
+class Test_volume_multipass_many:
+
+    def test_create_many(self):
+        HEADING()
+        Benchmark.Start()
+        result = provider.provider.create_many(names=names)
+        Benchmark.Stop()
+        repository.update([r for r in result if r['State'] != 'error'])
+        assert [r['name'] for r in result] == names
+        assert all(r['State'] == 'available' for r in result)
+
+    def test_create_existing(self):
+        HEADING()
+        result = provider.provider.create_many(names=names[:1])
+        assert result[0]['State'] == 'error'
+
+    def test_scan(self):
+        HEADING()
+        path = f"{provider.provider.default['path']}/{names[0]}/data"
+        with open(path, "w") as f:
+            f.write("x" * 1000)
+        Benchmark.Start()
+        result = provider.list(NAME=names[0])
+        Benchmark.Stop()
+        os.remove(path)
+        assert result[0]['usage'] == {'bytes': 1000, 'files': 1}
+        assert result[0]['size_gb'] == 0
+
+    def test_snapshot_restore(self):
+        HEADING()
+        path = f"{provider.provider.default['path']}/{names[1]}/data"
+        with open(path, "wb") as f:
+            f.write(os.urandom(1 << 20))
+        with open(path, "rb") as f:
+            data = f.read()
+        Benchmark.Start()
+        first = provider.snapshot(NAME=names[1], snapshot="s1")
+        second = provider.snapshot(NAME=names[1], snapshot="s2")
+        Benchmark.Stop()
+        assert first[0]['snapshots'][-1]['new_bytes'] == 1 << 20
+        assert second[0]['snapshots'][-1]['new_chunks'] == 0
+        with open(path, "wb") as f:
+            f.write(b"changed")
+        result = provider.restore(NAME=names[1], snapshot="s1")
+        with open(path, "rb") as f:
+            assert f.read() == data
+        assert result[0]['restore']['written'] == 1
+        os.remove(path)
+
+    def test_delete_many(self):
+        HEADING()
+        Benchmark.Start()
+        result = provider.provider.delete_many(names=names)
+        Benchmark.Stop()
+        repository.update(result)
+        assert len(result) == n
+        assert all(r['State'] == 'deleted' for r in result)
+        result = provider.list(NAME=names[0])
+        assert result[0]['State'] == 'deleted'
+
+    def test_info_snapshot(self):
+        HEADING()
+        info = provider.provider.info
+        calls = info.calls
+        Benchmark.Start()
+        with info.operation():
+            for vm in info.snapshot():
+                info.state(vm)
+                info.mounts(vm)
+        Benchmark.Stop()
+        assert info.calls <= calls + 1
+
+    def test_mount_missing_vm(self):
+        HEADING()
+        pairs = [(f"/tmp/{name}", "cloudmesh-missing-vm")
+                 for name in names[:4]]
+        Benchmark.Start()
+        result = provider.provider.mount_many(pairs)
+        Benchmark.Stop()
+        assert [(r['path'], r['vm']) for r in result] == pairs
+        assert all(r['returncode'] != 0 for r in result)
+
+    def test_image_backend(self):
+        HEADING()
+        name = "test-image-0"
+        Benchmark.Start()
+        result = provider.provider.create_many(names=[name], size=1,
+                                               backend="image")
+        Benchmark.Stop()
+        repository.update(result)
+        assert result[0]['backend'] == "image"
+        assert result[0]['size_gb'] == 1
+        image = f"{provider.provider.default['path']}/{name}/disk.img"
+        assert os.path.getsize(image) == 2 ** 30
+        result = provider.list(NAME=name)
+        assert result[0]['usage']['bytes'] < 2 ** 30
+        assert result[0]['size_gb'] == 1
+        result = provider.provider.delete_many(names=[name])
+        repository.update(result)
+        assert result[0]['State'] == 'deleted'
+
+    def test_benchmark(self):
+        Benchmark.print(sysinfo=False, csv=True, tag=cloud)
@@ -0,0 +1,91 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_offline_benchmark.py
+###############################################################
+
+# The test runs the providers against the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import sys
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.FakeCloud import FakeCloud
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+n = 3
+
+benchmark = ProviderBenchmark(n=n)
+
+rows = {}
+
+
+@pytest.mark.incremental
+class Test_volume_offline_benchmark:
+
+    @pytest.mark.parametrize("kind", ProviderBenchmark.kinds)
+    def test_kind(self, kind):
+        HEADING()
+        Benchmark.Start()
+        rows[kind] = benchmark.run(kinds=[kind])
+        Benchmark.Stop()
+        operations = [row["operation"] for row in rows[kind]]
+        assert operations == ProviderBenchmark.operations
+        for row in rows[kind]:
+            assert row["count"] == (1 if row["operation"] == "list" else n)
+            assert row["calls"] == sum(row["api"].values())
+            assert row["time"] >= 0
+            assert row["memory"] >= 0
+
+    def test_calls(self):
+        HEADING()
+        for kind in ProviderBenchmark.kinds:
+            calls = {row["operation"]: row["calls"] for row in rows[kind]}
+            if kind == "multipass":
+                assert calls["attach"] >= n
+            else:
+                assert calls["create"] >= n
+                assert calls["delete"] >= n
+
+    def test_latency(self):
+        HEADING()
+        latency = 0.01
+        Benchmark.Start()
+        result = ProviderBenchmark(n=1, latency=latency).run(
+            kinds=["openstack"])
+        Benchmark.Stop()
+        for row in result:
+            assert row["time"] >= row["calls"] * latency
+
+    def test_openstack_vm(self):
+        HEADING()
+        cloud = FakeCloud()
+        with tempfile.TemporaryDirectory() as path, \
+                benchmark.facade("openstack", cloud, path) as facade:
+            volume = facade()
+            volume.create(NAME="volume-vm")
+            volume.create(NAME="volume-other")
+            volume.attach(names=["volume-vm"], vm="vm-1")
+            result = volume.list(refresh=True, vm="vm-1")
+        assert [v["cm"]["name"] for v in result] == ["volume-vm"]
+        assert result[0]["cm"]["attached_vms"] == ["vm-1"]
+
+    def test_modules_restored(self):
+        HEADING()
+        for name in ["boto3", "oci", "openstack", "googleapiclient",
+                     "azure.mgmt.compute"]:
+            module = sys.modules.get(name)
+            assert module is None or module.__file__ is not None
+
+    def test_table(self):
+        HEADING()
+        table = ProviderBenchmark.table(rows["multipass"])
+        print(table)
+        assert len(table.splitlines()) == 1 + len(ProviderBenchmark.operations)
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="offline")
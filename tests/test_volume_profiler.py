@@ -0,0 +1,98 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_profiler.py
+###############################################################
+
+# The test profiles the offline benchmark of the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import os
+import pstats
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.VolumeProfiler import VolumeProfiler
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+filename = f"{directory.name}/volume.folded"
+
+profiler = VolumeProfiler()
+
+
+class Command(object):
+
+    @VolumeProfiler.option
+    def do_volume(self, args, arguments):
+        return ProviderBenchmark(n=2).run(kinds=["fake"])
+
+
+@pytest.mark.incremental
+class Test_volume_profiler:
+
+    def test_run(self):
+        HEADING()
+        Benchmark.Start()
+        rows = profiler.run(ProviderBenchmark(n=2).run, kinds=["fake"])
+        Benchmark.Stop()
+        assert len(rows) > 0
+        assert profiler.stats().total_tt > 0
+
+    def test_collapsed(self):
+        HEADING()
+        lines = profiler.collapsed().splitlines()
+        assert len(lines) > 0
+        for line in lines:
+            stack, microseconds = line.rsplit(" ", 1)
+            assert int(microseconds) > 0
+            assert stack
+        total = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+        assert total <= profiler.stats().total_tt * 1e6
+        assert any("ProviderBenchmark.py:benchmark" in line
+                   for line in lines)
+
+    def test_split(self):
+        HEADING()
+        split = profiler.split()
+        assert set(split) == set(VolumeProfiler.categories) | {"other"}
+        assert sum(split.values()) == \
+            pytest.approx(profiler.stats().total_tt, rel=0.01)
+
+    def test_summary(self):
+        HEADING()
+        summary = profiler.summary(n=5)
+        print(summary)
+        assert len(profiler.functions(n=5)) == 5
+        for category in VolumeProfiler.categories:
+            assert category in summary
+
+    def test_save(self):
+        HEADING()
+        profiler.save(filename)
+        assert os.path.getsize(filename) > 0
+        assert pstats.Stats(f"{filename}.prof").total_tt > 0
+        os.remove(filename)
+
+    def test_option(self):
+        HEADING()
+        os.environ.pop(VolumeProfiler.variable, None)
+        Command().do_volume("", {})
+        assert not os.path.exists(filename)
+        os.environ[VolumeProfiler.variable] = filename
+        try:
+            Benchmark.Start()
+            rows = Command().do_volume("", {})
+            Benchmark.Stop()
+        finally:
+            del os.environ[VolumeProfiler.variable]
+        assert len(rows) > 0
+        assert os.path.getsize(filename) > 0
+        assert os.path.exists(f"{filename}.prof")
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="profiler")
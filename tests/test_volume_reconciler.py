@@ -0,0 +1,88 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_reconciler.py
+###############################################################
+
+# The test uses a scratch collection test-reconciler-volume in the
+# cloudmesh database and removes it at the end.
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.mongo.CmDatabase import CmDatabase
+from cloudmesh.volume.VolumeReconciler import VolumeReconciler
+
+Benchmark.debug()
+
+cloud = "test-reconciler"
+
+cm = CmDatabase()
+collection = cm.collection(f"{cloud}-volume")
+
+reconciler = VolumeReconciler(cloud=cloud, kind="aws")
+
+
+def volume(i, state="available"):
+    return {"VolumeId": f"vol-{i}", "State": state,
+            "cm": {"name": f"volume-{i}", "cloud": cloud, "kind": "volume",
+                   "id": f"vol-{i}", "state": state}}
+
+
+def find(name):
+    return collection.find_one({"cm.name": name}, {"_id": 0})
+
+
+@pytest.mark.incremental
+class Test_volume_reconciler:
+
+    def test_setup(self):
+        HEADING()
+        collection.drop()
+        counts = reconciler.reconcile([volume(1), volume(2)])
+        assert counts["inserted"] == 2
+        assert "VolumeId" not in find("volume-1")
+        assert find("volume-1")["cm"]["id"] == "vol-1"
+
+    def test_version(self):
+        HEADING()
+        collection.update_one({"cm.name": "volume-1"},
+                              {"$set": {"cm.version": 3}})
+        Benchmark.Start()
+        counts = reconciler.reconcile([volume(1), volume(2)])
+        Benchmark.Stop()
+        assert counts["unchanged"] == 2
+        assert find("volume-1")["cm"]["version"] == 3
+
+    def test_name_key(self):
+        HEADING()
+        entry = volume(3)
+        del entry["cm"]["id"]
+        collection.insert_one(dict(entry))
+        entry["cm"]["state"] = "in-use"
+        counts = reconciler.reconcile([volume(1), volume(2), entry])
+        assert counts["updated"] == 1
+        assert find("volume-3")["cm"]["state"] == "in-use"
+        assert "State" not in find("volume-3")
+        counts = reconciler.reconcile([volume(1), volume(2)])
+        assert counts["deleted"] == 1
+        assert find("volume-3")["cm"]["deleted"]
+
+    def test_tombstone(self):
+        HEADING()
+        assert reconciler.tombstone([volume(2, state="deleted")]) == 1
+        assert find("volume-2")["cm"]["deleted"]
+        assert not find("volume-1")["cm"].get("deleted")
+        assert reconciler.tombstone([volume(1)]) == 0
+        assert not find("volume-1")["cm"].get("deleted")
+        multipass = VolumeReconciler(cloud=cloud, kind="multipass")
+        assert multipass.tombstone([volume(1, state="deleted")]) == 0
+        assert not find("volume-1")["cm"].get("deleted")
+        assert reconciler.tombstone(None) == 0
+
+    def test_purge(self):
+        HEADING()
+        assert reconciler.purge() == 2
+        collection.drop()
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="reconciler")
@@ -0,0 +1,186 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_sqlite.py
+###############################################################
+
+# The test uses a scratch SQLite database in a temporary directory, it
+# does not need MongoDB or a cloud.
+
+import tempfile
+import threading
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.SqliteVolumeRepository import SqliteVolumeRepository
+
+Benchmark.debug()
+
+cloud = "test-sqlite"
+kind = "multipass"
+n = 10000
+
+directory = tempfile.TemporaryDirectory()
+path = f"{directory.name}/{cloud}.db"
+
+queries = {
+    "name": ({"cm.name": "volume-4711", "cm.deleted": {"$ne": True}}, 1),
+    "names": ({"cm.name": {"$in": ["volume-1", "volume-2"]}}, 2),
+    "vm": ({"AttachedToVm": "vm-11"}, n // 100),
+    "region": ({"path": "/tmp/b"}, n // 2),
+    "attached_vms": ({"cm.attached_vms": "vm-11"}, n // 100),
+    "state": ({"State": "deleted"}, n // 10),
+    "tags": ({"tags": "test"}, 1),
+}
+
+
+def open_repository():
+    return SqliteVolumeRepository(cloud=cloud, kind=kind, path=path)
+
+
+@pytest.mark.incremental
+class Test_volume_sqlite:
+
+    def test_setup(self):
+        HEADING()
+        repository = open_repository()
+        Benchmark.Start()
+        repository.update([
+            {
+                "name": f"volume-{i}",
+                "path": ["/tmp/a", "/tmp/b"][i % 2],
+                "AttachedToVm": [f"vm-{i % 100}"],
+                "State": "deleted" if i % 10 == 0 else "available",
+                "tags": ["test"] if i == 4711 else [],
+                "cm": {"name": f"volume-{i}", "cloud": cloud,
+                       "kind": "volume",
+                       "region": ["/tmp/a", "/tmp/b"][i % 2],
+                       "attached_vms": [f"vm-{i % 100}"]}
+            } for i in range(n)])
+        Benchmark.Stop()
+        assert len(repository.find(fields=["cm.name"])) == n
+
+    def test_startup(self):
+        HEADING()
+        Benchmark.Start()
+        volume = open_repository().find_one("volume-4711",
+                                            fields=["path", "cm.name"])
+        Benchmark.Stop()
+        assert volume == {"path": "/tmp/b", "cm": {"name": "volume-4711"}}
+
+    @pytest.mark.parametrize("query", list(queries.keys()))
+    def test_find(self, query):
+        HEADING()
+        q, count = queries[query]
+        assert len(open_repository().find(q)) == count
+
+    def test_update(self):
+        HEADING()
+        repository = open_repository()
+        volume = repository.find_one("volume-1")
+        volume["AttachedToVm"] = ["vm-new"]
+        volume["cm"]["attached_vms"] = ["vm-new"]
+        repository.update(volume)
+        volume = repository.find_one("volume-1")
+        assert volume["AttachedToVm"] == ["vm-new"]
+        assert volume["cm"]["created"] != volume["cm"]["modified"]
+        assert repository.find({"AttachedToVm": "vm-new"},
+                               fields=["name"]) == [{"name": "volume-1"}]
+        assert repository.find({"AttachedToVm": "vm-1"},
+                               fields=["name"])[0] != {"name": "volume-1"}
+
+    def test_stale_update(self):
+        HEADING()
+        repository = open_repository()
+        stale = repository.find_one("volume-2")
+        current = repository.find_one("volume-2")
+        current["State"] = "in-use"
+        repository.update(current)
+        stale["State"] = "available"
+        result = repository.update(stale)
+        assert result[0]["State"] == "in-use"
+        assert repository.find_one("volume-2")["State"] == "in-use"
+
+    def test_replace(self):
+        HEADING()
+        repository = open_repository()
+        repository.update({"name": "volume-5", "State": "available",
+                           "tags": ["test"],
+                           "cm": {"name": "volume-5", "cloud": cloud,
+                                  "kind": "volume"}})
+        volume = repository.find_one("volume-5")
+        assert "AttachedToVm" not in volume
+        assert volume["cm"]["region"] == "/tmp/b"
+        assert volume["cm"]["collection"] == f"{cloud}-volume"
+
+        def untag(volume):
+            del volume["tags"]
+            return volume
+
+        repository.modify("volume-5", untag, fields=["tags", "cm"])
+        volume = repository.find_one("volume-5")
+        assert "tags" not in volume
+        assert volume["State"] == "available"
+
+    def test_recreate(self):
+        HEADING()
+        repository = open_repository()
+
+        def tombstone(volume):
+            volume["cm"]["deleted"] = True
+            volume["cm"]["deleted_at"] = "yesterday"
+            return volume
+
+        repository.modify("volume-6", tombstone)
+        query = {"cm.name": "volume-6", "cm.deleted": {"$ne": True}}
+        assert repository.find(query) == []
+        repository.update({"name": "volume-6", "State": "available",
+                           "cm": {"name": "volume-6", "cloud": cloud,
+                                  "kind": "volume"}})
+        assert len(repository.find(query)) == 1
+        assert "deleted_at" not in repository.find_one("volume-6")["cm"]
+
+    def test_concurrent(self):
+        HEADING()
+
+        def attach(i):
+            open_repository().add_to_set(
+                "volume-3", {"AttachedToVm": [f"new-{i}"]})
+
+        def tag(i):
+            def _tag(volume):
+                volume["tags"].append({f"key-{i}": "value"})
+                return volume
+
+            open_repository().modify("volume-3", _tag)
+
+        threads = [threading.Thread(target=attach, args=(i,))
+                   for i in range(20)] + \
+                  [threading.Thread(target=tag, args=(i,))
+                   for i in range(20)]
+        Benchmark.Start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        Benchmark.Stop()
+        volume = open_repository().find_one("volume-3")
+        assert len(volume["AttachedToVm"]) == 21
+        assert len(volume["tags"]) == 20
+        volume = open_repository().pull(
+            "volume-3", {"AttachedToVm": [f"new-{i}" for i in range(20)]})
+        assert volume["AttachedToVm"] == ["vm-3"]
+
+    def test_delete_many(self):
+        HEADING()
+        repository = open_repository()
+        assert repository.delete_many({"State": "deleted"}) == n // 10
+        assert repository.find({"State": "deleted"}) == []
+        assert repository.find_name("volume-0") == []
+
+    def test_cleanup(self):
+        HEADING()
+        open_repository().close()
+        directory.cleanup()
+
+    def test_benchmark(self):
+        Benchmark.print(sysinfo=False, csv=True, tag=cloud)
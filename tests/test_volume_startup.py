@@ -0,0 +1,93 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_startup.py
+###############################################################
+
+# The test measures the import of cloudmesh.volume.Provider and commands
+# of python instead of cms, it does not need MongoDB or a cloud.
+
+import sys
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.benchmark.BenchmarkLog import BenchmarkLog
+from cloudmesh.volume.benchmark.StartupBenchmark import StartupBenchmark
+
+Benchmark.debug()
+
+output = "\n".join([
+    "import time: self [us] | cumulative | imported package",
+    "import time:       100 |        100 |     yaml.reader",
+    "import time:     80000 |      80100 |   yaml",
+    "import time:       200 |        200 |   cloudmesh.volume.VolumeCache",
+    "import time:       300 |      80600 | cloudmesh.volume.Provider",
+])
+
+commands = {
+    "hello": [sys.executable, "-c", "import time; print('hello'); "
+                                    "time.sleep(0.3)"],
+    "fail": [sys.executable, "-c", "import sys; sys.exit(2)"],
+}
+
+
+@pytest.mark.incremental
+class Test_volume_startup:
+
+    def test_parse(self):
+        HEADING()
+        entries = StartupBenchmark.parse(output)
+        assert [e["module"] for e in entries] == [
+            "yaml.reader", "yaml", "cloudmesh.volume.VolumeCache",
+            "cloudmesh.volume.Provider"]
+        assert [e["depth"] for e in entries] == [2, 1, 1, 0]
+        assert entries[1]["cumulative"] == pytest.approx(0.0801)
+        assert StartupBenchmark.parents(entries) == [1, 3, 3, None]
+
+    def test_heavy_imports(self):
+        HEADING()
+        entries = StartupBenchmark.parse(output)
+        heavy = StartupBenchmark().heavy_imports(entries)
+        assert heavy == [{"module": "cloudmesh.volume.Provider",
+                          "imports": "yaml", "seconds": 0.0801}]
+
+    def test_importtime(self):
+        HEADING()
+        benchmark = StartupBenchmark()
+        Benchmark.Start()
+        entries = benchmark.importtime("cloudmesh.volume.Provider")
+        Benchmark.Stop()
+        assert "cloudmesh.volume.Provider" in \
+            [e["module"] for e in entries]
+        assert StartupBenchmark.seconds(
+            entries, "cloudmesh.volume.Provider") > 0
+        with pytest.raises(RuntimeError):
+            benchmark.importtime("cloudmesh.volume.NotAModule")
+
+    def test_first_output(self):
+        HEADING()
+        result = StartupBenchmark.first_output(commands["hello"])
+        assert result["returncode"] == 0
+        assert result["first"] < result["total"]
+        assert result["total"] >= 0.3
+
+    def test_run(self):
+        HEADING()
+        benchmark = StartupBenchmark(repeat=2,
+                                     modules=["cloudmesh.volume.Provider"],
+                                     commands=commands)
+        Benchmark.Start()
+        results = benchmark.run()
+        Benchmark.Stop()
+        print(BenchmarkLog.csv(results))
+        print(benchmark.report())
+        found = {(e["provider"], e["operation"]): e for e in results}
+        assert found[("import", "cloudmesh.volume.Provider")]["count"] == 2
+        assert found[("first-output", "hello")]["count"] == 2
+        assert found[("command", "fail")]["failed"] == 2
+        assert "fail" in benchmark.errors
+        comparison = BenchmarkLog().compare(results, results)
+        assert {e["status"] for e in comparison} == {"same"}
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="startup")
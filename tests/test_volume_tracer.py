@@ -0,0 +1,112 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_tracer.py
+###############################################################
+
+# The test traces the providers against the SDK stand-ins of
+# cloudmesh.volume.benchmark, it does not need MongoDB or a cloud.
+
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.ApiProfiler import ApiProfiler
+from cloudmesh.volume.ApiProfiler import InstrumentedClient
+from cloudmesh.volume.VolumeTracer import NoOpSpan
+from cloudmesh.volume.VolumeTracer import VolumeTracer
+from cloudmesh.volume.benchmark.ProviderBenchmark import ProviderBenchmark
+
+Benchmark.debug()
+
+n = 1
+
+directory = tempfile.TemporaryDirectory()
+
+path = f"{directory.name}/trace.json"
+
+
+class Client(object):
+
+    def describe(self):
+        return {"Volumes": []}
+
+
+@pytest.mark.incremental
+class Test_volume_tracer:
+
+    def test_disabled(self):
+        HEADING()
+        VolumeTracer.stop()
+        VolumeTracer.configure(environ={})
+        assert not VolumeTracer.enabled()
+        client = Client()
+        assert ApiProfiler.wrap(client, "test") is client
+        with VolumeTracer.span("test") as span:
+            assert isinstance(span, NoOpSpan)
+        assert VolumeTracer.spans == []
+
+    def test_span(self):
+        HEADING()
+        VolumeTracer.clear()
+        VolumeTracer.start()
+        client = ApiProfiler.wrap(Client(), "test")
+        assert isinstance(client, InstrumentedClient)
+        with VolumeTracer.span("test.operation", cloud="test"):
+            with VolumeTracer.span("test.wait"):
+                client.describe()
+            with pytest.raises(ValueError):
+                with VolumeTracer.span("test.fail"):
+                    raise ValueError("busy")
+        VolumeTracer.stop()
+        spans = {span.name: span for span in VolumeTracer.spans}
+        assert set(spans) == {"test.operation", "test.wait",
+                              "test.describe", "test.fail"}
+        root = spans["test.operation"]
+        assert root.parent_id is None
+        assert root.attributes["cloud"] == "test"
+        assert spans["test.wait"].parent_id == root.span_id
+        assert spans["test.describe"].parent_id == spans["test.wait"].span_id
+        assert len({span.trace_id for span in spans.values()}) == 1
+        assert spans["test.fail"].status == "ERROR"
+        assert spans["test.fail"].events[0]["name"] == "exception"
+        assert root.status == "OK"
+
+    def test_configure(self):
+        HEADING()
+        VolumeTracer.clear()
+        VolumeTracer.configure(environ={VolumeTracer.variable: path})
+        assert VolumeTracer.enabled()
+        assert VolumeTracer.path == path
+        with VolumeTracer.span("test.operation"):
+            with VolumeTracer.span("test.wait"):
+                pass
+        assert VolumeTracer.spans == []
+        spans = VolumeTracer.load(path)
+        assert [span["name"] for span in spans] == \
+            ["test.wait", "test.operation"]
+        lines = VolumeTracer.format(spans).splitlines()
+        assert lines[0].endswith("test.operation OK")
+        assert lines[1].endswith("  test.wait OK")
+
+    def test_providers(self):
+        HEADING()
+        Benchmark.Start()
+        ProviderBenchmark(n=n).run(kinds=ProviderBenchmark.kinds)
+        Benchmark.Stop()
+        VolumeTracer.stop()
+        spans = VolumeTracer.load(path)
+        names = {span["name"] for span in spans}
+        ids = {span["context"]["span_id"]: span for span in spans}
+        for kind in ProviderBenchmark.kinds:
+            for operation in ProviderBenchmark.operations:
+                assert f"{kind}.{operation}" in names
+        assert {"aws.wait_volume", "azure.wait", "google.wait_disk",
+                "oracle.wait_until"} <= names
+        call = [span for span in spans
+                if span["name"] == "aws.describe_volumes"][0]
+        assert ids[call["parent_id"]]["name"].startswith("aws.")
+
+    def test_benchmark(self):
+        HEADING()
+        VolumeTracer.clear()
+        Benchmark.print(sysinfo=False, csv=True, tag="tracer")
@@ -0,0 +1,87 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_usage.py
+###############################################################
+
+# The test scans directories in a temporary directory, it does not need
+# MongoDB or a cloud.
+
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.multipass.VolumeUsage import VolumeUsage
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+VolumeUsage.directory = f"{directory.name}/usage"
+
+paths = [f"{directory.name}/volume-{i}" for i in range(20)]
+
+
+def populate(path, files=5):
+    os.makedirs(f"{path}/data", exist_ok=True)
+    for i in range(files):
+        with open(f"{path}/data/file-{i}", "w") as f:
+            f.write("x" * 100)
+
+
+@pytest.mark.incremental
+class Test_volume_usage:
+
+    def test_setup(self):
+        HEADING()
+        for path in paths:
+            populate(path)
+
+    def test_walk(self):
+        HEADING()
+        usage, tree = VolumeUsage.walk(paths[0])
+        assert usage["bytes"] == 500
+        assert usage["files"] == 5
+        assert usage["scanned"] == 2
+        usage, tree = VolumeUsage.walk(paths[0], cache=tree)
+        assert usage["reused"] == 2
+        assert usage["bytes"] == 500
+        with open(f"{paths[0]}/data/file-0", "a") as f:
+            f.write("x" * 100)
+        usage, tree = VolumeUsage.walk(paths[0], cache=tree)
+        assert usage["reused"] == 2
+        assert usage["bytes"] == 600
+
+    def test_concurrent(self):
+        HEADING()
+        scanner = VolumeUsage(cloud="test-usage", workers=4)
+        errors = []
+
+        def scan(i):
+            try:
+                for j in range(5):
+                    scanner.scan(paths[i::4], force=True)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=scan, args=(i,))
+                   for i in range(4)]
+        Benchmark.Start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        Benchmark.Stop()
+        assert errors == []
+        with open(scanner.filename) as f:
+            assert sorted(json.load(f)) == sorted(paths)
+
+    def test_cleanup(self):
+        HEADING()
+        directory.cleanup()
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="usage")
@@ -0,0 +1,108 @@
+###############################################################
+# pytest -v --capture=no tests/test_volume_walker.py
+###############################################################
+
+# The test walks, verifies and syncs directories in a temporary
+# directory, it does not need MongoDB or a cloud.
+
+import os
+import tempfile
+
+import pytest
+from cloudmesh.common.Benchmark import Benchmark
+from cloudmesh.common.util import HEADING
+from cloudmesh.volume.multipass.VolumeManifest import VolumeManifest
+from cloudmesh.volume.multipass.VolumeSync import VolumeSync
+from cloudmesh.volume.multipass.VolumeWalker import VolumeWalker
+
+Benchmark.debug()
+
+directory = tempfile.TemporaryDirectory()
+
+VolumeSync.directory = f"{directory.name}/manifest"
+
+source = f"{directory.name}/source"
+destination = f"{directory.name}/destination"
+
+manifests = []
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.incremental
+class Test_volume_walker:
+
+    def test_setup(self):
+        HEADING()
+        for i in range(10):
+            write(f"{source}/a/b/file-{i}", os.urandom(1000 * i))
+        write(f"{source}/top", b"top")
+        os.symlink("top", f"{source}/link")
+        os.makedirs(f"{source}/empty")
+
+    def test_walk(self):
+        HEADING()
+        Benchmark.Start()
+        files, directories = VolumeWalker.walk(source)
+        Benchmark.Stop()
+        assert directories == ["a", "a/b", "empty"]
+        assert len(files) == 11
+        assert files["a/b/file-3"].st_size == 3000
+        files, _ = VolumeWalker.walk(source, symlinks=True)
+        assert "link" in files
+        assert VolumeWalker.walk(f"{directory.name}/missing") == ({}, [])
+        with pytest.raises(OSError):
+            VolumeWalker.walk(f"{directory.name}/missing", strict=True)
+
+    def test_manifest(self):
+        HEADING()
+        builder = VolumeManifest(chunk_size=4096)
+        manifest, counts = builder.build(source)
+        assert counts == {"hashed": 12, "reused": 0}
+        assert manifest["digest"] is not None
+        again, counts = builder.build(source, previous=manifest)
+        assert counts == {"hashed": 0, "reused": 12}
+        assert again["digest"] == manifest["digest"]
+        manifests.append(manifest)
+
+    def test_sync(self):
+        HEADING()
+        syncer = VolumeSync(cloud="test-walker")
+        Benchmark.Start()
+        metrics = syncer.sync(source, destination)
+        Benchmark.Stop()
+        assert metrics["files"] == 12
+        assert metrics["changed"] == 12
+        assert os.path.islink(f"{destination}/link")
+        assert os.path.isdir(f"{destination}/empty")
+        metrics = syncer.sync(source, destination)
+        assert metrics["changed"] == 0
+        assert metrics["hashed"] == 0
+        write(f"{source}/top", b"new")
+        metrics = syncer.sync(source, destination)
+        assert metrics["changed"] == 1
+        assert metrics["hashed"] == 2
+        saved = syncer.load("source")
+        assert saved["digest"] is None
+        assert VolumeManifest.index(saved)["top"]["digest"] is not None
+
+    def test_compare(self):
+        HEADING()
+        builder = VolumeManifest(chunk_size=4096)
+        a, _ = builder.build(source)
+        b, _ = builder.build(destination)
+        assert VolumeManifest.compare(a, b)["equal"]
+        compared = VolumeManifest.compare(manifests[0], a)
+        assert compared["different"] == [{"file": "top", "chunks": [0]}]
+
+    def test_cleanup(self):
+        HEADING()
+        directory.cleanup()
+
+    def test_benchmark(self):
+        HEADING()
+        Benchmark.print(sysinfo=False, csv=True, tag="walker")